@@ -1,6 +1,8 @@
 from flask import Flask
 from flask_socketio import SocketIO
 from config.config import config
+from app.utils.startup_report import startup_report
+import gc
 import os
 
 socketio = SocketIO()
@@ -16,12 +18,20 @@ def create_app(config_name=None):
     socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
     
     # Register blueprints
-    from app.routes.main import main_bp
-    from app.routes.api import api_bp
-    from app.routes.dashboard import dashboard_bp
+    with startup_report.timed('app.routes', 'import'):
+        from app.routes.main import main_bp
+        from app.routes.api import api_bp, initialize_components
+        from app.routes.dashboard import dashboard_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
     
+    # Load models in the master before gunicorn forks (--preload) so workers share them
+    if app.config.get('PRELOAD_MODELS'):
+        initialize_components(app)
+        
+        # Keep preloaded objects out of GC passes so forked workers do not copy their pages
+        gc.freeze()
+    
     return app
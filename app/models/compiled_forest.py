@@ -0,0 +1,125 @@
+import json
+import numpy as np
+
+
+class CompiledForest:
+    """Random forest flattened into contiguous node arrays for low-latency scoring"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+
+        # Fingerprint of the saved forest this was compiled from (see MLModelManager.source_fingerprint)
+        self.source = None
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Export a fitted RandomForestClassifier"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves so every row can take max_depth steps
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # scikit-learn >= 1.4 stores class fractions; older versions store counts
+            # that DecisionTreeClassifier.predict_proba normalizes per leaf
+            proba = tree.value[:, 0, :estimator.n_classes_].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            if not np.allclose(normalizer, 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            np.ascontiguousarray(np.concatenate(values)),
+            np.asarray(roots, dtype=np.intp),
+            max_depth,
+            np.asarray(forest.classes_)
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Return the leaf node reached in every tree, shape (n_samples, n_estimators)"""
+        # Trees compare float32 inputs against float64 thresholds, as sklearn does
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.repeat(self.roots[np.newaxis, :], X.shape[0], axis=0)
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X):
+        leaf_values = self.value[self.apply(X)]
+
+        # Accumulate tree by tree, then divide, matching the forest's summation order
+        proba = np.zeros((leaf_values.shape[0], leaf_values.shape[2]), dtype=np.float64)
+        for t in range(self.n_estimators):
+            proba += leaf_values[:, t]
+        proba /= self.n_estimators
+
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def save(self, path):
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            source=np.array(json.dumps(self.source))
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            forest = cls(
+                data['feature'],
+                data['threshold'],
+                data['left'],
+                data['right'],
+                data['value'],
+                data['roots'],
+                data['max_depth'],
+                data['classes']
+            )
+            # Exports from before fingerprints were recorded have none
+            if 'source' in data:
+                forest.source = json.loads(str(data['source']))
+        return forest
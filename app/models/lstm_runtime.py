@@ -0,0 +1,138 @@
+import json
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+
+def _softmax(x):
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'softmax': _softmax
+}
+
+
+class NumpyLSTMRuntime:
+    """Pure-NumPy forward pass for the Sequential LSTM built by build_lstm_model"""
+
+    def __init__(self, layers, weights):
+        # layers: list of layer specs; weights: list of weight lists, one per layer
+        self.layers = layers
+        self.weights = weights
+
+        # Fingerprint of the saved Keras model this was exported from
+        self.source = None
+
+    @classmethod
+    def from_keras(cls, model):
+        """Export weights and layer settings from a trained Keras model"""
+        layers, weights = [], []
+
+        for layer in model.layers:
+            kind = layer.__class__.__name__
+            if kind == 'Dropout':
+                continue  # Identity at inference time
+
+            if kind == 'LSTM':
+                layers.append({
+                    'type': 'lstm',
+                    'units': layer.units,
+                    'return_sequences': layer.return_sequences,
+                    'activation': layer.activation.__name__,
+                    'recurrent_activation': layer.recurrent_activation.__name__
+                })
+            elif kind == 'Dense':
+                layers.append({'type': 'dense', 'activation': layer.activation.__name__})
+            else:
+                raise ValueError(f"Unsupported layer for NumPy runtime: {kind}")
+
+            weights.append([np.asarray(w, dtype=np.float32) for w in layer.get_weights()])
+
+        return cls(layers, weights)
+
+    def predict(self, X, **kwargs):
+        """Forward pass over X of shape (n_samples, timesteps, n_features)"""
+        out = np.asarray(X, dtype=np.float32)
+
+        for spec, weights in zip(self.layers, self.weights):
+            if spec['type'] == 'lstm':
+                out = self._lstm(out, spec, weights)
+            else:
+                kernel, bias = weights
+                out = ACTIVATIONS[spec['activation']](out @ kernel + bias)
+
+        return out
+
+    def _lstm(self, X, spec, weights):
+        # Keras gate order in the fused kernel is input, forget, cell, output
+        kernel, recurrent_kernel, bias = weights
+        units = spec['units']
+        activation = ACTIVATIONS[spec['activation']]
+        recurrent_activation = ACTIVATIONS[spec['recurrent_activation']]
+
+        n_samples, timesteps, _ = X.shape
+        h = np.zeros((n_samples, units), dtype=np.float32)
+        c = np.zeros((n_samples, units), dtype=np.float32)
+
+        # Input projections for every timestep in one matmul
+        projected = X @ kernel + bias
+        outputs = []
+
+        for t in range(timesteps):
+            z = projected[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            outputs.append(h)
+
+        if spec['return_sequences']:
+            return np.stack(outputs, axis=1)
+        return h
+
+    def verify(self, keras_model, X, atol=1e-5):
+        """Compare against Keras on X and return the max absolute difference"""
+        expected = keras_model.predict(X, verbose=0)
+        diff = float(np.max(np.abs(self.predict(X) - expected)))
+        if diff > atol:
+            raise ValueError(f"NumPy LSTM runtime differs from Keras by {diff}")
+        return diff
+
+    def save(self, path):
+        arrays = {'layers': np.array(json.dumps(self.layers)), 'source': np.array(json.dumps(self.source))}
+        for i, weights in enumerate(self.weights):
+            for j, w in enumerate(weights):
+                arrays[f'layer{i}_w{j}'] = w
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            layers = json.loads(str(data['layers']))
+            weights = []
+            for i in range(len(layers)):
+                j = 0
+                layer_weights = []
+                while f'layer{i}_w{j}' in data:
+                    layer_weights.append(data[f'layer{i}_w{j}'])
+                    j += 1
+                weights.append(layer_weights)
+            source = json.loads(str(data['source'])) if 'source' in data else None
+        runtime = cls(layers, weights)
+        runtime.source = source
+        return runtime
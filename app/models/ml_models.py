@@ -3,26 +3,67 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.metrics import classification_report, confusion_matrix
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Conv1D, MaxPooling1D, Flatten
 import joblib
-import shap
-from imblearn.over_sampling import SMOTE
+import os
+import threading
+import time
+import hashlib
+from collections import OrderedDict
+from app.models.compiled_forest import CompiledForest
+from app.models.lstm_runtime import NumpyLSTMRuntime
+from app.utils.startup_report import lazy_import
+from app.utils.dataset_cache import file_digest
+
+# Serving-side compiled forms of trained models, by model name
+COMPILED_TYPES = {
+    'random_forest': CompiledForest,
+    'lstm': NumpyLSTMRuntime
+}
 
 class MLModelManager:
+    # Ensemble members, cheapest first; 'incremental' learns from analyst feedback
+    ENSEMBLE_MODELS = ['random_forest', 'svm', 'lstm', 'incremental']
+    
     def __init__(self):
         self.models = {}
         self.model_performance = {}
         self.feature_importance = {}
         
-    def train_random_forest(self, X_train, y_train, X_test, y_test):
-        """Train Random Forest model"""
+        # Seconds spent loading each model in load_models
+        self.load_times = {}
+        
+        # Array-compiled forests used for small batches
+        self.compiled_models = {}
+        self.compiled_max_batch = 256
+        
+        # Ensemble mode and per-stage cascade counters
+        self.ensemble_mode = 'average'
+        self.cascade_threshold = 0.7
+        self.cascade_band = 0.15
+        self.cascade_stats = {name: {'rows': 0, 'escalated': 0} for name in self.ENSEMBLE_MODELS}
+        self._stats_lock = threading.Lock()
+        
+        # SHAP explainers built once per model, and per-row results keyed by feature hash
+        self.explainers = {}
+        self.explanation_cache = OrderedDict()
+        self.explanation_cache_size = 10000
+        self._explain_lock = threading.Lock()
+        
+    def balance_classes(self, X_train, y_train):
+        """Oversample minority classes with SMOTE"""
+        SMOTE = lazy_import('imblearn.over_sampling', 'imblearn').SMOTE
+        smote = SMOTE(random_state=42)
+        return smote.fit_resample(X_train, y_train)
+    
+    def train_random_forest(self, X_train, y_train, X_test, y_test, balance=True, n_jobs=-1):
+        """Train Random Forest model; pass balance=False for data that is already balanced"""
         print("Training Random Forest...")
         
         # Handle class imbalance
-        smote = SMOTE(random_state=42)
-        X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
+        if balance:
+            X_train_balanced, y_train_balanced = self.balance_classes(X_train, y_train)
+        else:
+            X_train_balanced, y_train_balanced = X_train, y_train
         
         rf_model = RandomForestClassifier(
             n_estimators=100,
@@ -30,7 +71,7 @@ class MLModelManager:
             min_samples_split=5,
             min_samples_leaf=2,
             random_state=42,
-            n_jobs=-1
+            n_jobs=n_jobs
         )
         
         rf_model.fit(X_train_balanced, y_train_balanced)
@@ -41,6 +82,7 @@ class MLModelManager:
         
         # Store model and performance
         self.models['random_forest'] = rf_model
+        self.compile_forest()
         self.model_performance['random_forest'] = {
             'classification_report': classification_report(y_test, y_pred, output_dict=True),
             'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
@@ -49,8 +91,11 @@ class MLModelManager:
         
         return rf_model, y_pred, y_pred_proba
     
-    def train_svm(self, X_train, y_train, X_test, y_test):
-        """Train SVM model"""
+    def train_svm(self, X_train, y_train, X_test, y_test, mode='exact', **approx_options):
+        """Train SVM model; mode='approx' trains the kernel-approximation variant instead"""
+        if mode == 'approx':
+            return self.train_svm_approx(X_train, y_train, X_test, y_test, **approx_options)
+        
         print("Training SVM...")
         
         svm_model = SVC(
@@ -76,8 +121,113 @@ class MLModelManager:
         
         return svm_model, y_pred, y_pred_proba
     
+    def train_svm_approx(self, X_train, y_train, X_test, y_test, n_components=1000, batch_size=10000,
+                         epochs=5, calibration_rows=20000, compare_rows=5000, random_state=42):
+        """Train an RBF SVM approximation: Nystroem features into an SGD linear SVM
+        
+        The SGD classifier is fitted with partial_fit on shuffled mini-batches, so X_train
+        may be a memory-mapped array larger than RAM. Probabilities come from sigmoid
+        calibration on rows held out from training. Serving cost depends only on
+        n_components, not on the training size.
+        """
+        print("Training SVM (kernel approximation)...")
+        from sklearn.kernel_approximation import Nystroem
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.pipeline import make_pipeline
+        
+        rng = np.random.default_rng(random_state)
+        n_rows = X_train.shape[0]
+        order = rng.permutation(n_rows)
+        n_calibration = min(calibration_rows, n_rows // 10)
+        calibration_idx = np.sort(order[:n_calibration])
+        train_idx = order[n_calibration:]
+        classes = np.unique(y_train)
+        
+        # gamma='scale' as SVC computes it, from a sample of the training rows
+        sample = np.asarray(X_train[np.sort(train_idx[:min(len(train_idx), 100000)])], dtype=np.float64)
+        gamma = 1.0 / (X_train.shape[1] * sample.var()) if sample.var() > 0 else 1.0
+        
+        feature_map = Nystroem(
+            kernel='rbf',
+            gamma=gamma,
+            n_components=min(n_components, len(sample)),
+            random_state=random_state
+        )
+        feature_map.fit(sample)
+        
+        sgd = SGDClassifier(loss='hinge', alpha=1e-4, random_state=random_state)
+        for epoch in range(epochs):
+            rng.shuffle(train_idx)
+            for start in range(0, len(train_idx), batch_size):
+                # Sorted indices keep reads from a memory-mapped array sequential
+                batch = np.sort(train_idx[start:start + batch_size])
+                sgd.partial_fit(feature_map.transform(X_train[batch]), y_train[batch], classes=classes)
+        
+        calibrated = self._prefit_calibrator(sgd)
+        calibrated.fit(feature_map.transform(X_train[calibration_idx]), y_train[calibration_idx])
+        
+        svm_model = make_pipeline(feature_map, calibrated)
+        
+        # Predictions
+        y_pred_proba = svm_model.predict_proba(X_test)
+        y_pred = svm_model.classes_[np.argmax(y_pred_proba, axis=1)]
+        
+        # Store model and performance
+        self.models['svm'] = svm_model
+        self.model_performance['svm'] = {
+            'classification_report': classification_report(y_test, y_pred, output_dict=True),
+            'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
+            'mode': 'approx',
+            'n_components': feature_map.n_components,
+            'gamma': gamma,
+            'exact_comparison': self.compare_with_exact_svm(
+                svm_model, X_train, y_train, X_test, y_test, compare_rows, random_state
+            ) if compare_rows else None
+        }
+        
+        return svm_model, y_pred, y_pred_proba
+    
+    def compare_with_exact_svm(self, approx_model, X_train, y_train, X_test, y_test, rows=5000, random_state=42):
+        """Accuracy of an exact RBF SVC fitted on a sample versus the approximation, on held-out rows"""
+        rng = np.random.default_rng(random_state + 1)
+        train_sample = np.sort(rng.choice(X_train.shape[0], min(rows, X_train.shape[0]), replace=False))
+        test_sample = np.sort(rng.choice(X_test.shape[0], min(rows, X_test.shape[0]), replace=False))
+        X_eval, y_eval = X_test[test_sample], y_test[test_sample]
+        
+        start = time.perf_counter()
+        exact = SVC(kernel='rbf', C=1.0, gamma='scale', random_state=random_state)
+        exact.fit(X_train[train_sample], y_train[train_sample])
+        fit_seconds = time.perf_counter() - start
+        
+        exact_pred = exact.predict(X_eval)
+        approx_pred = approx_model.predict(X_eval)
+        
+        return {
+            'train_rows': len(train_sample),
+            'test_rows': len(test_sample),
+            'exact_accuracy': float(np.mean(exact_pred == y_eval)),
+            'approx_accuracy': float(np.mean(approx_pred == y_eval)),
+            'agreement': float(np.mean(exact_pred == approx_pred)),
+            'exact_fit_seconds': fit_seconds,
+            'exact_support_vectors': int(exact.n_support_.sum())
+        }
+    
+    def _prefit_calibrator(self, estimator):
+        """Sigmoid calibration of an already fitted classifier"""
+        from sklearn.calibration import CalibratedClassifierCV
+        try:
+            # scikit-learn >= 1.6 calibrates fitted models through FrozenEstimator
+            from sklearn.frozen import FrozenEstimator
+            return CalibratedClassifierCV(FrozenEstimator(estimator), method='sigmoid')
+        except ImportError:
+            return CalibratedClassifierCV(estimator, method='sigmoid', cv='prefit')
+    
     def build_lstm_model(self, input_shape, num_classes):
         """Build LSTM model architecture"""
+        # TensorFlow is only needed to build and train; serving uses NumpyLSTMRuntime
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
+        
         model = Sequential([
             LSTM(128, return_sequences=True, input_shape=input_shape),
             Dropout(0.2),
@@ -99,6 +249,7 @@ class MLModelManager:
     def train_lstm(self, X_train, y_train, X_test, y_test, epochs=50):
         """Train LSTM model"""
         print("Training LSTM...")
+        tf = lazy_import('tensorflow')
         
         # Reshape data for LSTM
         X_train_lstm = X_train.reshape((X_train.shape[0], 1, X_train.shape[1]))
@@ -132,6 +283,7 @@ class MLModelManager:
         
         # Store model and performance
         self.models['lstm'] = lstm_model
+        self.compile_lstm(X_test_lstm[:256])
         self.model_performance['lstm'] = {
             'classification_report': classification_report(y_test, y_pred, output_dict=True),
             'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
@@ -147,6 +299,9 @@ class MLModelManager:
     
     def build_cnn_model(self, input_shape, num_classes):
         """Build CNN model for network traffic analysis"""
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense, Dropout, Conv1D, MaxPooling1D, Flatten
+        
         model = Sequential([
             Conv1D(64, 3, activation='relu', input_shape=input_shape),
             MaxPooling1D(2),
@@ -167,66 +322,315 @@ class MLModelManager:
         
         return model
     
-    def ensemble_predict(self, X):
-        """Make ensemble predictions using all trained models"""
-        predictions = {}
+    def compile_forest(self, model_name='random_forest'):
+        """Flatten a trained forest into node arrays for the low-latency evaluator"""
+        if model_name not in self.models:
+            return None
         
-        if 'random_forest' in self.models:
-            rf_pred = self.models['random_forest'].predict_proba(X)
-            predictions['random_forest'] = rf_pred
+        compiled = CompiledForest.from_sklearn(self.models[model_name])
+        self.compiled_models[model_name] = compiled
+        return compiled
+    
+    def compile_lstm(self, X_check=None):
+        """Export the Keras LSTM to the NumPy runtime, checking it against Keras on X_check"""
+        model = self.models.get('lstm')
+        if model is None or isinstance(model, NumpyLSTMRuntime):
+            return None
         
-        if 'svm' in self.models:
-            svm_pred = self.models['svm'].predict_proba(X)
-            predictions['svm'] = svm_pred
+        runtime = NumpyLSTMRuntime.from_keras(model)
+        if X_check is not None and len(X_check):
+            max_diff = runtime.verify(model, X_check)
+            print(f"NumPy LSTM runtime matches Keras (max abs diff {max_diff:.2e})")
         
-        if 'lstm' in self.models:
+        self.compiled_models['lstm'] = runtime
+        return runtime
+    
+    def predict_model(self, name, X):
+        """Class probabilities from a single ensemble member"""
+        if name == 'random_forest':
+            compiled = self.compiled_models.get('random_forest')
+            if compiled is not None and X.shape[0] <= self.compiled_max_batch:
+                return compiled.predict_proba(X)
+            return self.models['random_forest'].predict_proba(X)
+        
+        if name == 'lstm':
             X_lstm = X.reshape((X.shape[0], 1, X.shape[1]))
-            lstm_pred = self.models['lstm'].predict(X_lstm)
-            predictions['lstm'] = lstm_pred
+            runtime = self.compiled_models.get('lstm')
+            if runtime is not None:
+                return runtime.predict(X_lstm)
+            return self.models['lstm'].predict(X_lstm, verbose=0)
+        
+        return self.models[name].predict_proba(X)
+    
+    def set_ensemble_mode(self, mode='average', threshold=0.7, band=0.15):
+        """Choose plain averaging or the confidence-gated cascade"""
+        if mode not in ('average', 'cascade'):
+            raise ValueError(f"Unknown ensemble mode: {mode}")
+        self.ensemble_mode = mode
+        self.cascade_threshold = threshold
+        self.cascade_band = band
+    
+    def ensemble_predict(self, X, return_stages=False):
+        """Make ensemble predictions using all trained models"""
+        if self.ensemble_mode == 'cascade':
+            ensemble_pred, predictions, stages = self.cascade_predict(X)
+        else:
+            predictions = {}
+            
+            for name in self.ENSEMBLE_MODELS:
+                if name in self.models:
+                    predictions[name] = self.predict_model(name, X)
+            
+            # Ensemble averaging, weighted so partially trained members count for less
+            ensemble_pred = np.average(
+                list(predictions.values()),
+                axis=0,
+                weights=[self.member_weight(name) for name in predictions]
+            ) if predictions else None
+            stages = np.full(X.shape[0], len(predictions), dtype=int)
+        
+        if return_stages:
+            return ensemble_pred, predictions, stages
+        return ensemble_pred, predictions
+    
+    def member_weight(self, name):
+        """Weight of a member in the ensemble average; 1 unless the model sets ensemble_weight"""
+        return getattr(self.models[name], 'ensemble_weight', 1.0)
+    
+    def cascade_predict(self, X):
+        """Score with the cheapest model first and escalate only uncertain rows
+        
+        Returns the ensemble probabilities, per-model predictions (NaN rows where
+        a model did not run) and the number of cascade stages each row went through.
+        """
+        names = [name for name in self.ENSEMBLE_MODELS if name in self.models]
+        n_rows = X.shape[0]
+        stages = np.zeros(n_rows, dtype=int)
+        predictions = {}
         
-        # Ensemble averaging
-        if predictions:
-            ensemble_pred = np.mean(list(predictions.values()), axis=0)
-            return ensemble_pred, predictions
+        if not names:
+            return None, predictions, stages
+        
+        active = np.arange(n_rows)
+        total = None
+        weight_sum = np.zeros(n_rows, dtype=np.float64)
+        
+        for i, name in enumerate(names):
+            pred = np.asarray(self.predict_model(name, X[active]), dtype=np.float64)
+            
+            if total is None:
+                total = np.zeros((n_rows, pred.shape[1]), dtype=np.float64)
+            full = np.full((n_rows, pred.shape[1]), np.nan)
+            full[active] = pred
+            predictions[name] = full
+            weight = self.member_weight(name)
+            total[active] += weight * pred
+            weight_sum[active] += weight
+            stages[active] += 1
+            
+            with self._stats_lock:
+                self.cascade_stats[name]['rows'] += len(active)
+            
+            if i == len(names) - 1:
+                break
+            
+            # Escalate rows whose running confidence sits inside the band
+            confidence = np.max(total[active] / weight_sum[active, np.newaxis], axis=1)
+            uncertain = np.abs(confidence - self.cascade_threshold) <= self.cascade_band
+            active = active[uncertain]
+            
+            with self._stats_lock:
+                self.cascade_stats[name]['escalated'] += len(active)
+            
+            if not len(active):
+                break
+        
+        ensemble_pred = total / weight_sum[:, np.newaxis]
+        return ensemble_pred, predictions, stages
+    
+    def stages_run(self, stages, row):
+        """Names of the ensemble members that scored a given row"""
+        names = [name for name in self.ENSEMBLE_MODELS if name in self.models]
+        return names[:int(stages[row])]
+    
+    def row_predictions(self, predictions, row):
+        """Per-model probabilities for one row, skipping models the cascade did not run"""
+        return {
+            name: pred[row] for name, pred in predictions.items()
+            if not np.isnan(pred[row]).any()
+        }
+    
+    def get_cascade_stats(self):
+        """Rows scored and escalation rate for each cascade stage"""
+        with self._stats_lock:
+            return {
+                name: {
+                    'rows': counts['rows'],
+                    'escalated': counts['escalated'],
+                    'escalation_rate': counts['escalated'] / counts['rows'] if counts['rows'] else 0.0
+                }
+                for name, counts in self.cascade_stats.items()
+            }
+    
+    def get_explainer(self, model_name='random_forest'):
+        """Build the SHAP explainer for a model once and reuse it"""
+        if model_name not in self.models or model_name != 'random_forest':
+            return None
         
-        return None, predictions
+        with self._explain_lock:
+            if model_name not in self.explainers:
+                shap = lazy_import('shap')
+                self.explainers[model_name] = shap.TreeExplainer(self.models[model_name])
+            return self.explainers[model_name]
     
     def explain_prediction(self, X_sample, model_name='random_forest'):
         """Generate SHAP explanations for predictions"""
-        if model_name not in self.models:
+        explainer = self.get_explainer(model_name)
+        if explainer is None:
             return None
         
-        model = self.models[model_name]
-        
-        if model_name == 'random_forest':
-            explainer = shap.TreeExplainer(model)
-            shap_values = explainer.shap_values(X_sample)
-            return shap_values
+        return explainer.shap_values(X_sample)
+    
+    def explain_rows(self, X, model_name='random_forest'):
+        """Per-row SHAP values as lists, explaining uncached rows in one shap_values call
+        
+        Returns (explanations, number of rows served from the cache), or None if the
+        model cannot be explained.
+        """
+        explainer = self.get_explainer(model_name)
+        if explainer is None:
+            return None
         
-        return None
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        keys = [(model_name, hashlib.sha1(row.tobytes()).hexdigest()) for row in X]
+        explanations = [None] * len(keys)
+        missing = []
+        
+        with self._explain_lock:
+            for i, key in enumerate(keys):
+                cached = self.explanation_cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self.explanation_cache.move_to_end(key)
+                    explanations[i] = cached
+        
+        if missing:
+            shap_values = explainer.shap_values(X[missing])
+            
+            with self._explain_lock:
+                for j, i in enumerate(missing):
+                    # Older SHAP returns one array per class, newer one (rows, features, classes) array
+                    if isinstance(shap_values, list):
+                        row_values = [class_values[j].tolist() for class_values in shap_values]
+                    else:
+                        row_values = shap_values[j].tolist()
+                    
+                    explanations[i] = row_values
+                    self.explanation_cache[keys[i]] = row_values
+                
+                while len(self.explanation_cache) > self.explanation_cache_size:
+                    self.explanation_cache.popitem(last=False)
+        
+        return explanations, len(keys) - len(missing)
     
     def save_models(self, path):
         """Save all trained models"""
         for name, model in self.models.items():
-            if name in ['lstm', 'cnn']:
+            if isinstance(model, NumpyLSTMRuntime):
+                continue  # Saved with the compiled models below
+            elif name in ['lstm', 'cnn']:
                 model.save(f"{path}/{name}_model.h5")
             else:
                 joblib.dump(model, f"{path}/{name}_model.pkl")
         
+        for name, compiled in self.compiled_models.items():
+            compiled.source = self.source_fingerprint(path, name) or compiled.source
+            compiled.save(f"{path}/{name}_compiled.npz")
+        
         # Save performance metrics
         joblib.dump(self.model_performance, f"{path}/model_performance.pkl")
     
+    def source_fingerprint(self, path, name):
+        """Identity of the saved model a compiled artifact is built from (None if not saved)
+        
+        A hash of the model file, plus tree and node counts for forests, so a retrained
+        model deployed next to an old export is detected.
+        """
+        model_file = f"{path}/{name}_model.h5" if name in ('lstm', 'cnn') else f"{path}/{name}_model.pkl"
+        if not os.path.exists(model_file):
+            return None
+        
+        fingerprint = {'file': os.path.basename(model_file), 'sha256': file_digest(model_file)}
+        model = self.models.get(name)
+        if hasattr(model, 'estimators_'):
+            fingerprint['n_estimators'] = len(model.estimators_)
+            fingerprint['node_count'] = int(sum(tree.tree_.node_count for tree in model.estimators_))
+        return fingerprint
+    
+    def refresh_compiled(self, path, name, source):
+        """Rewrite a stale export next to its model; the model directory may be read-only"""
+        compiled = self.compiled_models[name]
+        compiled.source = source
+        try:
+            compiled.save(f"{path}/{name}_compiled.npz")
+        except OSError as e:
+            print(f"Could not refresh {name}_compiled.npz: {e}")
+    
     def load_models(self, path):
         """Load pre-trained models"""
-        import os
+        # Exports first, so each .h5 can be checked against its export before TensorFlow is needed
+        filenames = sorted(os.listdir(path), key=lambda name: not name.endswith('_compiled.npz'))
         
-        for filename in os.listdir(path):
+        for filename in filenames:
+            start = time.perf_counter()
+            
             if filename.endswith('.pkl') and 'model' in filename:
                 model_name = filename.replace('_model.pkl', '')
                 self.models[model_name] = joblib.load(f"{path}/{filename}")
             elif filename.endswith('.h5'):
                 model_name = filename.replace('_model.h5', '')
+                
+                # An exported runtime replaces the Keras model, so TensorFlow is never imported
+                compiled = self.compiled_models.get(model_name)
+                source = self.source_fingerprint(path, model_name) if compiled is not None else None
+                if compiled is not None and compiled.source == source:
+                    continue
+                
+                tf = lazy_import('tensorflow')
                 self.models[model_name] = tf.keras.models.load_model(f"{path}/{filename}")
+                
+                # A stale (or unfingerprinted) export is replaced by one from this model
+                if compiled is not None:
+                    print(f"{model_name}_compiled.npz does not match {filename}, re-exporting")
+                    del self.compiled_models[model_name]
+                    if model_name == 'lstm':
+                        self.compile_lstm()
+                        self.refresh_compiled(path, model_name, source)
+            elif filename.endswith('_compiled.npz'):
+                model_name = filename.replace('_compiled.npz', '')
+                if model_name not in COMPILED_TYPES:
+                    continue
+                self.compiled_models[model_name] = COMPILED_TYPES[model_name].load(f"{path}/{filename}")
+                model_name = f"{model_name}_compiled"
+            else:
+                continue
+            
+            self.load_times[model_name] = time.perf_counter() - start
+        
+        # The NumPy runtime stands in for a Keras model that was not loaded
+        if 'lstm' in self.compiled_models and 'lstm' not in self.models:
+            self.models['lstm'] = self.compiled_models['lstm']
+        
+        # Compile forests saved without an export, or whose export came from another forest
+        if 'random_forest' in self.models:
+            source = self.source_fingerprint(path, 'random_forest')
+            compiled = self.compiled_models.get('random_forest')
+            if compiled is None or compiled.source != source:
+                if compiled is not None:
+                    print("random_forest_compiled.npz does not match random_forest_model.pkl, recompiling")
+                self.compile_forest()
+                self.refresh_compiled(path, 'random_forest', source)
         
         # Load performance metrics
         perf_path = f"{path}/model_performance.pkl"
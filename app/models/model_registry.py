@@ -0,0 +1,201 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import psutil
+from app.models.ml_models import MLModelManager
+from app.utils.data_processor import DataProcessor
+
+
+def version_key(version):
+    """Natural sort key, so v10 orders after v9 and 2024-10 after 2024-9"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part)
+            for part in re.split(r'(\d+)', version) if part]
+
+
+class ModelSet:
+    """One loaded, immutable version of the models and their preprocessor"""
+
+    def __init__(self, version, path, model_manager, data_processor):
+        self.version = version
+        self.path = path
+        self.model_manager = model_manager
+        self.data_processor = data_processor
+        self.loaded_at = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.rss_delta_bytes = None
+        self.disk_bytes = None
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'models': [name for name in self.model_manager.models if name in MLModelManager.ENSEMBLE_MODELS],
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'model_load_seconds': dict(self.model_manager.load_times),
+            'rss_delta_bytes': self.rss_delta_bytes,
+            'disk_bytes': self.disk_bytes
+        }
+
+
+class ModelRegistry:
+    """Versioned model sets under MODEL_PATH/<version>/ with background loading and atomic swaps"""
+
+    def __init__(self, base_path, ensemble_settings=None, smoke_rows=32, keep_loaded=2):
+        self.base_path = base_path
+        self.ensemble_settings = ensemble_settings or {}
+        self.smoke_rows = smoke_rows
+        self.keep_loaded = keep_loaded
+
+        # Readers take a reference to the active set once per batch; swapping is one assignment
+        self.active = None
+        self.previous = None
+
+        self.loaded = OrderedDict()
+        self.loading = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+
+    def available_versions(self):
+        """Version directories on disk in natural order; a flat MODEL_PATH is exposed as 'default'"""
+        if not os.path.isdir(self.base_path):
+            return []
+
+        versions = sorted(
+            (entry for entry in os.listdir(self.base_path)
+             if os.path.isdir(os.path.join(self.base_path, entry))),
+            key=version_key
+        )
+        if not versions:
+            return ['default']
+        return versions
+
+    def version_path(self, version):
+        if version == 'default':
+            return self.base_path
+        return os.path.join(self.base_path, version)
+
+    def load(self, version, activate=True):
+        """Load, warm up and validate a version on the calling thread"""
+        path = self.version_path(version)
+        if not os.path.isdir(path):
+            raise ValueError(f"Model version not found: {version}")
+
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+
+        model_manager = MLModelManager()
+        data_processor = DataProcessor()
+        model_manager.load_models(path)
+        data_processor.load_preprocessor(os.path.join(path, 'preprocessor.pkl'))
+        if self.ensemble_settings:
+            model_manager.set_ensemble_mode(**self.ensemble_settings)
+
+        model_set = ModelSet(version, path, model_manager, data_processor)
+        model_set.load_seconds = time.perf_counter() - start
+
+        warmup_start = time.perf_counter()
+        self.smoke_test(model_set)
+        model_set.warmup_seconds = time.perf_counter() - warmup_start
+
+        model_set.loaded_at = datetime.now()
+        model_set.rss_delta_bytes = process.memory_info().rss - rss_before
+        model_set.disk_bytes = sum(
+            os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+            if os.path.isfile(os.path.join(path, name))
+        )
+
+        with self._lock:
+            self.loaded[version] = model_set
+            self.loaded.move_to_end(version)
+            self.failures.pop(version, None)
+
+        if activate:
+            self.activate(version)
+
+        return model_set
+
+    def load_async(self, version, activate=True):
+        """Load a version on a background thread; returns False if it is already loading"""
+        with self._lock:
+            if version in self.loading:
+                return False
+            thread = threading.Thread(target=self._load_in_background, args=(version, activate))
+            thread.daemon = True
+            self.loading[version] = thread
+
+        thread.start()
+        return True
+
+    def _load_in_background(self, version, activate):
+        try:
+            self.load(version, activate)
+        except Exception as e:
+            print(f"Error loading model version {version}: {e}")
+            with self._lock:
+                self.failures[version] = str(e)
+        finally:
+            with self._lock:
+                self.loading.pop(version, None)
+
+    def smoke_test(self, model_set):
+        """Warm up every model on a small batch and check the outputs are usable probabilities"""
+        vectorizer = model_set.data_processor.compile_vectorizer(batch_size=self.smoke_rows)
+        X = vectorizer.transform_records([{}] * self.smoke_rows)
+
+        ensemble_pred, predictions = model_set.model_manager.ensemble_predict(X)
+        if ensemble_pred is None:
+            raise ValueError("Smoke test failed: no models produced predictions")
+        if ensemble_pred.shape[0] != self.smoke_rows or not np.all(np.isfinite(ensemble_pred)):
+            raise ValueError("Smoke test failed: invalid ensemble output")
+        if not np.allclose(ensemble_pred.sum(axis=1), 1.0, atol=1e-3):
+            raise ValueError("Smoke test failed: probabilities do not sum to 1")
+
+    def activate(self, version):
+        """Atomically make a loaded version active; in-flight calls finish on the old set"""
+        with self._lock:
+            model_set = self.loaded.get(version)
+            if model_set is None:
+                raise ValueError(f"Model version not loaded: {version}")
+
+            if self.active is not model_set:
+                self.previous = self.active
+                self.active = model_set
+
+            self._evict()
+        return model_set
+
+    def rollback(self):
+        """Swap back to the previously active version, which is kept loaded"""
+        with self._lock:
+            if self.previous is None:
+                return None
+            self.active, self.previous = self.previous, self.active
+            return self.active
+
+    def _evict(self):
+        # Keep the active and previous sets; drop the oldest others beyond keep_loaded
+        pinned = {id(self.active), id(self.previous)}
+        for version in list(self.loaded):
+            if len(self.loaded) <= self.keep_loaded:
+                break
+            if id(self.loaded[version]) not in pinned:
+                del self.loaded[version]
+
+    def get_status(self):
+        with self._lock:
+            return {
+                'active': self.active.version if self.active else None,
+                'previous': self.previous.version if self.previous else None,
+                'loaded': [model_set.describe() for model_set in self.loaded.values()],
+                'loading': list(self.loading),
+                'failures': dict(self.failures),
+                'available': self.available_versions()
+            }
@@ -0,0 +1,202 @@
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import joblib
+import numpy as np
+
+DATASET_FILES = ('X_train', 'y_train', 'X_test', 'y_test')
+
+
+def _apply_limits(cpus, memory_mb):
+    """Pin the job to its cores, size thread pools to them, and cap its heap"""
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    n_threads = len(cpus) if cpus else os.cpu_count()
+    os.environ['OMP_NUM_THREADS'] = str(n_threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(n_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+
+    if memory_mb:
+        # RLIMIT_DATA covers malloc and anonymous mmap, so oversized arrays raise MemoryError
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    return n_threads
+
+
+def _train_job(name, dataset_dir, output_dir, cpus, memory_mb, options):
+    """Process-pool job: train one model on the shared dataset and checkpoint it"""
+    start = time.perf_counter()
+    n_threads = _apply_limits(cpus, memory_mb)
+
+    from app.models.ml_models import MLModelManager
+
+    # Memory-mapped, so concurrent jobs share one copy in the page cache
+    X_train, y_train, X_test, y_test = (
+        np.load(os.path.join(dataset_dir, f"{part}.npy"), mmap_mode='r') for part in DATASET_FILES
+    )
+
+    model_manager = MLModelManager()
+    if name == 'random_forest':
+        model_manager.train_random_forest(X_train, y_train, X_test, y_test, balance=False, n_jobs=n_threads)
+    elif name == 'svm':
+        model_manager.train_svm(X_train, y_train, X_test, y_test, **options.get('svm', {}))
+    elif name == 'lstm':
+        model_manager.train_lstm(
+            np.asarray(X_train), np.asarray(y_train), np.asarray(X_test), np.asarray(y_test),
+            epochs=options.get('epochs', 50)
+        )
+    else:
+        raise ValueError(f"Unknown model: {name}")
+
+    model_manager.save_models(output_dir)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'performance': model_manager.model_performance[name],
+        'wall_seconds': time.perf_counter() - start,
+        'cpu_seconds': usage.ru_utime + usage.ru_stime,
+        'peak_rss_mb': usage.ru_maxrss / 1024.0,  # kilobytes on Linux
+        'threads': n_threads
+    }
+
+
+class TrainingOrchestrator:
+    """Trains independent models concurrently in a process pool with per-job CPU and memory caps
+
+    The balanced training set is written once as .npy files that every job memory-maps.
+    Each finished model is saved and checkpointed straight away, so a later failure keeps
+    the models that already finished, and resume=True skips them on the next run.
+    """
+
+    def __init__(self, output_dir, max_jobs=3, cpus_per_job=None, memory_mb_per_job=None,
+                 resume=False, options=None):
+        self.output_dir = output_dir
+        self.checkpoint_dir = os.path.join(output_dir, 'checkpoints')
+        self.dataset_dir = os.path.join(output_dir, '.dataset')
+        self.max_jobs = max_jobs
+        self.memory_mb_per_job = memory_mb_per_job
+        self.resume = resume
+        self.options = options or {}
+
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+        self.cpus_per_job = cpus_per_job or max(1, len(cores) // max(1, max_jobs))
+        # Disjoint core sets; jobs beyond the available cores share the last ones
+        self.core_slices = [
+            cores[i * self.cpus_per_job:(i + 1) * self.cpus_per_job] or cores[-self.cpus_per_job:]
+            for i in range(max_jobs)
+        ]
+
+        self.report = {}
+
+    def prepare_dataset(self, X_train, y_train, X_test, y_test):
+        """Write the shared dataset the jobs read"""
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        for part, array in zip(DATASET_FILES, (X_train, y_train, X_test, y_test)):
+            np.save(os.path.join(self.dataset_dir, f"{part}.npy"), np.ascontiguousarray(array))
+
+    def checkpoint_path(self, name):
+        return os.path.join(self.checkpoint_dir, f"{name}.pkl")
+
+    def completed(self, name):
+        return os.path.exists(self.checkpoint_path(name))
+
+    def run(self, models):
+        """Train models concurrently; returns the per-model report"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+        pending = []
+        for name in models:
+            if self.resume and self.completed(name):
+                print(f"{name}: checkpoint found, skipping")
+                self.report[name] = dict(joblib.load(self.checkpoint_path(name))['report'], status='resumed')
+            else:
+                pending.append(name)
+
+        free_slices = list(range(self.max_jobs))
+        running = {}
+
+        # One task per worker process so peak RSS, limits and affinity are per model
+        with ProcessPoolExecutor(
+            max_workers=self.max_jobs,
+            mp_context=multiprocessing.get_context('spawn'),
+            max_tasks_per_child=1
+        ) as pool:
+            while pending or running:
+                while pending and free_slices:
+                    name = pending.pop(0)
+                    slot = free_slices.pop(0)
+                    cpus = self.core_slices[slot]
+                    print(f"{name}: starting on cores {cpus}")
+                    try:
+                        future = pool.submit(
+                            _train_job, name, self.dataset_dir, self.output_dir,
+                            cpus, self.memory_mb_per_job, self.options
+                        )
+                    except BrokenProcessPool as e:
+                        # A worker was killed (e.g. by the OOM killer); finished checkpoints stay
+                        self.report[name] = {'status': 'failed', 'error': f"process pool broken: {e}",
+                                             'cpus': list(cpus), 'wall_seconds': 0.0}
+                        free_slices.append(slot)
+                        continue
+                    running[future] = (name, slot, cpus, time.perf_counter())
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, slot, cpus, started = running.pop(future)
+                    free_slices.append(slot)
+                    self._finish(name, future, cpus, started)
+
+        self.write_report()
+
+        # The shared copy is only kept for resuming after a failure
+        if all(entry['status'] != 'failed' for entry in self.report.values()):
+            shutil.rmtree(self.dataset_dir, ignore_errors=True)
+        return self.report
+
+    def _finish(self, name, future, cpus, started):
+        entry = {'cpus': list(cpus), 'memory_limit_mb': self.memory_mb_per_job}
+        try:
+            result = future.result()
+        except Exception as e:
+            entry.update({
+                'status': 'failed',
+                'error': ''.join(traceback.format_exception_only(type(e), e)).strip(),
+                'wall_seconds': time.perf_counter() - started
+            })
+            print(f"{name}: failed after {entry['wall_seconds']:.1f}s: {entry['error']}")
+            self.report[name] = entry
+            return
+
+        entry.update({key: value for key, value in result.items() if key != 'performance'})
+        entry['status'] = 'done'
+        entry['accuracy'] = result['performance']['classification_report']['accuracy']
+        joblib.dump({'performance': result['performance'], 'report': entry}, self.checkpoint_path(name))
+        print(f"{name}: done in {entry['wall_seconds']:.1f}s, peak RSS {entry['peak_rss_mb']:.0f} MB")
+        self.report[name] = entry
+
+    def performance(self):
+        """Performance of every checkpointed model, as MLModelManager.model_performance"""
+        performance = {}
+        if os.path.isdir(self.checkpoint_dir):
+            for filename in sorted(os.listdir(self.checkpoint_dir)):
+                if filename.endswith('.pkl'):
+                    performance[filename[:-4]] = joblib.load(os.path.join(self.checkpoint_dir, filename))['performance']
+        return performance
+
+    def write_report(self):
+        """Save training_report.json and the merged model_performance.pkl"""
+        with open(os.path.join(self.output_dir, 'training_report.json'), 'w') as f:
+            json.dump(self.report, f, indent=2, default=float)
+        joblib.dump(self.performance(), os.path.join(self.output_dir, 'model_performance.pkl'))
@@ -1,38 +1,73 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from app.models.ml_models import MLModelManager
 from app.utils.data_processor import DataProcessor
 from app.utils.threat_analyzer import RealTimeThreatAnalyzer
+from app.utils.startup_report import startup_report
+from app.models.model_registry import ModelRegistry
+from app.utils.explanation_service import ExplanationService
 import numpy as np
 import pandas as pd
 from datetime import datetime
 import threading
+import json
+import io
+import os
 
 api_bp = Blueprint('api', __name__)
 
 # Global instances (in production, use proper dependency injection)
-model_manager = None
-data_processor = None
+model_registry = None
 threat_analyzer = None
+explanation_service = None
+_init_lock = threading.Lock()
 
-def initialize_components():
-    global model_manager, data_processor, threat_analyzer
+def initialize_components(app=None):
+    """Load models once per process; called from create_app when PRELOAD_MODELS is set"""
+    global model_registry, threat_analyzer, explanation_service
     
-    if model_manager is None:
-        model_manager = MLModelManager()
-        data_processor = DataProcessor()
+    if threat_analyzer is not None:
+        return
+    
+    app_config = (app or current_app).config
+    
+    with _init_lock:
+        if threat_analyzer is not None:
+            return
+        
+        registry = ModelRegistry(
+            app_config['MODEL_PATH'],
+            ensemble_settings={
+                'mode': app_config.get('ENSEMBLE_MODE', 'average'),
+                'threshold': app_config['PREDICTION_THRESHOLD'],
+                'band': app_config.get('CASCADE_BAND', 0.15)
+            }
+        )
         
         # Load pre-trained models if available
         try:
-            model_manager.load_models(current_app.config['MODEL_PATH'])
-            data_processor.load_preprocessor(
-                f"{current_app.config['MODEL_PATH']}/preprocessor.pkl"
-            )
+            versions = registry.available_versions()
+            version = app_config.get('MODEL_VERSION') or (versions[-1] if versions else 'default')
+            
+            with startup_report.timed(f'models ({version})', 'load'):
+                model_set = registry.load(version)
+            for name, seconds in model_set.model_manager.load_times.items():
+                startup_report.record(name, 'load', seconds)
         except Exception as e:
             print(f"Warning: Could not load pre-trained models: {e}")
         
-        threat_analyzer = RealTimeThreatAnalyzer(
-            model_manager, data_processor, current_app.config
+        # Empty fallbacks are used until a model version is activated
+        analyzer = RealTimeThreatAnalyzer(MLModelManager(), DataProcessor(), app_config)
+        analyzer.registry = registry
+        
+        explanation_service = ExplanationService(
+            max_workers=app_config.get('EXPLAIN_WORKERS', 2),
+            max_jobs=app_config.get('EXPLAIN_MAX_JOBS', 1000)
         )
+        
+        model_registry = registry
+        threat_analyzer = analyzer
+        
+        startup_report.print_report()
 
 @api_bp.before_request
 def before_request():
@@ -48,9 +83,12 @@ def predict_threat():
             return jsonify({'error': 'Features not provided'}), 400
         
         features = np.array(data['features']).reshape(1, -1)
+        model_manager, _ = threat_analyzer.current_models()
         
         # Make ensemble prediction
-        ensemble_pred, individual_preds = model_manager.ensemble_predict(features)
+        ensemble_pred, individual_preds, stages = model_manager.ensemble_predict(
+            features, return_stages=True
+        )
         
         if ensemble_pred is None:
             return jsonify({'error': 'No models available for prediction'}), 500
@@ -64,11 +102,12 @@ def predict_threat():
             'threat_type': threat_analyzer.get_threat_type(predicted_class),
             'confidence': float(max_prob),
             'timestamp': datetime.now().isoformat(),
+            'stages': model_manager.stages_run(stages, 0),
             'predictions': {
                 'ensemble': ensemble_pred[0].tolist(),
                 'individual': {
-                    name: pred[0].tolist() 
-                    for name, pred in individual_preds.items()
+                    name: pred.tolist() 
+                    for name, pred in model_manager.row_predictions(individual_preds, 0).items()
                 }
             }
         }
@@ -78,6 +117,144 @@ def predict_threat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _rechunk(matrices, chunk_size):
+    """Regroup a stream of 2-D arrays into chunks of at most chunk_size rows"""
+    pending = []
+    pending_rows = 0
+    
+    for matrix in matrices:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        
+        while len(matrix):
+            take = min(chunk_size - pending_rows, len(matrix))
+            pending.append(matrix[:take])
+            pending_rows += take
+            matrix = matrix[take:]
+            
+            if pending_rows == chunk_size:
+                yield np.concatenate(pending)
+                pending = []
+                pending_rows = 0
+    
+    if pending:
+        yield np.concatenate(pending)
+
+def _ndjson_rows(stream):
+    """Parse NDJSON lines holding either a feature list or {"features": [...]}"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        if isinstance(row, dict):
+            row = row['features']
+        yield row
+
+def _arrow_batches(pa, stream, mimetype):
+    """Yield feature matrices from an Arrow IPC stream or file body"""
+    if mimetype == 'application/vnd.apache.arrow.file':
+        reader = pa.ipc.open_file(io.BytesIO(stream.read()))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = pa.ipc.open_stream(stream)
+    
+    for batch in batches:
+        yield np.column_stack([
+            column.to_numpy(zero_copy_only=False) for column in batch.columns
+        ])
+
+def _feature_chunks(chunk_size):
+    """Build a chunk iterator for the request body based on its content type"""
+    mimetype = request.mimetype
+    
+    if mimetype == 'application/json':
+        data = request.get_json()
+        if 'features' not in data:
+            raise ValueError('Features not provided')
+        return _rechunk([data['features']], chunk_size)
+    
+    if mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        rows = _ndjson_rows(request.stream)
+        return _rechunk(([row] for row in rows), chunk_size)
+    
+    if mimetype in ('application/x-npy', 'application/octet-stream'):
+        matrix = np.load(io.BytesIO(request.get_data()), allow_pickle=False)
+        return _rechunk([matrix], chunk_size)
+    
+    if mimetype in ('application/vnd.apache.arrow.stream', 'application/vnd.apache.arrow.file'):
+        # Optional dependency; imported here, before streaming starts, so its absence is a 415
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise TypeError(f'{mimetype} bodies need pyarrow, which is not installed')
+        return _rechunk(_arrow_batches(pa, request.stream, mimetype), chunk_size)
+    
+    raise TypeError(f'Unsupported content type: {mimetype}')
+
+@api_bp.route('/predict/batch', methods=['POST'])
+def predict_threat_batch():
+    """Bulk threat prediction, streamed back as NDJSON one chunk at a time"""
+    compact = request.args.get('compact', 'false').lower() in ('1', 'true', 'yes')
+    chunk_size = request.args.get(
+        'chunk_size', current_app.config.get('PREDICT_CHUNK_SIZE', 1000), type=int
+    )
+    
+    try:
+        chunks = _feature_chunks(max(chunk_size, 1))
+    except TypeError as e:
+        return jsonify({'error': str(e)}), 415
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # The whole request is scored by the model set active when it arrived
+    model_manager, _ = threat_analyzer.current_models()
+    
+    def generate():
+        try:
+            for X in chunks:
+                ensemble_pred, individual_preds, stages = model_manager.ensemble_predict(
+                    X, return_stages=True
+                )
+                
+                if ensemble_pred is None:
+                    yield json.dumps({'error': 'No models available for prediction'}) + '\n'
+                    return
+                
+                predicted_classes = np.argmax(ensemble_pred, axis=1)
+                confidences = np.max(ensemble_pred, axis=1)
+                
+                lines = []
+                for i, predicted_class in enumerate(predicted_classes):
+                    if compact:
+                        result = {
+                            'class': int(predicted_class),
+                            'confidence': float(confidences[i])
+                        }
+                    else:
+                        result = {
+                            'threat_detected': bool(predicted_class > 0),
+                            'threat_type': threat_analyzer.get_threat_type(predicted_class),
+                            'confidence': float(confidences[i]),
+                            'stages': model_manager.stages_run(stages, i),
+                            'predictions': {
+                                'ensemble': ensemble_pred[i].tolist(),
+                                'individual': {
+                                    name: pred.tolist()
+                                    for name, pred in model_manager.row_predictions(individual_preds, i).items()
+                                }
+                            }
+                        }
+                    lines.append(json.dumps(result))
+                
+                yield '\n'.join(lines) + '\n'
+                
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @api_bp.route('/start-monitoring', methods=['POST'])
 def start_monitoring():
     """Start real-time network monitoring"""
@@ -117,44 +294,255 @@ def stop_monitoring():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/replay', methods=['POST'])
+def replay_pcap():
+    """Start replaying a pcap/pcapng file from PCAP_PATH through the live analyzer"""
+    try:
+        data = request.get_json() or {}
+        
+        if 'file' not in data:
+            return jsonify({'error': 'File not provided'}), 400
+        
+        # Only files inside the configured capture directory may be replayed
+        pcap_dir = os.path.realpath(current_app.config['PCAP_PATH'])
+        path = os.path.realpath(os.path.join(pcap_dir, data['file']))
+        if os.path.commonpath([pcap_dir, path]) != pcap_dir or not os.path.isfile(path):
+            return jsonify({'error': 'Capture file not found'}), 404
+        
+        # "original" keeps capture timing, a number speeds it up, "max" disables pacing
+        speed = data.get('speed', 'max')
+        if speed == 'original':
+            speed = 1.0
+        elif speed == 'max':
+            speed = None
+        else:
+            speed = float(speed)
+        
+        # Runs in the background: at original speed a long capture outlasts any request
+        job_id = threat_analyzer.start_replay(path, speed)
+        
+        if job_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Live monitoring or another replay is running'
+            }), 409
+        
+        return jsonify({'status': 'running', 'job_id': job_id}), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/replay/jobs/<job_id>')
+def get_replay_job(job_id):
+    """Get the status and throughput report of a pcap replay"""
+    job = threat_analyzer.get_replay_job(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
+
 @api_bp.route('/threats/recent')
 def get_recent_threats():
     """Get recent threat detections"""
     try:
         limit = request.args.get('limit', 50, type=int)
-        threats = threat_analyzer.get_recent_threats(limit)
+        filters = {
+            name: request.args.get(name)
+            for name in ('threat_type', 'source_ip', 'destination_ip')
+            if request.args.get(name)
+        }
+        since = request.args.get('since')
+        if since:
+            filters['since'] = datetime.fromisoformat(since)
+        
+        threats, next_cursor = threat_analyzer.get_recent_threats(
+            min(limit, 1000),
+            request.args.get('cursor', type=int),
+            **filters
+        )
         
         return jsonify({
             'threats': threats,
-            'count': len(threats)
+            'count': len(threats),
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/threats/<int:alert_id>')
+def get_threat(alert_id):
+    """Get one stored alert with its features and model predictions"""
+    try:
+        alert = threat_analyzer.alert_store.get_alert(alert_id)
+        
+        if alert is None:
+            return jsonify({'error': 'Alert not found'}), 404
+        
+        if alert.get('evidence_id'):
+            alert['evidence'] = threat_analyzer.get_evidence(alert['evidence_id'])
+        
+        return jsonify(alert)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/threats/<int:alert_id>/feedback', methods=['POST'])
+def submit_threat_feedback(alert_id):
+    """Mark an alert as a true or false positive"""
+    try:
+        data = request.get_json() or {}
+        
+        if 'verdict' not in data:
+            return jsonify({'error': 'verdict not provided'}), 400
+        
+        result = threat_analyzer.record_feedback(alert_id, data['verdict'], data.get('threat_type'))
+        
+        if result is None:
+            return jsonify({'error': 'Alert not found'}), 404
+        
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/threats/<int:alert_id>/pcap')
+def get_threat_pcap(alert_id):
+    """Download the packets captured around an alert as a pcap file"""
+    try:
+        alert = threat_analyzer.alert_store.get_alert(alert_id)
+        
+        if alert is None:
+            return jsonify({'error': 'Alert not found'}), 404
+        if not alert.get('evidence_id') or threat_analyzer.forensics is None:
+            return jsonify({'error': 'No evidence recorded for this alert'}), 404
+        
+        data = threat_analyzer.forensics.writer.read_evidence(alert['evidence_id'])
+        if data is None:
+            # Still inside the post-trigger window, dropped, or rotated away
+            return jsonify({'error': 'Evidence not available'}), 404
+        
+        return Response(
+            data,
+            mimetype='application/vnd.tcpdump.pcap',
+            headers={'Content-Disposition': f"attachment; filename=alert-{alert_id}.pcap"}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/stats')
 def get_system_stats():
     """Get system statistics"""
     try:
         stats = threat_analyzer.get_system_stats()
         threat_summary = threat_analyzer.get_threat_summary()
+        top_k = request.args.get('top', type=int)
         
         return jsonify({
             'system_stats': stats,
             'threat_summary': threat_summary,
+            'threat_rollups': threat_analyzer.get_threat_rollups(top_k),
             'monitoring_active': threat_analyzer.monitoring_active
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/traffic')
+def get_traffic_summary():
+    """Get packet rates, protocol mix and top talkers over the last N seconds"""
+    try:
+        seconds = request.args.get('seconds', 60, type=float)
+        top_k = request.args.get('top', 10, type=int)
+        
+        return jsonify({
+            'seconds': seconds,
+            'summary': threat_analyzer.packet_buffer.summary(seconds, top_k=top_k),
+            'buffer': threat_analyzer.packet_buffer.get_stats()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/startup')
+def get_startup_report():
+    """Get import and model-load timings for this process"""
+    return jsonify(startup_report.as_dict())
+
+@api_bp.route('/models')
+def get_model_versions():
+    """Get loaded model versions, their load times and memory footprint"""
+    return jsonify(model_registry.get_status())
+
+@api_bp.route('/models/load', methods=['POST'])
+def load_model_version():
+    """Load a model version in the background and activate it once validated"""
+    try:
+        data = request.get_json() or {}
+        
+        if 'version' not in data:
+            return jsonify({'error': 'Version not provided'}), 400
+        
+        if data['version'] not in model_registry.available_versions():
+            return jsonify({'error': f"Model version not found: {data['version']}"}), 404
+        
+        started = model_registry.load_async(data['version'], activate=data.get('activate', True))
+        
+        return jsonify({
+            'status': 'loading' if started else 'already_loading',
+            'version': data['version']
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/models/activate', methods=['POST'])
+def activate_model_version():
+    """Swap in an already loaded model version"""
+    try:
+        data = request.get_json() or {}
+        
+        if 'version' not in data:
+            return jsonify({'error': 'Version not provided'}), 400
+        
+        model_set = model_registry.activate(data['version'])
+        
+        return jsonify({'status': 'success', 'active': model_set.version})
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/models/rollback', methods=['POST'])
+def rollback_model_version():
+    """Swap back to the previously active model version"""
+    try:
+        model_set = model_registry.rollback()
+        
+        if model_set is None:
+            return jsonify({'error': 'No previous model version to roll back to'}), 400
+        
+        return jsonify({'status': 'success', 'active': model_set.version})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/model/performance')
 def get_model_performance():
     """Get model performance metrics"""
     try:
+        model_manager, _ = threat_analyzer.current_models()
+        
         return jsonify({
             'performance': model_manager.model_performance,
-            'available_models': list(model_manager.models.keys())
+            'available_models': list(model_manager.models.keys()),
+            'ensemble_mode': model_manager.ensemble_mode,
+            'cascade': model_manager.get_cascade_stats()
         })
         
     except Exception as e:
@@ -170,16 +558,60 @@ def explain_prediction(model_name):
             return jsonify({'error': 'Features not provided'}), 400
         
         features = np.array(data['features']).reshape(1, -1)
+        model_manager, data_processor = threat_analyzer.current_models()
+        
+        result = model_manager.explain_rows(features, model_name)
+        
+        if result is None:
+            return jsonify({'error': 'Model not available or explanation not supported'}), 400
+        
+        explanations, cached = result
         
-        shap_values = model_manager.explain_prediction(features, model_name)
+        return jsonify({
+            'shap_values': explanations[0],
+            'cached': bool(cached),
+            'feature_names': data_processor.feature_columns
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/explain/<model_name>/batch', methods=['POST'])
+def explain_batch(model_name):
+    """Explain many rows in one SHAP call, or queue them with "async": true"""
+    try:
+        data = request.get_json()
         
-        if shap_values is None:
+        if 'features' not in data:
+            return jsonify({'error': 'Features not provided'}), 400
+        
+        features = np.atleast_2d(np.array(data['features'], dtype=np.float64))
+        model_manager, data_processor = threat_analyzer.current_models()
+        
+        if model_manager.get_explainer(model_name) is None:
             return jsonify({'error': 'Model not available or explanation not supported'}), 400
         
+        if data.get('async'):
+            job_id = explanation_service.submit(model_manager, model_name, features)
+            return jsonify({'status': 'queued', 'job_id': job_id}), 202
+        
+        explanations, cached = model_manager.explain_rows(features, model_name)
+        
         return jsonify({
-            'shap_values': shap_values.tolist() if hasattr(shap_values, 'tolist') else shap_values,
+            'explanations': explanations,
+            'cached': cached,
             'feature_names': data_processor.feature_columns
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/explain/jobs/<job_id>')
+def get_explanation_job(job_id):
+    """Get the status and result of a queued explanation job"""
+    job = explanation_service.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
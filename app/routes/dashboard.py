@@ -1,11 +1,19 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_socketio import emit
 from app import socketio
+from app.utils.telemetry import TelemetryBroadcaster
 import json
 from datetime import datetime, timedelta
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+def _current_analyzer():
+    from app.routes import api
+    return api.threat_analyzer
+
+# One sampler per process pushes telemetry to every subscribed dashboard
+telemetry = TelemetryBroadcaster(socketio, _current_analyzer)
+
 @dashboard_bp.route('/')
 def dashboard_home():
     return render_template('dashboard.html')
@@ -26,14 +34,23 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected from dashboard')
+    telemetry.unsubscribe(request.sid)
+
+@socketio.on('subscribe_telemetry')
+def handle_subscribe_telemetry():
+    # Started on first subscriber so a preloading master never runs the loop before forking
+    telemetry.start(
+        interval=current_app.config.get('TELEMETRY_INTERVAL', 1.0),
+        threat_batch=current_app.config.get('TELEMETRY_THREAT_BATCH', 50),
+        max_lag=current_app.config.get('TELEMETRY_MAX_LAG', 5)
+    )
+    telemetry.subscribe(request.sid)
+
+@socketio.on('telemetry_ack')
+def handle_telemetry_ack(data):
+    telemetry.acknowledge(request.sid, (data or {}).get('seq', 0))
 
 @socketio.on('request_stats')
 def handle_stats_request():
-    # This would be called periodically to update dashboard
-    emit('stats_update', {
-        'timestamp': datetime.now().isoformat(),
-        'threats_detected': 42,
-        'packets_analyzed': 15847,
-        'system_load': 23.5,
-        'memory_usage': 67.2
-    })
+    # Last sampled snapshot; live updates come from subscribe_telemetry
+    emit('stats_update', dict(telemetry.current_snapshot(), timestamp=datetime.now().isoformat()))
@@ -7,6 +7,7 @@ class DashboardManager {
         this.sidebarCollapsed = localStorage.getItem('sidebarCollapsed') === 'true';
         this.monitoringActive = false;
         this.notifications = [];
+        this.recentThreats = [];
         
         this.init();
     }
@@ -354,6 +355,7 @@ class DashboardManager {
             const data = await response.json();
             
             if (data.threats) {
+                this.recentThreats = data.threats;
                 this.updateThreatsList(data.threats);
             }
         } catch (error) {
@@ -387,7 +389,7 @@ class DashboardManager {
                     <i class="fas fa-exclamation-triangle"></i>
                 </div>
                 <div class="threat-details">
-                    <div class="threat-type">${threat.threat_type}</div>
+                    <div class="threat-type">${threat.threat_type}${threat.count > 1 ? ` ×${threat.count}` : ''}</div>
                     <div class="threat-source">From: ${threat.source_ip}</div>
                 </div>
                 <div class="threat-time">${this.formatTime(threat.timestamp)}</div>
@@ -439,6 +441,35 @@ class DashboardManager {
         }
     }
     
+    handleThreatBatch(batch) {
+        const threats = batch.threats || [];
+        if (threats.length === 0) return;
+        
+        // Keep the list current from pushed batches instead of refetching
+        this.recentThreats = this.recentThreats.concat(threats).slice(-10);
+        this.updateThreatsList(this.recentThreats);
+        
+        const latest = threats[threats.length - 1];
+        const strongest = threats.reduce((a, b) => (b.confidence > a.confidence ? b : a));
+        
+        this.addNotification({
+            type: 'threat',
+            title: batch.count > 1 ? `${batch.count} Threats Detected` : `New ${latest.threat_type} Detected`,
+            message: `Highest confidence: ${(strongest.confidence * 100).toFixed(1)}%`,
+            timestamp: new Date().toISOString(),
+            severity: this.getThreatSeverity(strongest.confidence)
+        });
+        
+        if (strongest.confidence > 0.8) {
+            this.showToast({
+                type: 'warning',
+                title: 'High-Risk Threat Detected',
+                message: `${strongest.threat_type} with ${(strongest.confidence * 100).toFixed(1)}% confidence`,
+                duration: 5000
+            });
+        }
+    }
+    
     addNotification(notification) {
         this.notifications.unshift(notification);
         
@@ -582,21 +613,8 @@ class DashboardManager {
     }
     
     startDataRefresh() {
-        // Refresh stats every 5 seconds
-        setInterval(async () => {
-            try {
-                const response = await fetch('/api/stats');
-                const data = await response.json();
-                this.updateStats(data.system_stats);
-            } catch (error) {
-                console.error('Error fetching stats:', error);
-            }
-        }, 5000);
-        
-        // Refresh threats every 10 seconds
-        setInterval(() => {
-            this.refreshThreats();
-        }, 10000);
+        // Load the threat list once; stats and new threats are pushed over Socket.IO (realtime.js)
+        this.refreshThreats();
     }
     
     handleKeyboardShortcuts(e) {
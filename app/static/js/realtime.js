@@ -7,6 +7,7 @@ class RealTimeManager {
         this.reconnectDelay = 1000;
         this.heartbeatInterval = null;
         this.isConnected = false;
+        this.latestStats = {};
         
         this.init();
     }
@@ -40,6 +41,9 @@ class RealTimeManager {
             this.reconnectAttempts = 0;
             this.updateConnectionStatus(true);
             this.showConnectionToast('Connected to server', 'success');
+            
+            // Server pushes stats, network activity and threat batches to subscribers
+            this.socket.emit('subscribe_telemetry');
         });
         
         this.socket.on('disconnect', (reason) => {
@@ -194,48 +198,62 @@ class RealTimeManager {
         }
     }
     
-    handleThreatDetected(data) {
-        console.log('🚨 Threat detected:', data);
+    handleThreatDetected(batch) {
+        // The server coalesces bursts into one batch per tick
+        console.log(`🚨 ${batch.count} threat(s) detected:`, batch);
+        
+        const threats = batch.threats || [];
+        if (threats.length === 0) return;
         
         // Update dashboard stats
         if (window.dashboardManager) {
-            window.dashboardManager.handleThreatUpdate(data);
+            window.dashboardManager.handleThreatBatch(batch);
         }
         
         // Update charts
         if (window.chartsManager) {
-            const timestamp = new Date(data.timestamp).toLocaleTimeString('en-US', { 
+            const timestamp = new Date(threats[threats.length - 1].timestamp).toLocaleTimeString('en-US', { 
                 hour: '2-digit', 
                 minute: '2-digit' 
             });
-            window.chartsManager.addThreatDataPoint(timestamp, 1);
+            window.chartsManager.addThreatDataPoint(timestamp, batch.count);
         }
         
         // Play notification sound for high-severity threats
-        if (data.confidence > 0.8) {
+        const strongest = threats.reduce((a, b) => (b.confidence > a.confidence ? b : a));
+        if (strongest.confidence > 0.8) {
             this.playNotificationSound();
         }
         
         // Show browser notification if permission granted
         this.showBrowserNotification({
-            title: `${data.threat_type} Detected`,
-            body: `Confidence: ${(data.confidence * 100).toFixed(1)}% | Source: ${data.source_ip}`,
+            title: batch.count > 1 ? `${batch.count} Threats Detected` : `${strongest.threat_type} Detected`,
+            body: `Confidence: ${(strongest.confidence * 100).toFixed(1)}% | Source: ${strongest.source_ip}`,
             icon: '/static/images/threat-icon.png',
             tag: 'threat-detection'
         });
     }
     
     handleSystemStats(data) {
-        console.log('📊 System stats update:', data);
+        // Pushes carry only the fields that changed since the previous tick
+        if (data.full) {
+            this.latestStats = {};
+        }
+        Object.assign(this.latestStats, data.changes || {});
         
         if (window.dashboardManager) {
-            window.dashboardManager.updateStats(data);
+            window.dashboardManager.updateStats(this.latestStats);
         }
         
         // Update mini charts
         if (window.chartsManager) {
             // Update performance indicators
-            this.updatePerformanceIndicators(data);
+            this.updatePerformanceIndicators(this.latestStats);
+        }
+        
+        // Clients that stop acknowledging are paused by the server instead of buffered
+        if (this.socket && data.seq !== undefined) {
+            this.socket.emit('telemetry_ack', { seq: data.seq });
         }
     }
     
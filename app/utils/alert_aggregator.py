@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class AlertGroup:
+    """Detections sharing (source IP, destination IP, threat type) within one suppression window"""
+
+    __slots__ = ('key', 'window_end', 'count', 'first_seen', 'last_seen', 'peak_confidence', 'peak')
+
+    def __init__(self, key, window_end, timestamp, confidence, payload):
+        self.key = key
+        self.window_end = window_end
+        self.count = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.peak_confidence = confidence
+        self.peak = payload
+
+
+class AlertAggregator:
+    """Suppresses repeated detections and rolls them up per window
+
+    The first detection for a key is reported immediately; further detections in the
+    next `window` seconds only update the group, which is handed to `on_rollup` when
+    the window closes if anything was suppressed.
+    """
+
+    def __init__(self, on_rollup, window=10.0, max_groups=10000):
+        self.on_rollup = on_rollup
+        self.window = window
+        self.max_groups = max_groups
+
+        # Groups in window-opening order, so the oldest expires first
+        self.groups = OrderedDict()
+        self.stats = {
+            'observed': 0,
+            'suppressed': 0,
+            'rollups': 0,
+            'evicted_groups': 0
+        }
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        # A thread started before a fork does not exist in the child; start it there too
+        if not self.window or (self._running and self._pid == os.getpid()):
+            return
+        if self._pid not in (None, os.getpid()):
+            self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='alert-aggregator')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def observe(self, key, timestamp, confidence, payload, now=None):
+        """Record a detection; returns True if it opens a window and should be reported now"""
+        if not self.window:
+            return True
+
+        now = now if now is not None else time.time()
+        closed = []
+
+        with self._lock:
+            self.stats['observed'] += 1
+            closed.extend(self._expire(now))
+
+            group = self.groups.get(key)
+            if group is None:
+                self.groups[key] = AlertGroup(key, now + self.window, timestamp, confidence, payload)
+                while len(self.groups) > self.max_groups:
+                    closed.append(self.groups.popitem(last=False)[1])
+                    self.stats['evicted_groups'] += 1
+                opened = True
+            else:
+                group.count += 1
+                group.last_seen = timestamp
+                if confidence > group.peak_confidence:
+                    group.peak_confidence = confidence
+                    group.peak = payload
+                self.stats['suppressed'] += 1
+                opened = False
+
+        self._report(closed)
+        return opened
+
+    def _expire(self, now):
+        closed = []
+        while self.groups:
+            key, group = next(iter(self.groups.items()))
+            if group.window_end > now:
+                break
+            del self.groups[key]
+            closed.append(group)
+        return closed
+
+    def _report(self, groups):
+        for group in groups:
+            if group.count > 1:
+                self.stats['rollups'] += 1
+                try:
+                    self.on_rollup(group)
+                except Exception as e:
+                    print(f"Error emitting rolled-up alert: {e}")
+
+    def flush(self, now=None):
+        """Close windows that have ended, or every window when now is None"""
+        with self._lock:
+            if now is None:
+                closed = list(self.groups.values())
+                self.groups.clear()
+            else:
+                closed = self._expire(now)
+        self._report(closed)
+
+    def _run(self):
+        interval = min(self.window / 2.0, 1.0)
+        while self._running:
+            time.sleep(interval)
+            self.flush(time.time())
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['open_groups'] = len(self.groups)
+        return stats
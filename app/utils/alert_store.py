@@ -0,0 +1,364 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts REAL NOT NULL,
+        threat_type TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        count INTEGER NOT NULL DEFAULT 1,
+        source_ip TEXT,
+        destination_ip TEXT,
+        feedback TEXT,
+        payload TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_alerts_ts ON alerts (ts)",
+    "CREATE INDEX IF NOT EXISTS ix_alerts_source_ip ON alerts (source_ip, id)",
+    "CREATE INDEX IF NOT EXISTS ix_alerts_destination_ip ON alerts (destination_ip, id)",
+    "CREATE INDEX IF NOT EXISTS ix_alerts_threat_type ON alerts (threat_type, id)"
+]
+
+INSERT_SQL = (
+    "INSERT INTO alerts (ts, threat_type, confidence, count, source_ip, destination_ip, payload) "
+    "VALUES (:ts, :threat_type, :confidence, :count, :source_ip, :destination_ip, :payload)"
+)
+
+
+def sqlite_path(database_uri):
+    """File path for a sqlite:/// URI; None for other databases"""
+    if not database_uri or not database_uri.startswith('sqlite://'):
+        return None
+    path = database_uri[len('sqlite://'):]
+    if path in ('', '/', '/:memory:'):
+        return ':memory:'
+    # sqlite:///relative.db -> relative.db, sqlite:////abs/path.db -> /abs/path.db
+    return path[1:] if path.startswith('/') else path
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class AlertStore:
+    """Durable alert log in SQLite (WAL) with a background batch writer and retention sweeper"""
+
+    def __init__(self, database_uri, batch_size=500, max_wait=0.25, max_queue=50000,
+                 max_alerts=None, retention_days=None, sweep_interval=60.0):
+        path = sqlite_path(database_uri)
+        if path is None:
+            print(f"Alert store supports sqlite:/// URIs only, falling back to ids.db (got {database_uri})")
+            path = 'ids.db'
+        self.path = path
+
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_alerts = max_alerts
+        self.retention_days = retention_days
+        self.sweep_interval = sweep_interval
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'swept': 0,
+            'write_errors': 0
+        }
+
+        # An in-memory database exists per connection, so everything shares the writer's
+        self._shared = self.path == ':memory:'
+        self._local = threading.local()
+        self._conn_lock = threading.Lock()
+        self._writer_conn = None
+        self._schema_ready = False
+        self._running = False
+        self._thread = None
+        self._last_sweep = 0.0
+
+        # Connections and the writer thread are opened on first use in the process using
+        # them, so a store built before a (gunicorn --preload) fork is never shared
+        self._pid = os.getpid()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and self.path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        if self.path != ':memory:':
+            # WAL lets API readers run while the writer commits batches
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connection(self):
+        """Per-thread read connection (or the single shared one for :memory:)"""
+        if self._shared:
+            return self._writer()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _writer(self):
+        if self._writer_conn is None:
+            self._writer_conn = self._connect()
+            self._init_schema(self._writer_conn)
+        return self._writer_conn
+
+    def _init_schema(self, conn):
+        for statement in SCHEMA:
+            conn.execute(statement)
+        # Databases created before alerts were rolled up lack the count column
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(alerts)")]
+        if 'count' not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN count INTEGER NOT NULL DEFAULT 1")
+        if 'feedback' not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN feedback TEXT")
+        conn.commit()
+        self._schema_ready = True
+
+    def _check_pid(self):
+        """Drop connections, locks, queued alerts and the thread flag inherited from a parent process"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._local = threading.local()
+        self._conn_lock = threading.Lock()
+        self._writer_conn = None
+        self._schema_ready = False
+        self._running = False
+        self._thread = None
+
+    def _prepare_read(self):
+        # Readers use their own connections, so the writer's creates the tables first
+        self._check_pid()
+        if not self._schema_ready:
+            with self._conn_lock:
+                self._writer()
+
+    def start(self):
+        self._check_pid()
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='alert-store')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def add(self, threat_info):
+        """Queue an alert for writing; never blocks, drops and counts when the queue is full
+
+        The writer thread is started on the first alert queued in this process.
+        """
+        if not self._running or self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(threat_info)
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued alert has been written"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.queue.unfinished_tasks == 0
+
+    def _collect_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.max_wait)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self._running or not self.queue.empty():
+            batch = self._collect_batch()
+            if batch:
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    print(f"Error writing alerts: {e}")
+                    self.stats['write_errors'] += 1
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+
+            if self.sweep_interval and time.monotonic() - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = time.monotonic()
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping alerts: {e}")
+
+    def write_batch(self, batch):
+        """Insert many alerts in one transaction"""
+        rows = []
+        for threat in batch:
+            timestamp = threat['timestamp']
+            rows.append({
+                'ts': timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp),
+                'threat_type': threat['threat_type'],
+                'confidence': float(threat['confidence']),
+                'count': int(threat.get('count', 1)),
+                'source_ip': threat.get('source_ip'),
+                'destination_ip': threat.get('destination_ip'),
+                'payload': json.dumps(threat, default=_json_default)
+            })
+
+        with self._conn_lock:
+            conn = self._writer()
+            conn.executemany(INSERT_SQL, rows)
+            conn.commit()
+
+        self.stats['written'] += len(rows)
+        self.stats['batches'] += 1
+
+    def sweep(self, now=None):
+        """Delete alerts older than retention_days and beyond the newest max_alerts"""
+        now = now if now is not None else time.time()
+        deleted = 0
+
+        with self._conn_lock:
+            conn = self._writer()
+            if self.retention_days:
+                cursor = conn.execute(
+                    "DELETE FROM alerts WHERE ts < :cutoff",
+                    {'cutoff': now - self.retention_days * 86400}
+                )
+                deleted += cursor.rowcount
+            if self.max_alerts:
+                cursor = conn.execute(
+                    "DELETE FROM alerts WHERE id <= ("
+                    "SELECT id FROM alerts ORDER BY id DESC LIMIT 1 OFFSET :keep)",
+                    {'keep': self.max_alerts}
+                )
+                deleted += cursor.rowcount
+            conn.commit()
+
+        self.stats['swept'] += deleted
+        return deleted
+
+    def query(self, limit=50, cursor=None, threat_type=None, source_ip=None,
+              destination_ip=None, since=None, until=None):
+        """Newest-first page of alerts and the cursor for the next (older) page
+
+        The cursor is the id of the last alert returned; pass it back to continue.
+        """
+        self._prepare_read()
+        clauses, params = [], {'limit': int(limit)}
+        if cursor is not None:
+            clauses.append("id < :cursor")
+            params['cursor'] = int(cursor)
+        if threat_type:
+            clauses.append("threat_type = :threat_type")
+            params['threat_type'] = threat_type
+        if source_ip:
+            clauses.append("source_ip = :source_ip")
+            params['source_ip'] = source_ip
+        if destination_ip:
+            clauses.append("destination_ip = :destination_ip")
+            params['destination_ip'] = destination_ip
+        if since is not None:
+            clauses.append("ts >= :since")
+            params['since'] = since.timestamp() if isinstance(since, datetime) else float(since)
+        if until is not None:
+            clauses.append("ts < :until")
+            params['until'] = until.timestamp() if isinstance(until, datetime) else float(until)
+
+        sql = "SELECT id, ts, threat_type, confidence, count, source_ip, destination_ip, feedback FROM alerts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT :limit"
+
+        if self._shared:
+            with self._conn_lock:
+                rows = self._connection().execute(sql, params).fetchall()
+        else:
+            rows = self._connection().execute(sql, params).fetchall()
+
+        alerts = [
+            {
+                'id': row[0],
+                'timestamp': datetime.fromtimestamp(row[1]).isoformat(),
+                'threat_type': row[2],
+                'confidence': row[3],
+                'count': row[4],
+                'source_ip': row[5],
+                'destination_ip': row[6],
+                'feedback': row[7]
+            }
+            for row in rows
+        ]
+        next_cursor = alerts[-1]['id'] if len(alerts) == params['limit'] else None
+        return alerts, next_cursor
+
+    def get_alert(self, alert_id):
+        """Full stored alert, including features and model predictions"""
+        self._prepare_read()
+        sql = "SELECT id, payload, feedback FROM alerts WHERE id = :id"
+        if self._shared:
+            with self._conn_lock:
+                row = self._connection().execute(sql, {'id': int(alert_id)}).fetchone()
+        else:
+            row = self._connection().execute(sql, {'id': int(alert_id)}).fetchone()
+        if row is None:
+            return None
+        alert = json.loads(row[1])
+        alert['id'] = row[0]
+        alert['feedback'] = row[2]
+        return alert
+
+    def set_feedback(self, alert_id, verdict):
+        """Record an analyst verdict on an alert; returns the previous one"""
+        self._check_pid()
+        with self._conn_lock:
+            conn = self._writer()
+            row = conn.execute("SELECT feedback FROM alerts WHERE id = :id", {'id': int(alert_id)}).fetchone()
+            if row is None:
+                raise KeyError(alert_id)
+            conn.execute(
+                "UPDATE alerts SET feedback = :verdict WHERE id = :id",
+                {'verdict': verdict, 'id': int(alert_id)}
+            )
+            conn.commit()
+        return row[0]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued'] = self.queue.qsize()
+        return stats
@@ -0,0 +1,135 @@
+import struct
+import threading
+import time
+from app.utils.raw_capture import RawSocketCapture, SOL_PACKET, PACKET_STATISTICS
+from app.utils.startup_report import lazy_import
+
+
+class CaptureSupervisor:
+    """Keeps packet capture running until stopped, restarting it with backoff when it fails
+
+    The Scapy backend sniffs in slices of `slice_seconds` on one socket that stays open
+    between slices, so stop requests are honoured within a slice and no packets are
+    missed while re-entering sniff(). The AF_PACKET backend checks on every poll timeout.
+    """
+
+    def __init__(self, interface, packet_handler, frame_handler, backend='scapy', bpf_filter=None,
+                 slice_seconds=1.0, restart_backoff=1.0, max_backoff=30.0, afpacket_options=None):
+        self.interface = interface
+        self.packet_handler = packet_handler
+        self.frame_handler = frame_handler
+        self.backend = backend
+        self.bpf_filter = bpf_filter
+        self.slice_seconds = slice_seconds
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.afpacket_options = afpacket_options or {}
+
+        self.stats = {
+            'received': 0,
+            'kernel_dropped': 0,
+            'captured': 0,
+            'restarts': 0,
+            'last_error': None,
+            'capturing': False
+        }
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._capture = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='capture-supervisor')
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        delay = self.restart_backoff
+
+        while not self._stop_event.is_set():
+            try:
+                print(f"Starting packet capture on interface: {self.interface} ({self.backend})")
+                if self.backend == 'afpacket':
+                    self._capture_afpacket()
+                else:
+                    self._capture_scapy()
+                delay = self.restart_backoff
+            except Exception as e:
+                print(f"Error in packet capture, restarting in {delay:.1f}s: {e}")
+                self.stats['last_error'] = str(e)
+                self.stats['restarts'] += 1
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+            finally:
+                self.stats['capturing'] = False
+
+    def _capture_scapy(self):
+        scapy = lazy_import('scapy.all', 'scapy')
+        sock = scapy.conf.L2listen(iface=self.interface, filter=self.bpf_filter)
+        self._capture = sock
+        self.stats['capturing'] = True
+
+        def handle(packet):
+            self.stats['captured'] += 1
+            self.packet_handler(packet)
+
+        try:
+            while not self._stop_event.is_set():
+                scapy.sniff(opened_socket=sock, prn=handle, store=False, timeout=self.slice_seconds)
+                self._read_kernel_stats(getattr(sock, 'ins', None), 8)
+        finally:
+            self._read_kernel_stats(getattr(sock, 'ins', None), 8)
+            self._capture = None
+            sock.close()
+
+    def _capture_afpacket(self):
+        capture = RawSocketCapture(self.interface, bpf_filter=self.bpf_filter, **self.afpacket_options)
+        self._capture = capture
+        self.stats['capturing'] = True
+        last_stats = time.monotonic()
+
+        try:
+            for frame in capture.frames(self._stop_event.is_set):
+                self.stats['captured'] += 1
+                self.frame_handler(frame)
+
+                if time.monotonic() - last_stats >= self.slice_seconds:
+                    self._read_kernel_stats(capture.sock, 12 if capture.ring_enabled else 8)
+                    last_stats = time.monotonic()
+        finally:
+            self._read_kernel_stats(capture.sock, 12 if capture.ring_enabled else 8)
+            self._capture = None
+            capture.close()
+
+    def _read_kernel_stats(self, sock, size):
+        """Accumulate PACKET_STATISTICS; the kernel resets the counters on every read"""
+        if sock is None:
+            return
+        try:
+            packets, drops = struct.unpack_from('=II', sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, size))
+        except (OSError, AttributeError):
+            return
+        # tp_packets already includes the packets that were dropped
+        self.stats['received'] += packets
+        self.stats['kernel_dropped'] += drops
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['running'] = self.running
+        stats['backend'] = self.backend
+        stats['interface'] = self.interface
+        return stats
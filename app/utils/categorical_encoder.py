@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['protocol_type', 'service', 'flag']
+
+# Every value in the NSL-KDD training set; what models trained before vocabularies were
+# saved saw as pd.Categorical codes (sorted order)
+NSL_KDD_VOCABULARY = {
+    'protocol_type': ['icmp', 'tcp', 'udp'],
+    'service': [
+        'IRC', 'X11', 'Z39_50', 'aol', 'auth', 'bgp', 'courier', 'csnet_ns', 'ctf',
+        'daytime', 'discard', 'domain', 'domain_u', 'echo', 'eco_i', 'ecr_i', 'efs',
+        'exec', 'finger', 'ftp', 'ftp_data', 'gopher', 'harvest', 'hostnames', 'http',
+        'http_2784', 'http_443', 'http_8001', 'imap4', 'iso_tsap', 'klogin', 'kshell',
+        'ldap', 'link', 'login', 'mtp', 'name', 'netbios_dgm', 'netbios_ns',
+        'netbios_ssn', 'netstat', 'nnsp', 'nntp', 'ntp_u', 'other', 'pm_dump', 'pop_2',
+        'pop_3', 'printer', 'private', 'red_i', 'remote_job', 'rje', 'shell', 'smtp',
+        'sql_net', 'ssh', 'sunrpc', 'supdup', 'systat', 'telnet', 'tftp_u', 'tim_i',
+        'time', 'urh_i', 'urp_i', 'uucp', 'uucp_path', 'vmnet', 'whois'
+    ],
+    'flag': ['OTH', 'REJ', 'RSTO', 'RSTOS0', 'RSTR', 'S0', 'S1', 'S2', 'S3', 'SF', 'SH']
+}
+
+
+class CategoricalEncoder:
+    """Fitted vocabularies for the categorical columns, shared by training and the live extractor
+
+    Codes are positions in the sorted vocabulary; anything outside it maps to one explicit
+    unknown code, len(vocabulary). Frames are encoded through a lookup array built once per
+    distinct category, never per row.
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = {}
+        self.index = {}
+        self.unknown = {}
+        if vocabulary is not None:
+            self.set_vocabulary(vocabulary)
+
+    @property
+    def fitted(self):
+        return bool(self.vocabulary)
+
+    def set_vocabulary(self, vocabulary):
+        self.vocabulary = {col: [str(value) for value in values] for col, values in vocabulary.items()}
+        self.index = {col: {value: i for i, value in enumerate(values)}
+                      for col, values in self.vocabulary.items()}
+        self.unknown = {col: len(values) for col, values in self.vocabulary.items()}
+
+    def fit(self, df, columns=CATEGORICAL_COLUMNS):
+        """Learn the sorted set of values seen in each column"""
+        vocabulary = {}
+        for col in columns:
+            if col in df.columns:
+                values = pd.Categorical(df[col]).categories
+                vocabulary[col] = sorted(str(value) for value in values)
+        self.set_vocabulary(vocabulary)
+        return self
+
+    def lookup_table(self, col, categories):
+        """Code for each of a column's categories, as an array indexable by category code"""
+        index, unknown = self.index[col], self.unknown[col]
+        return np.array([index.get(str(value), unknown) for value in categories], dtype=np.int16)
+
+    def transform_column(self, col, values):
+        """Codes for a Series or array of raw values; missing values get the unknown code"""
+        labels = pd.Categorical(values)
+        table = np.append(self.lookup_table(col, labels.categories), np.int16(self.unknown[col]))
+        # Code -1 (missing) indexes the trailing unknown entry
+        return table[labels.codes]
+
+    def transform(self, df):
+        """Replace each categorical column of a DataFrame with its codes"""
+        for col in self.vocabulary:
+            if col in df.columns:
+                df[col] = self.transform_column(col, df[col])
+        return df
+
+    def encode(self, col, value):
+        """Code for a single value, used per packet by the live extractor"""
+        index = self.index.get(col)
+        if index is None:
+            return 0
+        return index.get(value, self.unknown[col])
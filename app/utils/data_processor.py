@@ -1,36 +1,98 @@
 import pandas as pd
+from pandas.api.types import union_categoricals
 import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 import joblib
 import os
+from app.utils.feature_vectorizer import FeatureVectorizer
+from app.utils.categorical_encoder import CategoricalEncoder, CATEGORICAL_COLUMNS, NSL_KDD_VOCABULARY
+
+NSL_KDD_COLUMNS = [
+    'duration', 'protocol_type', 'service', 'flag', 'src_bytes',
+    'dst_bytes', 'land', 'wrong_fragment', 'urgent', 'hot',
+    'num_failed_logins', 'logged_in', 'num_compromised', 'root_shell',
+    'su_attempted', 'num_root', 'num_file_creations', 'num_shells',
+    'num_access_files', 'num_outbound_cmds', 'is_host_login',
+    'is_guest_login', 'count', 'srv_count', 'serror_rate',
+    'srv_serror_rate', 'rerror_rate', 'srv_rerror_rate',
+    'same_srv_rate', 'diff_srv_rate', 'srv_diff_host_rate',
+    'dst_host_count', 'dst_host_srv_count', 'dst_host_same_srv_rate',
+    'dst_host_diff_srv_rate', 'dst_host_same_src_port_rate',
+    'dst_host_srv_diff_host_rate', 'dst_host_serror_rate',
+    'dst_host_srv_serror_rate', 'dst_host_rerror_rate',
+    'dst_host_srv_rerror_rate', 'attack_type', 'difficulty'
+]
+
+# Smallest dtypes that hold every NSL-KDD value; rates are two-decimal fractions
+NSL_KDD_DTYPES = {
+    'duration': np.int32, 'src_bytes': np.int64, 'dst_bytes': np.int64,
+    'land': np.int8, 'wrong_fragment': np.int8, 'urgent': np.int8, 'hot': np.int32,
+    'num_failed_logins': np.int8, 'logged_in': np.int8, 'num_compromised': np.int32,
+    'root_shell': np.int8, 'su_attempted': np.int8, 'num_root': np.int32,
+    'num_file_creations': np.int32, 'num_shells': np.int16, 'num_access_files': np.int16,
+    'num_outbound_cmds': np.int8, 'is_host_login': np.int8, 'is_guest_login': np.int8,
+    'count': np.int16, 'srv_count': np.int16,
+    'dst_host_count': np.int16, 'dst_host_srv_count': np.int16,
+    'protocol_type': 'category', 'service': 'category', 'flag': 'category',
+    'attack_type': 'category'
+}
+for _column in NSL_KDD_COLUMNS:
+    if _column.endswith('_rate'):
+        NSL_KDD_DTYPES[_column] = np.float32
+
+ATTACK_MAPPING = {
+    'normal': 0,
+    'dos': 1, 'ddos': 1, 'neptune': 1, 'smurf': 1, 'pod': 1,
+    'teardrop': 1, 'land': 1, 'back': 1, 'apache2': 1, 'mailbomb': 1,
+    'probe': 2, 'satan': 2, 'ipsweep': 2, 'nmap': 2, 'portsweep': 2,
+    'mscan': 2, 'saint': 2,
+    'r2l': 3, 'guess_passwd': 3, 'ftp_write': 3, 'imap': 3,
+    'phf': 3, 'multihop': 3, 'warezmaster': 3, 'warezclient': 3,
+    'spy': 3, 'xlock': 3, 'xsnoop': 3, 'snmpguess': 3,
+    'u2r': 4, 'buffer_overflow': 4, 'loadmodule': 4, 'perl': 4,
+    'rootkit': 4, 'httptunnel': 4, 'ps': 4, 'sqlattack': 4, 'xterm': 4
+}
 
 class DataProcessor:
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
+        self.categorical_encoder = CategoricalEncoder()
         self.feature_columns = None
         
-    def load_nsl_kdd_data(self, file_path):
+    def load_nsl_kdd_data(self, file_path, chunksize=None):
         """Load and preprocess NSL-KDD dataset"""
-        column_names = [
-            'duration', 'protocol_type', 'service', 'flag', 'src_bytes',
-            'dst_bytes', 'land', 'wrong_fragment', 'urgent', 'hot',
-            'num_failed_logins', 'logged_in', 'num_compromised', 'root_shell',
-            'su_attempted', 'num_root', 'num_file_creations', 'num_shells',
-            'num_access_files', 'num_outbound_cmds', 'is_host_login',
-            'is_guest_login', 'count', 'srv_count', 'serror_rate',
-            'srv_serror_rate', 'rerror_rate', 'srv_rerror_rate',
-            'same_srv_rate', 'diff_srv_rate', 'srv_diff_host_rate',
-            'dst_host_count', 'dst_host_srv_count', 'dst_host_same_srv_rate',
-            'dst_host_diff_srv_rate', 'dst_host_same_src_port_rate',
-            'dst_host_srv_diff_host_rate', 'dst_host_serror_rate',
-            'dst_host_srv_serror_rate', 'dst_host_rerror_rate',
-            'dst_host_srv_rerror_rate', 'attack_type', 'difficulty'
-        ]
+        return self.preprocess_data(self.read_nsl_kdd(file_path, chunksize))
+    
+    def read_nsl_kdd(self, file_paths, chunksize=None):
+        """Read NSL-KDD CSVs with compact dtypes, chunk by chunk; strings become categoricals"""
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        
+        chunks = []
+        for file_path in file_paths:
+            # difficulty is never used, and KDD'99 files do not have it
+            reader = pd.read_csv(
+                file_path,
+                names=NSL_KDD_COLUMNS,
+                usecols=NSL_KDD_COLUMNS[:-1],
+                dtype=NSL_KDD_DTYPES,
+                chunksize=chunksize or 1000000
+            )
+            chunks.extend(reader)
         
-        df = pd.read_csv(file_path, names=column_names)
-        return self.preprocess_data(df)
+        # Chunks see different category sets, so merge them before concatenating
+        for col in CATEGORICAL_COLUMNS + ['attack_type']:
+            merged = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True)
+            offset = 0
+            for chunk in chunks:
+                chunk[col] = pd.Categorical.from_codes(
+                    merged.codes[offset:offset + len(chunk)], dtype=merged.dtype
+                )
+                offset += len(chunk)
+        
+        return pd.concat(chunks, ignore_index=True)
     
     def preprocess_data(self, df):
         """Comprehensive data preprocessing"""
@@ -38,33 +100,22 @@ class DataProcessor:
         if 'difficulty' in df.columns:
             df = df.drop('difficulty', axis=1)
         
-        # Handle categorical variables
-        categorical_columns = ['protocol_type', 'service', 'flag']
-        for col in categorical_columns:
-            if col in df.columns:
-                df[col] = pd.Categorical(df[col]).codes
+        # Encode categorical variables with the vocabulary fitted on the first (training) frame
+        if not self.categorical_encoder.fitted:
+            self.categorical_encoder.fit(df)
+        self.categorical_encoder.transform(df)
         
         # Create binary classification (normal vs attack)
         if 'attack_type' in df.columns:
-            df['is_attack'] = (df['attack_type'] != 'normal').astype(int)
-            
-            # Create multi-class labels
-            attack_mapping = {
-                'normal': 0,
-                'dos': 1, 'ddos': 1, 'neptune': 1, 'smurf': 1, 'pod': 1,
-                'teardrop': 1, 'land': 1, 'back': 1, 'apache2': 1, 'mailbomb': 1,
-                'probe': 2, 'satan': 2, 'ipsweep': 2, 'nmap': 2, 'portsweep': 2,
-                'mscan': 2, 'saint': 2,
-                'r2l': 3, 'guess_passwd': 3, 'ftp_write': 3, 'imap': 3,
-                'phf': 3, 'multihop': 3, 'warezmaster': 3, 'warezclient': 3,
-                'spy': 3, 'xlock': 3, 'xsnoop': 3, 'snmpguess': 3,
-                'u2r': 4, 'buffer_overflow': 4, 'loadmodule': 4, 'perl': 4,
-                'rootkit': 4, 'httptunnel': 4, 'ps': 4, 'sqlattack': 4, 'xterm': 4
-            }
+            # Map each distinct label once, then index by category code
+            labels = pd.Categorical(df['attack_type'])
+            names = labels.categories.astype(str)
+            mapped = np.array([ATTACK_MAPPING.get(name.lower(), 0) for name in names], dtype=np.int8)
+            normal = np.asarray(names == 'normal')
             
-            df['attack_category'] = df['attack_type'].map(
-                lambda x: attack_mapping.get(x.lower(), 0)
-            )
+            codes = labels.codes
+            df['is_attack'] = np.where(codes >= 0, ~normal[codes], True).astype(np.int8)
+            df['attack_category'] = np.where(codes >= 0, mapped[codes], 0).astype(np.int8)
             
             # Store feature columns
             self.feature_columns = [col for col in df.columns 
@@ -103,12 +154,17 @@ class DataProcessor:
         
         return X_train_scaled
     
+    def compile_vectorizer(self, batch_size=1000, dtype=np.float32):
+        """Build a pandas-free vectorizer from the fitted feature columns and scaler"""
+        return FeatureVectorizer.from_processor(self, batch_size=batch_size, dtype=dtype)
+    
     def save_preprocessor(self, path):
         """Save preprocessing components"""
         joblib.dump({
             'scaler': self.scaler,
             'label_encoder': self.label_encoder,
-            'feature_columns': self.feature_columns
+            'feature_columns': self.feature_columns,
+            'categorical_vocabulary': self.categorical_encoder.vocabulary
         }, path)
     
     def load_preprocessor(self, path):
@@ -117,3 +173,8 @@ class DataProcessor:
         self.scaler = components['scaler']
         self.label_encoder = components['label_encoder']
         self.feature_columns = components['feature_columns']
+        
+        # Preprocessors saved before vocabularies were kept were fitted on NSL-KDD codes
+        self.categorical_encoder = CategoricalEncoder(
+            components.get('categorical_vocabulary') or NSL_KDD_VOCABULARY
+        )
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+# Bump when preprocessing changes so stale caches are not reused
+CACHE_VERSION = 2
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Parsed DataFrames stored column by column as .npy files, keyed by source-file hash
+
+    Categorical columns are stored as integer codes with their categories in meta.json.
+    Loading a cached dataset is a handful of sequential reads instead of a CSV parse.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def key(self, file_paths, *extra):
+        """Cache key for the contents of the source files plus any pipeline parameters"""
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        for path in file_paths:
+            digest.update(file_digest(path).encode())
+        for value in extra:
+            digest.update(repr(value).encode())
+        return digest.hexdigest()[:32]
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key, mmap=False):
+        """Cached DataFrame for a key, or None on a miss"""
+        directory = self.path(key)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        columns = {}
+        for column in meta['columns']:
+            values = np.load(os.path.join(directory, f"{column['file']}.npy"), mmap_mode='r' if mmap else None)
+            if 'categories' in column:
+                values = pd.Categorical.from_codes(values, categories=column['categories'])
+            columns[column['name']] = values
+        return pd.DataFrame(columns)
+
+    def save(self, key, df, sources=()):
+        """Write a DataFrame under a key; the directory appears atomically once complete"""
+        directory = self.path(key)
+        staging = f"{directory}.tmp-{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            column = {'name': name, 'file': f"{i:04d}"}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            else:
+                values = series.to_numpy()
+            np.save(os.path.join(staging, f"{column['file']}.npy"), values)
+            column['dtype'] = str(values.dtype)
+            columns.append(column)
+
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': CACHE_VERSION,
+                'rows': len(df),
+                'columns': columns,
+                'sources': [os.path.abspath(path) for path in sources],
+                'created': time.time()
+            }, f, indent=2)
+
+        if os.path.exists(directory):
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, directory)
+        return directory
@@ -0,0 +1,53 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class ExplanationService:
+    """Computes SHAP explanations on a background thread pool and keeps recent job results"""
+
+    def __init__(self, max_workers=2, max_jobs=1000):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='explain')
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, model_manager, model_name, X):
+        """Queue an explanation job and return its id"""
+        job_id = uuid.uuid4().hex
+        job = {
+            'status': 'queued',
+            'model_name': model_name,
+            'rows': len(X),
+            'submitted_at': datetime.now().isoformat(),
+            'result': None,
+            'error': None
+        }
+
+        with self._lock:
+            self.jobs[job_id] = job
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+
+        self.executor.submit(self._run, job, model_manager, model_name, X)
+        return job_id
+
+    def _run(self, job, model_manager, model_name, X):
+        job['status'] = 'running'
+        try:
+            result = model_manager.explain_rows(X, model_name)
+            if result is None:
+                raise ValueError('Model not available or explanation not supported')
+            explanations, cached = result
+            job['result'] = {'explanations': explanations, 'cached': cached}
+            job['status'] = 'done'
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = 'failed'
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
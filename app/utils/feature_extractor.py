@@ -0,0 +1,391 @@
+from collections import OrderedDict, deque, namedtuple
+
+# Parsed header fields needed to track connections. For ICMP, dst_port
+# carries the ICMP type and src_port is 0.
+PacketRecord = namedtuple('PacketRecord', [
+    'timestamp', 'src_ip', 'dst_ip', 'protocol', 'src_port', 'dst_port',
+    'length', 'tcp_flags', 'fragmented', 'urgent'
+])
+
+PROTO_ICMP = 1
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+PROTOCOL_NAMES = {PROTO_ICMP: 'icmp', PROTO_TCP: 'tcp', PROTO_UDP: 'udp'}
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+# NSL-KDD service names by destination port
+TCP_SERVICES = {
+    7: 'echo', 9: 'discard', 11: 'systat', 13: 'daytime', 15: 'netstat',
+    20: 'ftp_data', 21: 'ftp', 22: 'ssh', 23: 'telnet', 25: 'smtp',
+    37: 'time', 42: 'name', 43: 'whois', 53: 'domain', 57: 'mtp',
+    70: 'gopher', 79: 'finger', 80: 'http', 84: 'ctf', 87: 'link',
+    95: 'supdup', 101: 'hostnames', 102: 'iso_tsap', 105: 'csnet_ns',
+    109: 'pop_2', 110: 'pop_3', 111: 'sunrpc', 113: 'auth', 117: 'uucp_path',
+    119: 'nntp', 137: 'netbios_ns', 138: 'netbios_dgm', 139: 'netbios_ssn',
+    143: 'imap4', 150: 'sql_net', 179: 'bgp', 194: 'IRC', 210: 'Z39_50',
+    389: 'ldap', 443: 'http_443', 512: 'exec', 513: 'login', 514: 'shell',
+    515: 'printer', 520: 'efs', 530: 'courier', 540: 'uucp', 543: 'klogin',
+    544: 'kshell', 2784: 'http_2784', 5190: 'aol', 8001: 'http_8001'
+}
+UDP_SERVICES = {53: 'domain_u', 69: 'tftp_u', 123: 'ntp_u'}
+ICMP_SERVICES = {0: 'ecr_i', 3: 'urp_i', 5: 'red_i', 8: 'eco_i', 13: 'tim_i', 14: 'tim_i'}
+
+# Connection status flags counted as SYN errors and REJ errors
+SERROR_FLAGS = ('S0', 'SH')
+RERROR_FLAGS = ('REJ',)
+
+
+def service_name(protocol, dst_port):
+    """Map a protocol and destination port (or ICMP type) to an NSL-KDD service"""
+    if protocol == PROTO_TCP:
+        if 6000 <= dst_port <= 6063:
+            return 'X11'
+        return TCP_SERVICES.get(dst_port, 'private')
+    if protocol == PROTO_UDP:
+        return UDP_SERVICES.get(dst_port, 'private')
+    if protocol == PROTO_ICMP:
+        return ICMP_SERVICES.get(dst_port, 'oth_i')
+    return 'other'
+
+
+class _Connection:
+    __slots__ = (
+        'key', 'src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol',
+        'service', 'start', 'last_seen', 'src_bytes', 'dst_bytes',
+        'wrong_fragment', 'urgent', 'flag', 'syn', 'synack', 'fin_src',
+        'fin_dst', 'rst_src', 'rst_dst', 'in_time_window', 'in_host_window'
+    )
+
+    def __init__(self, key, record):
+        self.key = key
+        self.src_ip = record.src_ip
+        self.dst_ip = record.dst_ip
+        self.src_port = record.src_port
+        self.dst_port = record.dst_port
+        self.protocol = record.protocol
+        self.service = service_name(record.protocol, record.dst_port)
+        self.start = record.timestamp
+        self.last_seen = record.timestamp
+        self.src_bytes = 0
+        self.dst_bytes = 0
+        self.wrong_fragment = 0
+        self.urgent = 0
+        self.flag = 'OTH' if record.protocol == PROTO_TCP else 'SF'
+        self.syn = False
+        self.synack = False
+        self.fin_src = False
+        self.fin_dst = False
+        self.rst_src = False
+        self.rst_dst = False
+        self.in_time_window = False
+        self.in_host_window = False
+
+    @property
+    def closed(self):
+        return self.rst_src or self.rst_dst or (self.fin_src and self.fin_dst)
+
+    def tcp_flag(self):
+        """Derive the NSL-KDD connection status flag from the TCP state seen so far"""
+        if not self.syn:
+            return 'OTH'
+        if not self.synack:
+            if self.rst_dst:
+                return 'REJ'
+            return 'SH' if self.fin_src else 'S0'
+        if self.rst_src:
+            return 'RSTO'
+        if self.rst_dst:
+            return 'RSTR'
+        if self.fin_src and self.fin_dst:
+            return 'SF'
+        return 'S1'
+
+
+class _TimeWindow:
+    """Connections seen in the last time window for one host or one service"""
+    __slots__ = ('entries', 'serror', 'rerror', 'counts')
+
+    def __init__(self):
+        self.entries = deque()
+        self.serror = 0
+        self.rerror = 0
+        self.counts = {}
+
+
+def _rate(numerator, denominator):
+    return numerator / denominator if denominator else 0.0
+
+
+def _increment(counts, key, amount=1):
+    value = counts.get(key, 0) + amount
+    if value:
+        counts[key] = value
+    else:
+        del counts[key]
+
+
+class FlowTracker:
+    def __init__(self, time_window=2.0, host_window=100, idle_timeout=120.0, max_flows=500000):
+        self.time_window = time_window
+        self.host_window = host_window
+        self.idle_timeout = idle_timeout
+        self.max_flows = max_flows
+
+        # Active connections in least-recently-seen order
+        self.flows = OrderedDict()
+
+        # Connections started within the last time window, by start time
+        self.time_entries = deque()
+        self.host_windows = {}
+        self.srv_windows = {}
+
+        # Last host_window connections and their running counters
+        self.recent = deque()
+        self.recent_dst = {}
+        self.recent_dst_srv = {}
+        self.recent_dst_sport = {}
+        self.recent_srv = {}
+        self.recent_dst_serror = {}
+        self.recent_dst_rerror = {}
+        self.recent_dst_srv_serror = {}
+        self.recent_dst_srv_rerror = {}
+
+        self.stats = {
+            'connections': 0,
+            'expired_flows': 0,
+            'evicted_flows': 0
+        }
+
+    def update(self, record):
+        """Account one packet and return its connection and window features"""
+        conn, from_src = self._lookup(record)
+        self._update_connection(conn, record, from_src)
+
+        self._expire_time_window(record.timestamp)
+        self._expire_flows(record.timestamp)
+
+        return self._features(conn)
+
+    def _lookup(self, record):
+        key = (record.protocol, record.src_ip, record.src_port, record.dst_ip, record.dst_port)
+        conn = self.flows.get(key)
+        from_src = True
+
+        if conn is None:
+            reverse_key = (record.protocol, record.dst_ip, record.dst_port, record.src_ip, record.src_port)
+            conn = self.flows.get(reverse_key)
+            from_src = False
+
+        # A fresh SYN on a finished connection starts a new one
+        if conn is not None and conn.closed and record.tcp_flags & TCP_SYN and not record.tcp_flags & TCP_ACK:
+            del self.flows[conn.key]
+            conn = None
+
+        if conn is None:
+            conn = _Connection(key, record)
+            from_src = True
+            self.flows[key] = conn
+            self._add_connection(conn)
+        else:
+            self.flows.move_to_end(conn.key)
+
+        return conn, from_src
+
+    def _update_connection(self, conn, record, from_src):
+        conn.last_seen = record.timestamp
+
+        if from_src:
+            conn.src_bytes += record.length
+        else:
+            conn.dst_bytes += record.length
+
+        if record.fragmented:
+            conn.wrong_fragment += 1
+        if record.urgent:
+            conn.urgent += 1
+
+        if conn.protocol != PROTO_TCP:
+            return
+
+        flags = record.tcp_flags
+        if from_src:
+            if flags & TCP_SYN and not flags & TCP_ACK:
+                conn.syn = True
+            if flags & TCP_FIN:
+                conn.fin_src = True
+            if flags & TCP_RST:
+                conn.rst_src = True
+        else:
+            if flags & TCP_SYN and flags & TCP_ACK:
+                conn.synack = True
+            if flags & TCP_FIN:
+                conn.fin_dst = True
+            if flags & TCP_RST:
+                conn.rst_dst = True
+
+        new_flag = conn.tcp_flag()
+        if new_flag != conn.flag:
+            self._set_flag(conn, new_flag)
+
+    def _set_flag(self, conn, new_flag):
+        """Change a connection's status and adjust every window still holding it"""
+        serror = (new_flag in SERROR_FLAGS) - (conn.flag in SERROR_FLAGS)
+        rerror = (new_flag in RERROR_FLAGS) - (conn.flag in RERROR_FLAGS)
+        conn.flag = new_flag
+
+        if conn.in_time_window:
+            for window in (self.host_windows[conn.dst_ip], self.srv_windows[conn.service]):
+                window.serror += serror
+                window.rerror += rerror
+
+        if conn.in_host_window:
+            dst_srv = (conn.dst_ip, conn.service)
+            if serror:
+                _increment(self.recent_dst_serror, conn.dst_ip, serror)
+                _increment(self.recent_dst_srv_serror, dst_srv, serror)
+            if rerror:
+                _increment(self.recent_dst_rerror, conn.dst_ip, rerror)
+                _increment(self.recent_dst_srv_rerror, dst_srv, rerror)
+
+    def _add_connection(self, conn):
+        self.stats['connections'] += 1
+
+        # Time-based windows per destination host and per service
+        self.time_entries.append(conn)
+        host = self.host_windows.get(conn.dst_ip)
+        if host is None:
+            host = self.host_windows[conn.dst_ip] = _TimeWindow()
+        srv = self.srv_windows.get(conn.service)
+        if srv is None:
+            srv = self.srv_windows[conn.service] = _TimeWindow()
+
+        host.entries.append(conn)
+        _increment(host.counts, conn.service)
+        srv.entries.append(conn)
+        _increment(srv.counts, conn.dst_ip)
+        conn.in_time_window = True
+
+        # Connection-count window shared by all destination hosts
+        if len(self.recent) >= self.host_window:
+            self._remove_recent(self.recent.popleft())
+        self.recent.append(conn)
+        dst_srv = (conn.dst_ip, conn.service)
+        _increment(self.recent_dst, conn.dst_ip)
+        _increment(self.recent_dst_srv, dst_srv)
+        _increment(self.recent_dst_sport, (conn.dst_ip, conn.src_port))
+        _increment(self.recent_srv, conn.service)
+        conn.in_host_window = True
+
+        # New connections start as OTH/SF; TCP state may promote them to an error flag
+        if conn.flag in SERROR_FLAGS:
+            host.serror += 1
+            srv.serror += 1
+            _increment(self.recent_dst_serror, conn.dst_ip)
+            _increment(self.recent_dst_srv_serror, dst_srv)
+
+    def _remove_recent(self, conn):
+        dst_srv = (conn.dst_ip, conn.service)
+        _increment(self.recent_dst, conn.dst_ip, -1)
+        _increment(self.recent_dst_srv, dst_srv, -1)
+        _increment(self.recent_dst_sport, (conn.dst_ip, conn.src_port), -1)
+        _increment(self.recent_srv, conn.service, -1)
+        if conn.flag in SERROR_FLAGS:
+            _increment(self.recent_dst_serror, conn.dst_ip, -1)
+            _increment(self.recent_dst_srv_serror, dst_srv, -1)
+        if conn.flag in RERROR_FLAGS:
+            _increment(self.recent_dst_rerror, conn.dst_ip, -1)
+            _increment(self.recent_dst_srv_rerror, dst_srv, -1)
+        conn.in_host_window = False
+
+    def _expire_time_window(self, now):
+        """Drop connections older than the time window; amortized O(1) per packet"""
+        cutoff = now - self.time_window
+        while self.time_entries and self.time_entries[0].start < cutoff:
+            conn = self.time_entries.popleft()
+            serror = conn.flag in SERROR_FLAGS
+            rerror = conn.flag in RERROR_FLAGS
+
+            host = self.host_windows[conn.dst_ip]
+            host.entries.popleft()
+            _increment(host.counts, conn.service, -1)
+            host.serror -= serror
+            host.rerror -= rerror
+            if not host.entries:
+                del self.host_windows[conn.dst_ip]
+
+            srv = self.srv_windows[conn.service]
+            srv.entries.popleft()
+            _increment(srv.counts, conn.dst_ip, -1)
+            srv.serror -= serror
+            srv.rerror -= rerror
+            if not srv.entries:
+                del self.srv_windows[conn.service]
+
+            conn.in_time_window = False
+
+    def _expire_flows(self, now):
+        """Drop idle flows and enforce the hard cap on tracked flows"""
+        cutoff = now - self.idle_timeout
+        while self.flows:
+            conn = next(iter(self.flows.values()))
+            if conn.last_seen >= cutoff:
+                break
+            self.flows.popitem(last=False)
+            self.stats['expired_flows'] += 1
+
+        while len(self.flows) > self.max_flows:
+            self.flows.popitem(last=False)
+            self.stats['evicted_flows'] += 1
+
+    def _features(self, conn):
+        # Long-lived connections may already have aged out of either window
+        host = self.host_windows.get(conn.dst_ip) or _TimeWindow()
+        srv = self.srv_windows.get(conn.service) or _TimeWindow()
+        count = len(host.entries)
+        srv_count = len(srv.entries)
+        same_srv_rate = _rate(host.counts.get(conn.service, 0), count)
+
+        dst_srv = (conn.dst_ip, conn.service)
+        dst_host_count = self.recent_dst.get(conn.dst_ip, 0)
+        dst_host_srv_count = self.recent_dst_srv.get(dst_srv, 0)
+        dst_host_same_srv_rate = _rate(dst_host_srv_count, dst_host_count)
+
+        return {
+            'duration': int(conn.last_seen - conn.start),
+            'protocol_type': PROTOCOL_NAMES.get(conn.protocol, 'other'),
+            'service': conn.service,
+            'flag': conn.flag,
+            'src_bytes': conn.src_bytes,
+            'dst_bytes': conn.dst_bytes,
+            'land': int(conn.src_ip == conn.dst_ip and conn.src_port == conn.dst_port),
+            'wrong_fragment': conn.wrong_fragment,
+            'urgent': conn.urgent,
+            'count': count,
+            'srv_count': srv_count,
+            'serror_rate': _rate(host.serror, count),
+            'srv_serror_rate': _rate(srv.serror, srv_count),
+            'rerror_rate': _rate(host.rerror, count),
+            'srv_rerror_rate': _rate(srv.rerror, srv_count),
+            'same_srv_rate': same_srv_rate,
+            'diff_srv_rate': 1.0 - same_srv_rate if count else 0.0,
+            'srv_diff_host_rate': 1.0 - _rate(srv.counts.get(conn.dst_ip, 0), srv_count) if srv_count else 0.0,
+            'dst_host_count': dst_host_count,
+            'dst_host_srv_count': dst_host_srv_count,
+            'dst_host_same_srv_rate': dst_host_same_srv_rate,
+            'dst_host_diff_srv_rate': 1.0 - dst_host_same_srv_rate if dst_host_count else 0.0,
+            'dst_host_same_src_port_rate': _rate(
+                self.recent_dst_sport.get((conn.dst_ip, conn.src_port), 0), dst_host_count
+            ),
+            'dst_host_srv_diff_host_rate': _rate(
+                self.recent_srv.get(conn.service, 0) - dst_host_srv_count, self.recent_srv.get(conn.service, 0)
+            ),
+            'dst_host_serror_rate': _rate(self.recent_dst_serror.get(conn.dst_ip, 0), dst_host_count),
+            'dst_host_srv_serror_rate': _rate(self.recent_dst_srv_serror.get(dst_srv, 0), dst_host_srv_count),
+            'dst_host_rerror_rate': _rate(self.recent_dst_rerror.get(conn.dst_ip, 0), dst_host_count),
+            'dst_host_srv_rerror_rate': _rate(self.recent_dst_srv_rerror.get(dst_srv, 0), dst_host_srv_count)
+        }
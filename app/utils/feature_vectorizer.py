@@ -0,0 +1,132 @@
+import numpy as np
+
+# Columns added by DataProcessor.extract_features, in the order it adds them
+ENGINEERED_COLUMNS = ['bytes_ratio', 'total_bytes', 'srv_count_ratio']
+
+
+def output_columns_for(feature_columns):
+    """Raw columns followed by the engineered ones extract_features can derive from them"""
+    output_columns = list(feature_columns)
+    if 'src_bytes' in feature_columns and 'dst_bytes' in feature_columns:
+        output_columns += ['bytes_ratio', 'total_bytes']
+    if 'count' in feature_columns and 'srv_count' in feature_columns:
+        output_columns.append('srv_count_ratio')
+    return output_columns
+
+
+class FeatureVectorizer:
+    def __init__(self, feature_columns, output_columns, mean=None, scale=None,
+                 batch_size=1000, dtype=np.float32):
+        self.feature_columns = list(feature_columns)
+        self.output_columns = list(output_columns)
+        self.dtype = dtype
+
+        # Feature name -> position in the raw row
+        self.column_index = {name: i for i, name in enumerate(self.feature_columns)}
+
+        # Raw columns copied straight into the output matrix
+        self.copy_out = np.array([i for i, name in enumerate(self.output_columns)
+                                  if name in self.column_index], dtype=np.intp)
+        self.copy_in = np.array([self.column_index[self.output_columns[i]]
+                                 for i in self.copy_out], dtype=np.intp)
+
+        # Engineered column name -> position in the output row
+        self.engineered = {}
+        for name in ENGINEERED_COLUMNS:
+            if name in self.output_columns:
+                self.engineered[name] = self.output_columns.index(name)
+
+        unknown = [name for name in self.output_columns
+                   if name not in self.column_index and name not in self.engineered]
+        if unknown:
+            raise ValueError(f"Cannot vectorize columns: {unknown}")
+
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+
+        self._allocate(batch_size)
+
+    @classmethod
+    def from_processor(cls, data_processor, batch_size=1000, dtype=np.float32):
+        """Compile a vectorizer from a fitted DataProcessor"""
+        scaler = data_processor.scaler
+        if not hasattr(scaler, 'scale_') or not hasattr(scaler, 'mean_'):
+            raise ValueError("DataProcessor scaler has not been fitted")
+
+        feature_columns = data_processor.feature_columns
+        if hasattr(scaler, 'feature_names_in_'):
+            output_columns = list(scaler.feature_names_in_)
+        else:
+            output_columns = output_columns_for(feature_columns)
+
+        return cls(
+            feature_columns,
+            output_columns,
+            mean=scaler.mean_ if scaler.with_mean else None,
+            scale=scaler.scale_ if scaler.with_std else None,
+            batch_size=batch_size,
+            dtype=dtype
+        )
+
+    def _allocate(self, batch_size):
+        self.batch_size = batch_size
+        self._raw = np.zeros((batch_size, len(self.feature_columns)), dtype=np.float64)
+        self._work = np.zeros((batch_size, len(self.output_columns)), dtype=np.float64)
+        self._out = np.zeros((batch_size, len(self.output_columns)), dtype=self.dtype)
+
+    def fill_row(self, row, features):
+        """Write a feature dict into a raw row; unknown names are ignored, missing ones are 0"""
+        row.fill(0)
+        column_index = self.column_index
+        for name, value in features.items():
+            i = column_index.get(name)
+            if i is not None:
+                row[i] = value
+
+    def transform_records(self, records):
+        """Vectorize a list of feature dicts into the preallocated output batch"""
+        n = len(records)
+        if n > self.batch_size:
+            self._allocate(n)
+
+        raw = self._raw[:n]
+        for i, features in enumerate(records):
+            self.fill_row(raw[i], features)
+
+        return self.transform_raw(raw)
+
+    def transform_frame(self, df):
+        """Vectorize a DataFrame holding the raw feature columns (training path)"""
+        raw = df.reindex(columns=self.feature_columns, fill_value=0).to_numpy(dtype=np.float64)
+        shape = (len(raw), len(self.output_columns))
+        return self._transform(raw, np.empty(shape, dtype=np.float64), np.empty(shape, dtype=self.dtype))
+
+    def transform_raw(self, raw):
+        """Engineer and scale raw rows; the result is only valid until the next call"""
+        n = len(raw)
+        if n > self.batch_size:
+            self._allocate(n)
+        return self._transform(raw, self._work[:n], self._out[:n])
+
+    def _transform(self, raw, work, out):
+        # Same float64 arithmetic as extract_features followed by StandardScaler.transform
+        work[:, self.copy_out] = raw[:, self.copy_in]
+
+        index = self.column_index
+        if 'bytes_ratio' in self.engineered:
+            np.divide(raw[:, index['src_bytes']], raw[:, index['dst_bytes']] + 1,
+                      out=work[:, self.engineered['bytes_ratio']])
+        if 'total_bytes' in self.engineered:
+            np.add(raw[:, index['src_bytes']], raw[:, index['dst_bytes']],
+                   out=work[:, self.engineered['total_bytes']])
+        if 'srv_count_ratio' in self.engineered:
+            np.divide(raw[:, index['srv_count']], raw[:, index['count']] + 1,
+                      out=work[:, self.engineered['srv_count_ratio']])
+
+        if self.mean is not None:
+            np.subtract(work, self.mean, out=work)
+        if self.scale is not None:
+            np.divide(work, self.scale, out=work)
+
+        out[...] = work
+        return out
@@ -0,0 +1,235 @@
+import copy
+import os
+import queue
+import threading
+import time
+from collections import deque
+import joblib
+import numpy as np
+
+
+class IncrementalModel:
+    """Ensemble member around a partial_fit classifier
+
+    Updates train a copy and swap it in with one assignment, so scoring threads never
+    see a half-updated model. Its labels are mostly analyst-flagged false positives, so
+    its vote grows with the labels seen up to max_weight, relative to 1 for other members.
+    """
+
+    def __init__(self, estimator, classes, max_weight=0.25, full_weight_samples=1000):
+        self.estimator = estimator
+        self.classes_ = np.asarray(classes)
+        self.samples_seen = 0
+        self.max_weight = max_weight
+        self.full_weight_samples = full_weight_samples
+
+    @property
+    def ensemble_weight(self):
+        return self.max_weight * min(1.0, self.samples_seen / max(1, self.full_weight_samples))
+
+    def predict_proba(self, X):
+        return self.estimator.predict_proba(X)
+
+
+class FeedbackLearner:
+    """Learns from analyst-labelled alerts on a background thread, in mini-batches
+
+    add() never blocks: labelled feature dicts go to a bounded queue and are dropped
+    (and counted) when it is full. Each update mixes the new labels with a bounded
+    sample of earlier ones. The model joins the ensemble of the current model manager
+    as 'incremental' once it has seen min_samples labels, and is saved as
+    incremental_model.pkl in the current model directory every save_interval seconds
+    and on stop(), so the next load of that version keeps learning from it.
+    """
+
+    def __init__(self, model_source, classes=(0, 1, 2, 3, 4), buffer_size=10000, batch_size=64,
+                 replay_size=2000, min_samples=50, interval=1.0, max_weight=0.25,
+                 full_weight_samples=1000, model_path_source=None, save_interval=60.0):
+        # Callables returning the (model_manager, data_processor) to learn for, and its directory
+        self.model_source = model_source
+        self.model_path_source = model_path_source
+        self.save_interval = save_interval
+        self.classes = np.asarray(classes)
+        self.batch_size = batch_size
+        self.min_samples = min_samples
+        self.interval = interval
+        self.max_weight = max_weight
+        self.full_weight_samples = full_weight_samples
+
+        self.feedback = queue.Queue(maxsize=buffer_size)
+        self.replay = deque(maxlen=replay_size)
+        self.model = None
+        self.stats = {
+            'received': 0,
+            'dropped': 0,
+            'updates': 0,
+            'update_errors': 0,
+            'last_update': None,
+            'last_update_seconds': None,
+            'saves': 0,
+            'save_errors': 0,
+            'last_save': None
+        }
+
+        self._vectorizer = None
+        self._vectorizer_source = None
+        self._rng = np.random.default_rng(0)
+        self._unsaved = False
+        self._last_save = time.monotonic()
+        self._running = False
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        # A thread started before a fork does not exist in the child; start it there too
+        if self._running and self._pid == os.getpid():
+            return
+        if self._pid not in (None, os.getpid()):
+            self.feedback = queue.Queue(maxsize=self.feedback.maxsize)
+        self._pid = os.getpid()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='feedback-learner')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.save()
+
+    def add(self, features, label):
+        """Queue one labelled feature dict; never blocks, drops and counts when full"""
+        try:
+            self.feedback.put_nowait((features, int(label)))
+            self.stats['received'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def _collect_batch(self):
+        try:
+            batch = [self.feedback.get(timeout=self.interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.feedback.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect_batch()
+            if batch:
+                try:
+                    self.update(batch)
+                except Exception as e:
+                    print(f"Error updating incremental model: {e}")
+                    self.stats['update_errors'] += 1
+            if time.monotonic() - self._last_save >= self.save_interval:
+                self.save()
+
+    def save(self):
+        """Write the model to incremental_model.pkl in the current model directory"""
+        self._last_save = time.monotonic()
+        # Below min_samples the model has not joined the ensemble, so it is not saved either
+        if not self._unsaved or self.model_path_source is None or self.model.samples_seen < self.min_samples:
+            return False
+
+        path = os.path.join(self.model_path_source(), 'incremental_model.pkl')
+        try:
+            # Written beside the target and renamed, so a loader never reads a partial file
+            joblib.dump(self.model, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"Could not save incremental model: {e}")
+            self.stats['save_errors'] += 1
+            return False
+
+        self._unsaved = False
+        self.stats['saves'] += 1
+        self.stats['last_save'] = time.time()
+        return True
+
+    def vectorizer(self, data_processor):
+        # Compiled separately from the analyzer's, whose buffers the scoring thread reuses
+        if self._vectorizer is None or self._vectorizer_source is not data_processor:
+            self._vectorizer = data_processor.compile_vectorizer(batch_size=self.batch_size * 2)
+            self._vectorizer_source = data_processor
+        return self._vectorizer
+
+    def update(self, batch):
+        """One partial_fit step on new labels plus replayed earlier ones"""
+        start = time.perf_counter()
+        model_manager, data_processor = self.model_source()
+
+        replayed = []
+        if self.replay:
+            picks = self._rng.choice(len(self.replay), min(len(batch), len(self.replay)), replace=False)
+            replayed = [self.replay[i] for i in picks]
+        self.replay.extend(batch)
+
+        rows = batch + replayed
+        X = self.vectorizer(data_processor).transform_records([features for features, _ in rows]).copy()
+        y = np.array([label for _, label in rows])
+
+        if self.model is None:
+            self.model = self._adopt(model_manager) or IncrementalModel(
+                self._new_estimator(),
+                self._member_classes(model_manager),
+                max_weight=self.max_weight,
+                full_weight_samples=self.full_weight_samples
+            )
+
+        # Averaging needs the same class columns as the other members
+        known = np.isin(y, self.model.classes_)
+        X, y = X[known], y[known]
+        if not len(y):
+            return
+
+        estimator = copy.deepcopy(self.model.estimator)
+        estimator.partial_fit(X, y, classes=self.model.classes_)
+        self.model.estimator = estimator
+        self.model.samples_seen += len(batch)
+        self._unsaved = True
+
+        # Join (or rejoin, after a model swap) the ensemble once it has seen enough labels.
+        # Scoring threads iterate the members, so a new dict is swapped in rather than edited.
+        if self.model.samples_seen >= self.min_samples and model_manager.models.get('incremental') is not self.model:
+            model_manager.models = {**model_manager.models, 'incremental': self.model}
+
+        self.stats['updates'] += 1
+        self.stats['last_update'] = time.time()
+        self.stats['last_update_seconds'] = time.perf_counter() - start
+
+    def _adopt(self, model_manager):
+        # Keep learning on the incremental_model.pkl loaded with the version
+        existing = model_manager.models.get('incremental')
+        if not isinstance(existing, IncrementalModel):
+            return None
+        # The weighting follows the current settings, not those it was saved with
+        existing.max_weight = self.max_weight
+        existing.full_weight_samples = self.full_weight_samples
+        return existing
+
+    def _member_classes(self, model_manager):
+        for name, model in model_manager.models.items():
+            if name != 'incremental' and hasattr(model, 'classes_'):
+                return model.classes_
+        return self.classes
+
+    def _new_estimator(self):
+        from sklearn.linear_model import SGDClassifier
+        return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued'] = self.feedback.qsize()
+        stats['replay'] = len(self.replay)
+        stats['samples_seen'] = self.model.samples_seen if self.model is not None else 0
+        stats['ensemble_weight'] = self.model.ensemble_weight if self.model is not None else 0.0
+        return stats
@@ -0,0 +1,378 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+PCAP_GLOBAL_HEADER = struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)  # LINKTYPE_ETHERNET
+_PCAP_RECORD_HEADER = struct.Struct('<IIII')
+
+
+class RotatingPcapWriter:
+    """Writes evidence jobs to size- and time-rotated pcap files on a background thread
+
+    Jobs are queued without blocking; when the queue is full the job is dropped and
+    counted. Every written job is appended to index.jsonl with its file and byte offset.
+    """
+
+    def __init__(self, directory, max_file_bytes=64 * 1024 * 1024, rotate_seconds=3600,
+                 max_files=100, max_queue=1000):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.rotate_seconds = rotate_seconds
+        self.max_files = max_files
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.locations = OrderedDict()
+        self.max_locations = 100000
+        self.stats = {
+            'jobs_written': 0,
+            'packets_written': 0,
+            'bytes_written': 0,
+            'jobs_dropped': 0,
+            'packets_dropped': 0,
+            'files_rotated': 0,
+            'write_errors': 0
+        }
+
+        self._file = None
+        self._file_path = None
+        self._file_opened = 0.0
+        self._file_sequence = 0
+        self._index = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        # A thread started before a fork does not exist in the child; start it there too
+        if self._running and self._pid == os.getpid():
+            return
+        if self._pid not in (None, os.getpid()):
+            # Files, lock and queue belong to the parent's writer
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._lock = threading.Lock()
+            self._file = self._index = None
+        self._pid = os.getpid()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='forensic-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self._close_file()
+
+    def submit(self, evidence_id, packets, info):
+        """Queue (timestamp, bytes, wire length) packets for writing; never blocks"""
+        try:
+            self.queue.put_nowait((evidence_id, packets, info))
+            return True
+        except queue.Full:
+            self.stats['jobs_dropped'] += 1
+            self.stats['packets_dropped'] += len(packets)
+            return False
+
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.queue.unfinished_tasks == 0
+
+    def _run(self):
+        while self._running or not self.queue.empty():
+            try:
+                job = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._file is not None and time.time() - self._file_opened >= self.rotate_seconds:
+                    self._close_file()
+                continue
+
+            try:
+                self._write_job(*job)
+            except Exception as e:
+                print(f"Error writing forensic pcap: {e}")
+                self.stats['write_errors'] += 1
+                self.stats['packets_dropped'] += len(job[1])
+            finally:
+                self.queue.task_done()
+
+    def _open_file(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file_sequence += 1
+        name = f"forensic-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self._file_sequence:04d}.pcap"
+        self._file_path = os.path.join(self.directory, name)
+        self._file = open(self._file_path, 'wb')
+        self._file.write(PCAP_GLOBAL_HEADER)
+        self._file_opened = time.time()
+        if self._index is None:
+            self._index = open(os.path.join(self.directory, 'index.jsonl'), 'a')
+        self._prune()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.stats['files_rotated'] += 1
+        if self._index is not None:
+            self._index.flush()
+
+    def _prune(self):
+        files = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith('forensic-') and name.endswith('.pcap')
+        )
+        removed = set()
+        for name in files[:max(0, len(files) - self.max_files)]:
+            path = os.path.join(self.directory, name)
+            os.remove(path)
+            removed.add(path)
+        if removed:
+            self._prune_index(removed)
+
+    def _prune_index(self, removed):
+        """Drop index entries (and cached locations) for evidence in deleted pcap files"""
+        with self._lock:
+            for evidence_id in [key for key, location in self.locations.items() if location['file'] in removed]:
+                del self.locations[evidence_id]
+
+        path = os.path.join(self.directory, 'index.jsonl')
+        if self._index is not None:
+            self._index.close()
+        if os.path.exists(path):
+            staging = f"{path}.tmp"
+            with open(path) as src, open(staging, 'w') as dst:
+                for line in src:
+                    try:
+                        if json.loads(line).get('file') in removed:
+                            continue
+                    except ValueError:
+                        continue
+                    dst.write(line)
+            os.replace(staging, path)
+        self._index = open(path, 'a')
+
+    def _write_job(self, evidence_id, packets, info):
+        if self._file is not None and (
+            self._file.tell() >= self.max_file_bytes
+            or time.time() - self._file_opened >= self.rotate_seconds
+        ):
+            self._close_file()
+        if self._file is None:
+            self._open_file()
+
+        offset = self._file.tell()
+        written = 0
+        for timestamp, data, wirelen in packets:
+            seconds = int(timestamp)
+            self._file.write(_PCAP_RECORD_HEADER.pack(
+                seconds, int((timestamp - seconds) * 1e6), len(data), wirelen
+            ))
+            self._file.write(data)
+            written += 16 + len(data)
+        self._file.flush()
+
+        location = {
+            'evidence_id': evidence_id,
+            'file': self._file_path,
+            'offset': offset,
+            'length': written,
+            'packets': len(packets)
+        }
+        location.update(info)
+        self._index.write(json.dumps(location) + '\n')
+        self._index.flush()
+
+        with self._lock:
+            self.locations[evidence_id] = location
+            while len(self.locations) > self.max_locations:
+                self.locations.popitem(last=False)
+
+        self.stats['jobs_written'] += 1
+        self.stats['packets_written'] += len(packets)
+        self.stats['bytes_written'] += written
+
+    def location(self, evidence_id):
+        with self._lock:
+            location = self.locations.get(evidence_id)
+        if location is not None:
+            return location
+
+        # Older evidence (or evidence from before a restart) is only in the index file,
+        # which _prune keeps to the pcaps still on disk
+        path = os.path.join(self.directory, 'index.jsonl')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            for line in f:
+                if evidence_id in line:
+                    entry = json.loads(line)
+                    if entry.get('evidence_id') == evidence_id:
+                        return entry
+        return None
+
+    def read_evidence(self, evidence_id):
+        """Stand-alone pcap bytes for one evidence job, or None if unknown or rotated away"""
+        location = self.location(evidence_id)
+        if location is None or not os.path.exists(location['file']):
+            return None
+        with open(location['file'], 'rb') as f:
+            f.seek(location['offset'])
+            return PCAP_GLOBAL_HEADER + f.read(location['length'])
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued'] = self.queue.qsize()
+        stats['current_file'] = self._file_path if self._file is not None else None
+        return stats
+
+
+class _Evidence:
+    __slots__ = ('evidence_id', 'trigger_time', 'deadline', 'wall_deadline', 'packets', 'info')
+
+    def __init__(self, evidence_id, trigger_time, post_seconds, packets, info):
+        self.evidence_id = evidence_id
+        self.trigger_time = trigger_time
+        self.deadline = trigger_time + post_seconds
+        self.wall_deadline = time.monotonic() + post_seconds
+        self.packets = packets
+        self.info = info
+
+
+class ForensicRecorder:
+    """Keeps a short pre-trigger window of packets per flow and captures a post-trigger window on alert
+
+    observe() runs on the capture path and only appends to a bounded per-flow deque.
+    trigger() snapshots that deque and arms the flow; packets keep being collected until
+    post_seconds (or post_packets) have passed, then the whole window goes to the writer.
+    """
+
+    def __init__(self, writer, pre_packets=32, pre_seconds=5.0, post_packets=64, post_seconds=5.0,
+                 max_flows=10000):
+        self.writer = writer
+        self.pre_packets = pre_packets
+        self.pre_seconds = pre_seconds
+        self.post_packets = post_packets
+        self.post_seconds = post_seconds
+        self.max_flows = max_flows
+
+        self.flows = OrderedDict()
+        self.armed = {}
+        self.recent_evidence = OrderedDict()
+        self.stats = {'triggers': 0, 'evicted_flows': 0}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        if self._running and self._pid == os.getpid():
+            return
+        if self._pid not in (None, os.getpid()):
+            self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.writer.start()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='forensic-recorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+        self.writer.stop(timeout)
+
+    def _run(self):
+        while self._running:
+            time.sleep(0.5)
+            self.sweep()
+
+    def observe(self, flow_key, timestamp, data, wirelen=None):
+        """Remember a packet for its flow (and for an armed capture on that flow)"""
+        packet = (timestamp, data, wirelen if wirelen is not None else len(data))
+
+        with self._lock:
+            window = self.flows.get(flow_key)
+            if window is None:
+                window = self.flows[flow_key] = deque(maxlen=self.pre_packets)
+                if len(self.flows) > self.max_flows:
+                    self.flows.popitem(last=False)
+                    self.stats['evicted_flows'] += 1
+            else:
+                self.flows.move_to_end(flow_key)
+            window.append(packet)
+
+            evidence = self.armed.get(flow_key)
+            if evidence is None:
+                return
+            if timestamp > evidence.deadline or len(evidence.packets) >= self.pre_packets + self.post_packets:
+                del self.armed[flow_key]
+            else:
+                evidence.packets.append(packet)
+                return
+
+        self._submit(evidence)
+
+    def trigger(self, flow_key, timestamp, info=None):
+        """Start evidence capture for a flow; returns the evidence id alerts should carry"""
+        with self._lock:
+            evidence = self.armed.get(flow_key)
+            if evidence is not None:
+                return evidence.evidence_id
+
+            self._sequence += 1
+            evidence_id = f"{int(time.time())}-{self._sequence}"
+            window = self.flows.get(flow_key, ())
+            packets = [packet for packet in window if packet[0] >= timestamp - self.pre_seconds]
+
+            self.armed[flow_key] = _Evidence(evidence_id, timestamp, self.post_seconds, packets, info or {})
+            self.recent_evidence[flow_key] = evidence_id
+            self.recent_evidence.move_to_end(flow_key)
+            while len(self.recent_evidence) > self.max_flows:
+                self.recent_evidence.popitem(last=False)
+            self.stats['triggers'] += 1
+
+        return evidence_id
+
+    def evidence_for(self, flow_key):
+        with self._lock:
+            return self.recent_evidence.get(flow_key)
+
+    def sweep(self):
+        """Hand over captures whose flows went quiet before their post-trigger window ended"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, evidence in self.armed.items() if evidence.wall_deadline <= now]
+            finished = [self.armed.pop(key) for key in expired]
+        for evidence in finished:
+            self._submit(evidence)
+
+    def flush(self):
+        with self._lock:
+            finished = list(self.armed.values())
+            self.armed.clear()
+        for evidence in finished:
+            self._submit(evidence)
+
+    def _submit(self, evidence):
+        info = dict(evidence.info, trigger_time=evidence.trigger_time)
+        self.writer.submit(evidence.evidence_id, evidence.packets, info)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['tracked_flows'] = len(self.flows)
+            stats['armed'] = len(self.armed)
+        stats['writer'] = self.writer.get_stats()
+        return stats
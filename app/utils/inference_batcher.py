@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+
+
+class InferenceBatcher:
+    def __init__(self, handler, batch_size=1000, max_wait=0.05, max_queue=10000):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+        # Bounded hand-off between the capture thread and the inference stage
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        self.running = False
+        self.worker_thread = None
+
+        self.stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'batches': 0,
+            'batched_items': 0
+        }
+
+    def start(self):
+        """Start the batching thread"""
+        if self.running:
+            return False
+
+        self.running = True
+        self.worker_thread = threading.Thread(target=self._run)
+        self.worker_thread.daemon = True
+        self.worker_thread.start()
+
+        return True
+
+    def stop(self, timeout=5):
+        """Stop the batching thread after draining queued items"""
+        self.running = False
+        if self.worker_thread:
+            self.worker_thread.join(timeout=timeout)
+            self.worker_thread = None
+
+    def submit(self, item):
+        """Queue an item for inference without blocking the caller"""
+        try:
+            self.queue.put_nowait(item)
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until every queued item has been handled"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _collect_batch(self):
+        """Block for the first item, then fill the batch until size or deadline"""
+        try:
+            first = self.queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            try:
+                self.handler(batch)
+                self.stats['batches'] += 1
+                self.stats['batched_items'] += len(batch)
+            except Exception as e:
+                print(f"Error processing inference batch: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
@@ -0,0 +1,252 @@
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
+from app.utils.shared_ring import SharedFeatureRing
+
+
+def _worker_main(shard, ring_name, n_features, slots, settings, results, stop_event):
+    """Worker process: load its own models, drain one ring shard, report detections"""
+    ring = SharedFeatureRing.attach(ring_name, n_features, slots)
+
+    try:
+        _serve(shard, ring, n_features, settings, results, stop_event)
+    finally:
+        ring.close()
+        # Last message from this worker: the collector drains the queue up to it
+        results.put(('stopped', shard, None))
+
+
+def _serve(shard, ring, n_features, settings, results, stop_event):
+    from app.models.ml_models import MLModelManager
+    from app.utils.data_processor import DataProcessor
+
+    try:
+        model_manager = MLModelManager()
+        data_processor = DataProcessor()
+        model_manager.load_models(settings['model_path'])
+        data_processor.load_preprocessor(settings['preprocessor_path'])
+        vectorizer = data_processor.compile_vectorizer(batch_size=settings['batch_size'])
+        model_manager.set_ensemble_mode(
+            settings['ensemble_mode'], settings['threshold'], settings['cascade_band']
+        )
+    except Exception as e:
+        results.put(('error', shard, f"Could not load models: {e}"))
+        return
+
+    raw = np.zeros((settings['batch_size'], n_features), dtype=np.float64)
+    threshold = settings['threshold']
+    results.put(('ready', shard, None))
+
+    try:
+        while True:
+            position, n = ring.pop_batch(raw)
+            if n == 0:
+                if stop_event.is_set():
+                    break
+                time.sleep(settings['idle_sleep'])
+                continue
+
+            X = vectorizer.transform_raw(raw[:n])
+            ensemble_pred, individual_preds = model_manager.ensemble_predict(X)
+
+            detections = []
+            if ensemble_pred is not None:
+                predicted_classes = np.argmax(ensemble_pred, axis=1)
+                confidences = np.max(ensemble_pred, axis=1)
+                for i in np.flatnonzero((confidences > threshold) & (predicted_classes > 0)):
+                    detections.append((
+                        position + int(i),
+                        int(predicted_classes[i]),
+                        float(confidences[i]),
+                        {name: pred.tolist() for name, pred in
+                         model_manager.row_predictions(individual_preds, i).items()}
+                    ))
+
+            # Sent for every batch so the parent can release the packets' metadata
+            results.put(('processed', shard, (position, n, detections)))
+            ring.mark_processed(n)
+
+    except Exception as e:
+        results.put(('error', shard, str(e)))
+
+
+class InferenceWorkerPool:
+    def __init__(self, n_workers, n_features, fill_row, on_detection, settings, slots=65536):
+        self.n_workers = n_workers
+        self.n_features = n_features
+        self.fill_row = fill_row
+        self.on_detection = on_detection
+        self.settings = settings
+        self.slots = slots
+
+        # Alert metadata stays in the parent, indexed by ring position, until the batch is processed
+        self.meta_slots = 2 * slots
+        self.pending = []
+
+        # Records per shard whose results the collector has handled; flush() waits on these
+        self.collected = []
+
+        self.rings = []
+        self.processes = []
+        self.results = None
+        self.stop_event = None
+        self.collector_thread = None
+        self.running = False
+
+        self.stats = {
+            'submitted': 0,
+            'dropped': 0,
+            'lost_results': 0,
+            'worker_errors': 0
+        }
+
+    def start(self):
+        """Create the shared rings and spawn one worker process per shard"""
+        if self.running:
+            return False
+
+        # Spawn rather than fork so TensorFlow state is never inherited
+        context = multiprocessing.get_context('spawn')
+        self.results = context.Queue()
+        self.stop_event = context.Event()
+
+        for shard in range(self.n_workers):
+            ring = SharedFeatureRing(self.n_features, self.slots)
+            self.rings.append(ring)
+            self.pending.append([None] * self.meta_slots)
+            self.collected.append(0)
+
+            process = context.Process(
+                target=_worker_main,
+                args=(shard, ring.name, self.n_features, self.slots,
+                      self.settings, self.results, self.stop_event),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        self.running = True
+        self.collector_thread = threading.Thread(target=self._collect)
+        self.collector_thread.daemon = True
+        self.collector_thread.start()
+
+        return True
+
+    def submit(self, flow_key, alert_data, features):
+        """Write one feature record into the ring of the shard owning flow_key
+
+        alert_data is what on_detection receives for the record; keep it small (no raw
+        packet), since it is held until a worker has scored the record.
+        """
+        shard = hash(flow_key) % self.n_workers
+        ring = self.rings[shard]
+
+        row = ring.reserve()
+        if row is None:
+            self.stats['dropped'] += 1
+            return False
+
+        self.fill_row(row, features)
+        position = ring.head
+        self.pending[shard][position % self.meta_slots] = (position, alert_data)
+        ring.commit()
+
+        self.stats['submitted'] += 1
+        return True
+
+    def _collect(self):
+        """Route worker detections back to the parent's alerting path"""
+        # stop() replaces these lists once the pool is shut down
+        pending_by_shard, collected = self.pending, self.collected
+        stopped = set()
+        while len(stopped) < self.n_workers:
+            try:
+                kind, shard, payload = self.results.get(timeout=0.1)
+            except queue.Empty:
+                # A terminated worker never sends 'stopped'; the queue is drained by now
+                if not self.running and not any(process.is_alive() for process in self.processes):
+                    break
+                continue
+
+            if kind == 'stopped':
+                stopped.add(shard)
+                continue
+
+            if kind == 'error':
+                self.stats['worker_errors'] += 1
+                print(f"Inference worker {shard} error: {payload}")
+                continue
+
+            if kind != 'processed':
+                continue
+
+            pending = pending_by_shard[shard]
+            first, n, detections = payload
+            for position, predicted_class, confidence, model_predictions in detections:
+                meta = pending[position % self.meta_slots]
+                if meta is None or meta[0] != position:
+                    self.stats['lost_results'] += 1
+                    continue
+                try:
+                    self.on_detection(meta[1], predicted_class, confidence, model_predictions)
+                except Exception as e:
+                    print(f"Error handling worker detection: {e}")
+            self._release(pending, first, n)
+            collected[shard] += n
+
+    def _release(self, pending, first, n):
+        """Drop the metadata of a processed batch of ring positions"""
+        # The producer cannot reach these indices again until it is meta_slots ahead
+        start = first % self.meta_slots
+        end = min(start + n, self.meta_slots)
+        pending[start:end] = [None] * (end - start)
+        if start + n > self.meta_slots:
+            pending[:start + n - self.meta_slots] = [None] * (start + n - self.meta_slots)
+
+    def flush(self, timeout=None):
+        """Wait until every submitted record's results have been handled in this process"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while sum(self.collected) < self.stats['submitted']:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            if not any(process.is_alive() for process in self.processes):
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_stats(self):
+        stats = self.stats.copy()
+        if self.rings:
+            stats['processed'] = sum(self.collected)
+            stats['queued'] = sum(len(ring) for ring in self.rings)
+        stats['workers_alive'] = sum(process.is_alive() for process in self.processes)
+        return stats
+
+    def stop(self, timeout=5):
+        """Let workers drain their rings, then shut the pool down"""
+        if not self.running:
+            return
+
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+
+        # The collector handles every result the workers sent before it exits
+        self.running = False
+        if self.collector_thread:
+            self.collector_thread.join(timeout=timeout)
+
+        # Keep the final counts readable once the rings are gone
+        self.stats['processed'] = sum(self.collected)
+        self.stats['queued'] = 0
+        for ring in self.rings:
+            ring.close()
+
+        self.rings = []
+        self.pending = []
+        self.collected = []
+        self.processes = []
@@ -0,0 +1,238 @@
+import socket
+import struct
+import threading
+import time
+import numpy as np
+
+_IPV4 = struct.Struct('!I')
+
+FLAG_FRAGMENTED = 0x1
+FLAG_URGENT = 0x2
+
+
+def ip_to_int(address):
+    try:
+        return _IPV4.unpack(socket.inet_aton(address))[0]
+    except (OSError, TypeError):
+        return 0
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(_IPV4.pack(int(value)))
+
+
+# Per-packet features as the flow tracker produces them, packed to the narrowest type that
+# holds them. Rates are stored as 0-255 steps (within 0.002 of the float); counts and byte
+# totals saturate at their type's maximum. The NSL-KDD content features are constant in live
+# traffic, so they are not stored.
+RATE_FEATURES = (
+    'serror_rate', 'srv_serror_rate', 'rerror_rate', 'srv_rerror_rate', 'same_srv_rate',
+    'diff_srv_rate', 'srv_diff_host_rate', 'dst_host_same_srv_rate', 'dst_host_diff_srv_rate',
+    'dst_host_same_src_port_rate', 'dst_host_srv_diff_host_rate', 'dst_host_serror_rate',
+    'dst_host_srv_serror_rate', 'dst_host_rerror_rate', 'dst_host_srv_rerror_rate'
+)
+FEATURE_FIELDS = [
+    ('duration', np.uint32),
+    ('protocol_type', np.uint8),
+    ('service', np.uint8),
+    ('flag', np.uint8),
+    ('src_bytes', np.uint32),
+    ('dst_bytes', np.uint32),
+    ('land', np.uint8),
+    ('wrong_fragment', np.uint16),
+    ('urgent', np.uint16),
+    ('count', np.uint16),
+    ('srv_count', np.uint16),
+    ('dst_host_count', np.uint16),
+    ('dst_host_srv_count', np.uint16)
+] + [(name, np.uint8) for name in RATE_FEATURES]
+
+RATE_STEPS = 255
+
+
+class PacketRing:
+    """Preallocated columnar ring of recent packets: header fields plus the flow features
+
+    Each slot is one packed row of a NumPy structured array (71 bytes, 81 with raw bytes
+    enabled). Packet bytes, when kept, go to a separate fixed-size byte ring and are
+    readable until newer bytes overwrite them.
+    """
+
+    def __init__(self, capacity, raw_bytes=0, raw_snaplen=65535):
+        self.capacity = capacity
+        self.feature_names = [name for name, _ in FEATURE_FIELDS]
+
+        fields = [
+            ('timestamp', np.float64),
+            ('src_ip', np.uint32),
+            ('dst_ip', np.uint32),
+            ('src_port', np.uint16),
+            ('dst_port', np.uint16),
+            ('protocol', np.uint8),
+            ('flags', np.uint8),
+            ('tcp_flags', np.uint16),
+            ('length', np.uint32)
+        ]
+        # Offsets into the byte ring only take space when bytes are kept
+        if raw_bytes:
+            fields += [('raw_length', np.uint16), ('raw_offset', np.int64)]
+        self.dtype = np.dtype(fields + [('features', np.dtype(FEATURE_FIELDS))])
+        self.rows = np.zeros(capacity, dtype=self.dtype)
+
+        # Scale and ceiling per stored feature, applied before the narrowing write
+        self._scale = np.array([RATE_STEPS if name in RATE_FEATURES else 1 for name in self.feature_names],
+                               dtype=np.float64)
+        self._ceiling = np.array([np.iinfo(dtype).max for _, dtype in FEATURE_FIELDS], dtype=np.float64)
+
+        # Total packets ever appended; the next write goes to written % capacity
+        self.written = 0
+
+        self.raw_capacity = raw_bytes
+        self.raw_snaplen = min(raw_snaplen, np.iinfo(np.uint16).max)
+        self.raw = np.zeros(raw_bytes, dtype=np.uint8) if raw_bytes else None
+        self.raw_written = 0
+
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + (self.raw.nbytes if self.raw is not None else 0)
+
+    def append(self, timestamp, record, features, raw=None):
+        """Store one packet; record is a PacketRecord (or None for non-IP), features a dict"""
+        # Features are non-negative, so adding 0.5 before the integer write rounds to nearest
+        vector = np.array([features.get(name, 0) for name in self.feature_names], dtype=np.float64)
+        packed = tuple(np.minimum(vector * self._scale + 0.5, self._ceiling).tolist())
+
+        if record is not None:
+            header = (
+                timestamp,
+                ip_to_int(record.src_ip),
+                ip_to_int(record.dst_ip),
+                record.src_port,
+                record.dst_port,
+                record.protocol,
+                (FLAG_FRAGMENTED if record.fragmented else 0) | (FLAG_URGENT if record.urgent else 0),
+                record.tcp_flags,
+                record.length
+            )
+        else:
+            header = (timestamp, 0, 0, 0, 0, 0, 0, 0, 0)
+
+        with self._lock:
+            slot = self.written % self.capacity
+            self.written += 1
+
+            # One tuple assignment per row is several times cheaper than field-by-field writes
+            if self.raw is not None:
+                raw_offset, raw_length = self._append_raw(raw) if raw is not None else (-1, 0)
+                self.rows[slot] = header + (raw_length, raw_offset, packed)
+            else:
+                self.rows[slot] = header + (packed,)
+
+    def _append_raw(self, raw):
+        data = np.frombuffer(raw, dtype=np.uint8)[:min(self.raw_snaplen, self.raw_capacity)]
+        start = self.raw_written % self.raw_capacity
+        end = start + len(data)
+
+        if end <= self.raw_capacity:
+            self.raw[start:end] = data
+        else:
+            split = self.raw_capacity - start
+            self.raw[start:] = data[:split]
+            self.raw[:end - self.raw_capacity] = data[split:]
+
+        offset = self.raw_written
+        self.raw_written += len(data)
+        return offset, len(data)
+
+    def raw_bytes(self, row):
+        """Bytes kept for a row, or None if they were never kept or have been overwritten"""
+        if self.raw is None:
+            return None
+        offset, length = int(row['raw_offset']), int(row['raw_length'])
+
+        with self._lock:
+            if offset < 0 or offset < self.raw_written - self.raw_capacity:
+                return None
+
+            start = offset % self.raw_capacity
+            end = start + length
+            if end <= self.raw_capacity:
+                return self.raw[start:end].tobytes()
+            return self.raw[start:].tobytes() + self.raw[:end - self.raw_capacity].tobytes()
+
+    def _slots(self, n):
+        # Slot indices of the newest n rows, oldest first; callers hold the lock
+        end = self.written % self.capacity
+        return np.arange(end - n, end) % self.capacity
+
+    def ordered(self):
+        """Copy of every stored row, oldest first"""
+        with self._lock:
+            return self.rows[self._slots(len(self))]
+
+    def last(self, n):
+        """Copy of the newest n rows, oldest first"""
+        with self._lock:
+            return self.rows[self._slots(min(n, len(self)))]
+
+    def last_seconds(self, seconds, now=None):
+        """Rows with a timestamp in the last `seconds`, oldest first"""
+        cutoff = (now if now is not None else time.time()) - seconds
+        with self._lock:
+            slots = self._slots(len(self))
+            # Filter on the timestamp column first so only matching rows are copied
+            return self.rows[slots[self.rows['timestamp'][slots] >= cutoff]]
+
+    def feature_column(self, rows, name):
+        """One stored feature of `rows` as float64, with rates scaled back to 0-1"""
+        column = rows['features'][name].astype(np.float64)
+        if name in RATE_FEATURES:
+            column /= RATE_STEPS
+        return column
+
+    def summary(self, seconds, now=None, top_k=10):
+        """Packet and byte rates, protocol mix and top talkers over the last `seconds`"""
+        rows = self.last_seconds(seconds, now)
+        if len(rows) == 0:
+            return {'packets': 0, 'bytes': 0, 'packets_per_second': 0.0, 'bytes_per_second': 0.0,
+                    'protocols': {}, 'top_sources': [], 'top_destinations': []}
+
+        span = max(float(rows['timestamp'][-1] - rows['timestamp'][0]), 1e-6)
+        total_bytes = int(rows['length'].sum(dtype=np.int64))
+
+        protocols, protocol_counts = np.unique(rows['protocol'], return_counts=True)
+
+        return {
+            'packets': len(rows),
+            'bytes': total_bytes,
+            'packets_per_second': len(rows) / span,
+            'bytes_per_second': total_bytes / span,
+            'protocols': {int(p): int(c) for p, c in zip(protocols, protocol_counts)},
+            'top_sources': self._top_talkers(rows, 'src_ip', top_k),
+            'top_destinations': self._top_talkers(rows, 'dst_ip', top_k)
+        }
+
+    def _top_talkers(self, rows, column, top_k):
+        addresses, inverse = np.unique(rows[column], return_inverse=True)
+        packets = np.bincount(inverse)
+        volume = np.bincount(inverse, weights=rows['length'])
+        order = np.argsort(-packets, kind='stable')[:top_k]
+        return [
+            {'ip': int_to_ip(addresses[i]), 'packets': int(packets[i]), 'bytes': int(volume[i])}
+            for i in order
+        ]
+
+    def get_stats(self):
+        return {
+            'capacity': self.capacity,
+            'stored': len(self),
+            'written': self.written,
+            'memory_bytes': self.nbytes,
+            'raw_capacity': self.raw_capacity,
+            'raw_written': self.raw_written
+        }
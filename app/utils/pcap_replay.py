@@ -0,0 +1,37 @@
+import time
+
+
+class PcapReplaySource:
+    def __init__(self, path, speed=1.0):
+        self.path = path
+
+        # speed 1.0 keeps original timing, N replays N times faster, None/0 as fast as possible
+        self.speed = speed or None
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def __iter__(self):
+        """Stream packets from a pcap/pcapng file, pacing them by capture timestamps"""
+        # scapy.all registers the link-layer dissectors; without them every packet reads as Raw
+        from scapy.all import PcapReader
+
+        first_ts = None
+        start = time.monotonic()
+
+        # PcapReader reads one record at a time and detects pcapng files itself
+        with PcapReader(self.path) as reader:
+            for packet in reader:
+                if self.stopped:
+                    break
+
+                if self.speed:
+                    packet_ts = float(packet.time)
+                    if first_ts is None:
+                        first_ts = packet_ts
+                    delay = start + (packet_ts - first_ts) / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                yield packet
@@ -0,0 +1,282 @@
+import ctypes
+import mmap
+import select
+import socket
+import struct
+import time
+from app.utils.feature_extractor import PacketRecord, PROTO_ICMP, PROTO_TCP, PROTO_UDP
+
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+ETH_HEADER_LEN = 14
+
+# linux/if_packet.h
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+PACKET_OUTGOING = 4
+SO_ATTACH_FILTER = 26
+
+_ETHERTYPE = struct.Struct('!H')
+_IPV4 = struct.Struct('!B5xHxB2x4s4s')
+_PORTS = struct.Struct('!HH')
+
+# tpacket_block_desc: version, offset_to_priv, then tpacket_hdr_v1 starting with
+# block_status, num_pkts, offset_to_first_pkt
+_BLOCK_HEADER = struct.Struct('=IIIII')
+# tpacket3_hdr: next_offset, sec, nsec, snaplen, len, status, mac, net
+_PACKET_HEADER = struct.Struct('=IIIIIIHH')
+# sockaddr_ll follows tpacket3_hdr at TPACKET_ALIGN(sizeof(tpacket3_hdr)); pkttype is byte 10
+_SOCKADDR_LL_OFFSET = 48
+_TPACKET_REQ3 = struct.Struct('=IIIIIII')
+
+
+def parse_frame(frame, timestamp, ip_offset=None):
+    """Read the IPv4 header fields the flow tracker needs straight from frame bytes
+
+    Mirrors what Scapy dissection yields for the same bytes: VLAN tags are skipped,
+    transport headers are only read from the first fragment, and `length` is the
+    captured frame length. Returns None for anything that is not IPv4.
+    """
+    view = memoryview(frame)
+    size = len(view)
+
+    if ip_offset is None:
+        if size < ETH_HEADER_LEN:
+            return None
+        ethertype, = _ETHERTYPE.unpack_from(view, 12)
+        ip_offset = ETH_HEADER_LEN
+        while ethertype in VLAN_ETHERTYPES and size >= ip_offset + 4:
+            ethertype, = _ETHERTYPE.unpack_from(view, ip_offset + 2)
+            ip_offset += 4
+        if ethertype != ETH_P_IP:
+            return None
+
+    if size < ip_offset + 20:
+        return None
+
+    version_ihl, flags_fragment, protocol, src, dst = _IPV4.unpack_from(view, ip_offset)
+    if version_ihl >> 4 != 4:
+        return None
+
+    l4 = ip_offset + (version_ihl & 0x0F) * 4
+    more_fragments = flags_fragment & 0x2000
+    fragment_offset = flags_fragment & 0x1FFF
+    src_port = dst_port = tcp_flags = 0
+
+    if fragment_offset == 0:
+        if protocol == PROTO_TCP and size >= l4 + 14:
+            src_port, dst_port = _PORTS.unpack_from(view, l4)
+            # NS lives in the low bit of the data-offset byte
+            tcp_flags = ((view[l4 + 12] & 0x01) << 8) | view[l4 + 13]
+        elif protocol == PROTO_UDP and size >= l4 + 4:
+            src_port, dst_port = _PORTS.unpack_from(view, l4)
+        elif protocol == PROTO_ICMP and size >= l4 + 1:
+            dst_port = view[l4]
+
+    return PacketRecord(
+        timestamp=timestamp,
+        src_ip=socket.inet_ntoa(src),
+        dst_ip=socket.inet_ntoa(dst),
+        protocol=protocol,
+        src_port=src_port,
+        dst_port=dst_port,
+        length=size,
+        tcp_flags=tcp_flags,
+        fragmented=int(bool(more_fragments or fragment_offset)),
+        urgent=int(bool(tcp_flags & 0x20))
+    )
+
+
+class CapturedFrame:
+    """A frame from the raw-socket backend; carries its bytes and pre-parsed header record"""
+
+    __slots__ = ('time', 'data', 'record', 'wirelen')
+
+    def __init__(self, timestamp, data, record, wirelen=None):
+        self.time = timestamp
+        self.data = data
+        self.record = record
+        self.wirelen = wirelen if wirelen is not None else len(data)
+
+    def __bytes__(self):
+        return self.data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [('code', ctypes.c_uint16), ('jt', ctypes.c_uint8), ('jf', ctypes.c_uint8), ('k', ctypes.c_uint32)]
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [('len', ctypes.c_uint16), ('filter', ctypes.POINTER(_SockFilter))]
+
+
+def compile_bpf(expression, interface=None):
+    """Classic BPF instructions for a filter
+
+    Accepts `tcpdump -ddd` output (instruction count, then one "code jt jf k" line per
+    instruction) or a pcap filter expression, which is compiled once through
+    Scapy/libpcap.
+    """
+    lines = [line.split() for line in expression.strip().splitlines()]
+    if lines and all(part.isdigit() for line in lines for part in line):
+        count = int(lines[0][0])
+        return [tuple(int(part) for part in line) for line in lines[1:count + 1]]
+
+    from scapy.arch.common import compile_filter
+    program = compile_filter(expression, iface=interface)
+    return [
+        (program.bf_insns[i].code, program.bf_insns[i].jt, program.bf_insns[i].jf, program.bf_insns[i].k)
+        for i in range(program.bf_len)
+    ]
+
+
+def attach_bpf(sock, instructions):
+    """Attach a classic BPF program so the kernel drops unwanted packets before copying"""
+    filters = (_SockFilter * len(instructions))(*[_SockFilter(*insn) for insn in instructions])
+    program = _SockFprog(len(instructions), filters)
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, bytes(memoryview(program)))
+    # The kernel copies the program during setsockopt, so the buffers may go now
+
+
+class RawSocketCapture:
+    """Linux AF_PACKET capture with a TPACKET_V3 mmap ring and an optional kernel BPF filter
+
+    Frames are read straight from the shared ring and parsed with parse_frame, skipping
+    Scapy dissection entirely. Falls back to recv() on a plain packet socket when the
+    ring cannot be set up.
+    """
+
+    def __init__(self, interface, bpf_filter=None, snaplen=65535, block_size=1 << 20,
+                 block_count=64, poll_timeout=0.1, use_ring=True):
+        self.interface = interface
+        self.snaplen = snaplen
+        self.block_size = block_size
+        self.block_count = block_count
+        self.poll_timeout = poll_timeout
+
+        self.stats = {'received': 0, 'kernel_dropped': 0, 'frames': 0}
+        self.ring = None
+        self.ring_enabled = False
+
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        try:
+            if bpf_filter:
+                attach_bpf(self.sock, compile_bpf(bpf_filter, interface))
+            self.sock.bind((interface, ETH_P_ALL))
+            self.loopback = self.sock.getsockname()[3] == 772  # ARPHRD_LOOPBACK
+
+            if use_ring:
+                try:
+                    self._setup_ring()
+                except OSError as e:
+                    print(f"TPACKET_V3 ring unavailable on {interface}, using recv(): {e}")
+        except Exception:
+            self.sock.close()
+            raise
+
+    def _setup_ring(self):
+        frame_size = 2048
+        self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+        request = _TPACKET_REQ3.pack(
+            self.block_size,
+            self.block_count,
+            frame_size,
+            (self.block_size // frame_size) * self.block_count,
+            int(self.poll_timeout * 1000) or 1,  # retire partially filled blocks
+            0,
+            0
+        )
+        self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, request)
+        self.ring = mmap.mmap(
+            self.sock.fileno(),
+            self.block_size * self.block_count,
+            mmap.MAP_SHARED,
+            mmap.PROT_READ | mmap.PROT_WRITE
+        )
+        self.ring_enabled = True
+
+    def frames(self, should_stop):
+        """Yield CapturedFrames until should_stop() returns True; checked at least every poll_timeout"""
+        if self.ring_enabled:
+            return self._ring_frames(should_stop)
+        return self._recv_frames(should_stop)
+
+    def _ring_frames(self, should_stop):
+        ring = memoryview(self.ring)
+        poller = select.poll()
+        poller.register(self.sock.fileno(), select.POLLIN | select.POLLERR)
+        block = 0
+
+        try:
+            yield from self._read_blocks(ring, poller, block, should_stop)
+        finally:
+            ring.release()
+
+    def _read_blocks(self, ring, poller, block, should_stop):
+        while not should_stop():
+            base = block * self.block_size
+            _, _, status, num_packets, first = _BLOCK_HEADER.unpack_from(ring, base)
+
+            if not status & TP_STATUS_USER:
+                poller.poll(int(self.poll_timeout * 1000))
+                continue
+
+            offset = base + first
+            for _ in range(num_packets):
+                next_offset, sec, nsec, snaplen, wirelen, _, mac, net = _PACKET_HEADER.unpack_from(ring, offset)
+                self.stats['frames'] += 1
+
+                # Loopback shows every packet twice, once in each direction
+                if not (self.loopback and ring[offset + _SOCKADDR_LL_OFFSET + 10] == PACKET_OUTGOING):
+                    data = bytes(ring[offset + mac:offset + mac + snaplen])
+                    timestamp = sec + nsec * 1e-9
+                    yield CapturedFrame(timestamp, data, parse_frame(data, timestamp, net - mac), wirelen)
+
+                offset += next_offset
+
+            # Hand the block back to the kernel
+            struct.pack_into('=I', ring, base + 8, TP_STATUS_KERNEL)
+            block = (block + 1) % self.block_count
+
+    def _recv_frames(self, should_stop):
+        self.sock.settimeout(self.poll_timeout)
+        while not should_stop():
+            try:
+                data, address = self.sock.recvfrom(self.snaplen)
+            except socket.timeout:
+                continue
+            self.stats['frames'] += 1
+            if self.loopback and address[2] == PACKET_OUTGOING:
+                continue
+            timestamp = time.time()
+            yield CapturedFrame(timestamp, data, parse_frame(data, timestamp))
+
+    def get_stats(self):
+        """Kernel receive and drop counters; the kernel resets them on every read"""
+        size = 12 if self.ring_enabled else 8
+        try:
+            counters = self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, size)
+            packets, drops = struct.unpack_from('=II', counters)
+            self.stats['received'] += packets
+            self.stats['kernel_dropped'] += drops
+        except OSError:
+            pass
+        return dict(self.stats)
+
+    def close(self):
+        if self.ring is not None:
+            try:
+                self.ring.close()
+            except BufferError:
+                pass  # A reader still holds a view; the mapping goes with the socket
+            self.ring = None
+        self.sock.close()
@@ -0,0 +1,100 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# Header layout (uint64 words); head and tail sit on separate cache lines
+HEAD = 0
+TAIL = 8
+PROCESSED = 16
+HEADER_WORDS = 24
+
+
+class SharedFeatureRing:
+    """Single-producer/single-consumer ring of fixed-width feature records in shared memory"""
+
+    def __init__(self, n_features, slots, name=None, create=True):
+        self.n_features = n_features
+        self.slots = slots
+
+        size = self.nbytes(n_features, slots)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.name = self.shm.name
+        self.owner = create
+
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=buf)
+        self.features = np.ndarray((slots, n_features), dtype=np.float64, buffer=buf,
+                                   offset=HEADER_WORDS * 8)
+
+        if create:
+            self.header[:] = 0
+
+    @staticmethod
+    def nbytes(n_features, slots):
+        return HEADER_WORDS * 8 + slots * n_features * 8
+
+    @classmethod
+    def attach(cls, name, n_features, slots):
+        """Open an existing ring created by another process"""
+        return cls(n_features, slots, name=name, create=False)
+
+    # Producer side
+
+    def reserve(self):
+        """Return the next free feature row, or None when the ring is full"""
+        head = int(self.header[HEAD])
+        if head - int(self.header[TAIL]) >= self.slots:
+            return None
+        return self.features[head % self.slots]
+
+    def commit(self):
+        """Publish the row returned by reserve() and return its ring position"""
+        head = int(self.header[HEAD])
+        self.header[HEAD] = head + 1
+        return head
+
+    def push(self, values):
+        row = self.reserve()
+        if row is None:
+            return None
+        row[:] = values
+        return self.commit()
+
+    # Consumer side
+
+    def pop_batch(self, features_out):
+        """Copy up to len(features_out) records out; returns (first position, count)"""
+        tail = int(self.header[TAIL])
+        n = min(int(self.header[HEAD]) - tail, len(features_out))
+        if n <= 0:
+            return tail, 0
+
+        start = tail % self.slots
+        first = min(n, self.slots - start)
+        features_out[:first] = self.features[start:start + first]
+        if first < n:
+            features_out[first:n] = self.features[:n - first]
+
+        self.header[TAIL] = tail + n
+        return tail, n
+
+    def mark_processed(self, n):
+        self.header[PROCESSED] = int(self.header[PROCESSED]) + n
+
+    @property
+    def head(self):
+        """Ring position the next committed record will occupy"""
+        return int(self.header[HEAD])
+
+    def __len__(self):
+        return int(self.header[HEAD]) - int(self.header[TAIL])
+
+    @property
+    def processed(self):
+        return int(self.header[PROCESSED])
+
+    def close(self):
+        # Drop numpy views before releasing the mapping
+        self.header = self.features = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
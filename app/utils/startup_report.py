@@ -0,0 +1,60 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """Import and load timings for the components a process brings up"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def record(self, component, kind, seconds):
+        with self._lock:
+            self.entries.append({
+                'component': component,
+                'kind': kind,
+                'seconds': round(seconds, 4),
+                'at': round(time.time() - self.started, 4)
+            })
+
+    @contextmanager
+    def timed(self, component, kind):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(component, kind, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self._lock:
+            entries = list(self.entries)
+        totals = {}
+        for entry in entries:
+            totals[entry['kind']] = round(totals.get(entry['kind'], 0.0) + entry['seconds'], 4)
+        return {'entries': entries, 'totals': totals}
+
+    def print_report(self):
+        report = self.as_dict()
+        print("Startup report:")
+        for entry in report['entries']:
+            print(f"  {entry['kind']:<6} {entry['component']:<32} {entry['seconds']:8.3f}s")
+        for kind, seconds in report['totals'].items():
+            print(f"  total {kind}: {seconds:.3f}s")
+
+
+startup_report = StartupReport()
+
+
+def lazy_import(module_name, component=None):
+    """Import a heavy module on first use and record how long the import took"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    with startup_report.timed(component or module_name, 'import'):
+        return importlib.import_module(module_name)
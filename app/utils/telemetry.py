@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+TELEMETRY_ROOM = 'telemetry'
+
+
+def _threat_payload(threat):
+    timestamp = threat['timestamp']
+    return {
+        'timestamp': timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        'threat_type': threat['threat_type'],
+        'confidence': threat['confidence'],
+        'count': threat.get('count', 1),
+        'source_ip': threat['source_ip'],
+        'destination_ip': threat['destination_ip']
+    }
+
+
+class TelemetryBroadcaster:
+    """Samples analyzer stats once per tick and pushes deltas and threat batches to one Socket.IO room
+
+    Subscribers acknowledge each tick with 'telemetry_ack'. A subscriber more than
+    max_lag ticks behind is taken out of the room, so nothing queues up for it; once it
+    acknowledges again it is sent a full snapshot and rejoins.
+    """
+
+    def __init__(self, socketio, analyzer_source, interval=1.0, threat_batch=50, max_lag=5):
+        self.socketio = socketio
+        self.analyzer_source = analyzer_source
+        self.interval = interval
+        self.threat_batch = threat_batch
+        self.max_lag = max_lag
+
+        self.seq = 0
+        self.snapshot = {}
+        self.subscribers = {}
+        self.lagging = set()
+
+        self.stats = {
+            'ticks': 0,
+            'threats_sent': 0,
+            'threats_coalesced': 0,
+            'lag_drops': 0,
+            'resyncs': 0
+        }
+
+        self._last_counts = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self, interval=None, threat_batch=None, max_lag=None):
+        """Start the broadcast loop once; later calls are no-ops"""
+        with self._lock:
+            if self._running:
+                return False
+            self.interval = interval or self.interval
+            self.threat_batch = threat_batch or self.threat_batch
+            self.max_lag = max_lag or self.max_lag
+            self._running = True
+
+        self.socketio.start_background_task(self._run)
+        return True
+
+    def stop(self):
+        self._running = False
+
+    def subscribe(self, sid):
+        """Add a client to the room and send it the current full snapshot"""
+        with self._lock:
+            self.subscribers[sid] = self.seq
+            self.lagging.discard(sid)
+            snapshot = dict(self.snapshot)
+            seq = self.seq
+
+        self.socketio.server.enter_room(sid, TELEMETRY_ROOM, namespace='/')
+        self.socketio.emit('system_stats', {'seq': seq, 'full': True, 'changes': snapshot}, to=sid)
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            self.subscribers.pop(sid, None)
+            self.lagging.discard(sid)
+
+    def acknowledge(self, sid, seq):
+        with self._lock:
+            if sid not in self.subscribers:
+                return
+            self.subscribers[sid] = max(self.subscribers[sid], int(seq))
+            resync = sid in self.lagging
+
+        # A lagging client has caught up: the deltas it missed are folded into one snapshot
+        if resync:
+            self.stats['resyncs'] += 1
+            self.subscribe(sid)
+
+    def sample(self):
+        """Read analyzer stats once for every subscriber"""
+        analyzer = self.analyzer_source()
+        if analyzer is None:
+            return {}, []
+
+        stats = analyzer.get_system_stats()
+        rollups = analyzer.get_threat_rollups()
+        snapshot = {
+            'threats_detected': stats['threats_detected'],
+            'packets_analyzed': stats['total_packets'],
+            'false_positives': stats['false_positives'],
+            'queue_dropped': stats['queue_dropped'],
+            'system_load': stats['system_load'],
+            'cpu_usage': stats['system_load'],
+            'memory_usage': stats['memory_usage'],
+            'threats_last_5m': rollups['5m']['total'],
+            'threats_last_hour': rollups['1h']['total'],
+            'monitoring_active': analyzer.monitoring_active
+        }
+
+        threats = []
+        while True:
+            try:
+                threats.append(analyzer.threat_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return snapshot, threats
+
+    def _run(self):
+        while self._running:
+            start = time.monotonic()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error in telemetry broadcaster: {e}")
+            self.socketio.sleep(max(0.0, self.interval - (time.monotonic() - start)))
+
+    def tick(self):
+        snapshot, threats = self.sample()
+        now = time.monotonic()
+
+        with self._lock:
+            self.seq += 1
+            seq = self.seq
+            changes = {key: value for key, value in snapshot.items() if self.snapshot.get(key) != value}
+            self.snapshot = snapshot
+
+            # Clients too far behind stop receiving until they acknowledge again
+            for sid, acked in self.subscribers.items():
+                if sid not in self.lagging and seq - acked > self.max_lag:
+                    self.lagging.add(sid)
+                    self.stats['lag_drops'] += 1
+                    self.socketio.server.leave_room(sid, TELEMETRY_ROOM, namespace='/')
+
+            self.stats['ticks'] += 1
+
+        if not self.subscribers:
+            self._last_counts = None
+            return
+
+        self.socketio.emit('system_stats', {'seq': seq, 'full': False, 'changes': changes}, to=TELEMETRY_ROOM)
+
+        if snapshot:
+            counts = (now, snapshot['packets_analyzed'], snapshot['threats_detected'])
+            if self._last_counts is not None:
+                elapsed = max(now - self._last_counts[0], 1e-6)
+                self.socketio.emit('network_activity', {
+                    'timestamp': datetime.now().isoformat(),
+                    'packets_per_second': (counts[1] - self._last_counts[1]) / elapsed,
+                    'threats_per_second': (counts[2] - self._last_counts[2]) / elapsed
+                }, to=TELEMETRY_ROOM)
+            self._last_counts = counts
+
+        if threats:
+            # Bursts collapse into one event per tick carrying at most threat_batch alerts
+            sent = threats[-self.threat_batch:]
+            self.stats['threats_sent'] += len(sent)
+            self.stats['threats_coalesced'] += len(threats) - len(sent)
+            self.socketio.emit('threat_detected', {
+                'seq': seq,
+                'count': len(threats),
+                'dropped': len(threats) - len(sent),
+                'threats': [_threat_payload(threat) for threat in sent]
+            }, to=TELEMETRY_ROOM)
+
+    def current_snapshot(self):
+        with self._lock:
+            return dict(self.snapshot)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['subscribers'] = len(self.subscribers)
+            stats['lagging'] = len(self.lagging)
+        return stats
@@ -1,41 +1,186 @@
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
 import queue
 import time
-from collections import deque
+import uuid
+from collections import OrderedDict
 import psutil
-import socket
-from scapy.all import sniff, IP, TCP, UDP
-import json
+from app.utils.inference_batcher import InferenceBatcher
+from app.utils.inference_workers import InferenceWorkerPool
+from app.utils.pcap_replay import PcapReplaySource
+from app.utils.alert_store import AlertStore
+from app.utils.threat_rollups import ThreatRollups
+from app.utils.alert_aggregator import AlertAggregator
+from app.utils.startup_report import lazy_import
+from app.utils.feature_extractor import FlowTracker, PacketRecord
+from app.utils.categorical_encoder import CategoricalEncoder, CATEGORICAL_COLUMNS, NSL_KDD_VOCABULARY
+from app.utils.capture_supervisor import CaptureSupervisor
+from app.utils.raw_capture import CapturedFrame
+from app.utils.packet_ring import PacketRing
+from app.utils.forensics import ForensicRecorder, RotatingPcapWriter
+from app.utils.feedback_learner import FeedbackLearner
+
+DEFAULT_ENCODER = CategoricalEncoder(NSL_KDD_VOCABULARY)
+
+# Analyst verdicts and the counters they update
+FEEDBACK_VERDICTS = {'true_positive': 'true_positives', 'false_positive': 'false_positives'}
+
+THREAT_TYPES = {
+    0: 'Normal',
+    1: 'DoS/DDoS',
+    2: 'Probe/Scan',
+    3: 'R2L',
+    4: 'U2R'
+}
+
+
+def _scapy():
+    """Scapy is imported on first use so the web tier starts without it"""
+    return lazy_import('scapy.all', 'scapy')
 
 class RealTimeThreatAnalyzer:
     def __init__(self, model_manager, data_processor, config):
         self.model_manager = model_manager
         self.data_processor = data_processor
+        
+        # Optional ModelRegistry; when attached its active set replaces the two above
+        self.registry = None
         self.config = config
         
         # Real-time data storage
-        self.packet_buffer = deque(maxlen=10000)
-        self.threat_queue = queue.Queue()
-        self.alert_history = deque(maxlen=1000)
+        self.packet_buffer = PacketRing(
+            self._setting('PACKET_RING_CAPACITY', 1048576),
+            raw_bytes=self._setting('PACKET_RING_RAW_BYTES', 0),
+            raw_snaplen=self._setting('PACKET_RING_RAW_SNAPLEN', 2048)
+        )
+        self.threat_queue = queue.Queue(maxsize=self._setting('THREAT_QUEUE_SIZE', 10000))
+        
+        # Background services start in start_services(), in the process that uses them: with
+        # PRELOAD_MODELS this constructor runs in the gunicorn master before it forks
         
-        # Monitoring flags
+        # Durable alert log; writes are queued so bursts never block detection
+        self.alert_store = AlertStore(
+            self._setting('SQLALCHEMY_DATABASE_URI', 'sqlite:///ids.db'),
+            batch_size=self._setting('ALERT_BATCH_SIZE', 500),
+            max_wait=self._setting('ALERT_BATCH_MAX_WAIT', 0.25),
+            max_queue=self._setting('ALERT_QUEUE_SIZE', 50000),
+            max_alerts=self._setting('MAX_ALERTS'),
+            retention_days=self._setting('ALERT_RETENTION_DAYS'),
+            sweep_interval=self._setting('ALERT_SWEEP_INTERVAL', 60.0)
+        )
+        
+        # Windowed counters so summaries never scan alerts
+        self.rollups = ThreatRollups(
+            top_k=self._setting('ROLLUP_TOP_K', 10),
+            bucket_capacity=self._setting('ROLLUP_BUCKET_CAPACITY', 1000)
+        )
+        
+        # Repeated (source, destination, threat type) detections are rolled up per window
+        self.alert_aggregator = AlertAggregator(
+            self.publish_rollup,
+            window=self._setting('ALERT_AGGREGATION_WINDOW', 10.0),
+            max_groups=self._setting('ALERT_AGGREGATION_MAX_GROUPS', 10000)
+        )
+        
+        # Per-flow packet windows written out as pcap evidence when an alert fires
+        self.forensics = None
+        if self._setting('FORENSICS_ENABLED', False):
+            self.forensics = ForensicRecorder(
+                RotatingPcapWriter(
+                    self._setting('FORENSICS_PATH', 'forensics'),
+                    max_file_bytes=self._setting('FORENSICS_MAX_FILE_BYTES', 64 * 1024 * 1024),
+                    rotate_seconds=self._setting('FORENSICS_ROTATE_SECONDS', 3600),
+                    max_files=self._setting('FORENSICS_MAX_FILES', 100),
+                    max_queue=self._setting('FORENSICS_QUEUE_SIZE', 1000)
+                ),
+                pre_packets=self._setting('FORENSICS_PRE_PACKETS', 32),
+                pre_seconds=self._setting('FORENSICS_PRE_SECONDS', 5.0),
+                post_packets=self._setting('FORENSICS_POST_PACKETS', 64),
+                post_seconds=self._setting('FORENSICS_POST_SECONDS', 5.0),
+                max_flows=self._setting('FORENSICS_MAX_FLOWS', 10000)
+            )
+        
+        # Analyst verdicts train an incremental ensemble member in the background
+        self.feedback_learner = None
+        if self._setting('FEEDBACK_ENABLED', True):
+            self.feedback_learner = FeedbackLearner(
+                self.current_models,
+                classes=sorted(THREAT_TYPES),
+                buffer_size=self._setting('FEEDBACK_BUFFER_SIZE', 10000),
+                batch_size=self._setting('FEEDBACK_BATCH_SIZE', 64),
+                replay_size=self._setting('FEEDBACK_REPLAY_SIZE', 2000),
+                min_samples=self._setting('FEEDBACK_MIN_SAMPLES', 50),
+                interval=self._setting('FEEDBACK_INTERVAL', 1.0),
+                max_weight=self._setting('FEEDBACK_MAX_WEIGHT', 0.25),
+                full_weight_samples=self._setting('FEEDBACK_FULL_WEIGHT_SAMPLES', 1000),
+                model_path_source=self.current_model_path,
+                save_interval=self._setting('FEEDBACK_SAVE_INTERVAL', 60.0)
+            )
+        
+        # Monitoring flags; live capture and pcap replay are mutually exclusive
         self.monitoring_active = False
-        self.monitoring_thread = None
+        self.replay_active = False
+        self.capture_lock = threading.Lock()
+        self.capture_supervisor = None
+        
+        # Background replays started through start_replay, most recent last
+        self.replay_jobs = OrderedDict()
+        self.max_replay_jobs = self._setting('REPLAY_MAX_JOBS', 100)
+        
+        # Decoupled inference stage fed by the capture thread
+        self.batcher = InferenceBatcher(
+            self.analyze_batch,
+            batch_size=self._setting('BATCH_SIZE', 1000),
+            max_wait=self._setting('BATCH_MAX_WAIT', 0.05),
+            max_queue=self._setting('INFERENCE_QUEUE_SIZE', 10000)
+        )
+        
+        # Optional multi-process inference, enabled by INFERENCE_WORKERS
+        self.worker_pool = None
+        
+        # Compiled on first use from the fitted data processor, one per thread: the output
+        # batch is reused between calls, and the batcher, replay and API threads all score
+        self.vectorizers = threading.local()
+        
+        # Connection state and NSL-KDD traffic windows
+        self.flow_tracker = self.new_flow_tracker()
         
         # Statistics
         self.stats = {
             'total_packets': 0,
             'threats_detected': 0,
+            'true_positives': 0,
             'false_positives': 0,
+            'queue_dropped': 0,
+            'packets_analyzed': 0,
             'system_load': 0.0,
             'memory_usage': 0.0
         }
     
+    def _setting(self, name, default=None):
+        """Read a config value from either a Flask config dict or a config class"""
+        if isinstance(self.config, dict):
+            return self.config.get(name, default)
+        return getattr(self.config, name, default)
+    
+    def new_flow_tracker(self):
+        """Empty connection table and traffic windows"""
+        return FlowTracker(
+            time_window=self._setting('FLOW_TIME_WINDOW', 2.0),
+            host_window=self._setting('FLOW_HOST_WINDOW', 100),
+            idle_timeout=self._setting('FLOW_IDLE_TIMEOUT', 120.0),
+            max_flows=self._setting('FLOW_TABLE_MAX', 500000)
+        )
+    
     def extract_packet_features(self, packet):
         """Extract features from network packet"""
+        scapy = _scapy()
+        record = self.packet_record(packet) if scapy.IP in packet else None
+        return self.record_features(record)
+    
+    def record_features(self, record):
+        """Build the model's feature dict from a parsed header record (None for non-IP)"""
         features = {
             'duration': 0,
             'protocol_type': 0,
@@ -81,145 +226,314 @@ class RealTimeThreatAnalyzer:
         }
         
         try:
-            if IP in packet:
-                ip_layer = packet[IP]
-                
-                # Basic IP features
-                features['src_bytes'] = len(packet)
-                features['dst_bytes'] = len(packet)
-                
-                # Protocol type
-                if TCP in packet:
-                    features['protocol_type'] = 1  # TCP
-                    tcp_layer = packet[TCP]
-                    
-                    # TCP flags
-                    if tcp_layer.flags & 0x02:  # SYN
-                        features['flag'] = 1
-                    elif tcp_layer.flags & 0x10:  # ACK
-                        features['flag'] = 2
-                    elif tcp_layer.flags & 0x01:  # FIN
-                        features['flag'] = 3
-                    
-                    # Service detection based on port
-                    dst_port = tcp_layer.dport
-                    if dst_port == 80:
-                        features['service'] = 1  # HTTP
-                    elif dst_port == 443:
-                        features['service'] = 2  # HTTPS
-                    elif dst_port == 22:
-                        features['service'] = 3  # SSH
-                    elif dst_port == 21:
-                        features['service'] = 4  # FTP
-                    elif dst_port == 25:
-                        features['service'] = 5  # SMTP
-                    
-                elif UDP in packet:
-                    features['protocol_type'] = 2  # UDP
-                    udp_layer = packet[UDP]
-                    
-                    # UDP service detection
-                    dst_port = udp_layer.dport
-                    if dst_port == 53:
-                        features['service'] = 6  # DNS
-                    elif dst_port == 67 or dst_port == 68:
-                        features['service'] = 7  # DHCP
-                
-                # Land attack detection (same src and dst)
-                if ip_layer.src == ip_layer.dst:
-                    features['land'] = 1
+            if record is not None:
+                # Connection and time-window features from the flow tracker
+                flow_features = self.flow_tracker.update(record)
+                features.update(flow_features)
                 
+                # Encoded with the same vocabulary the models were trained on
+                encoder = self.categorical_encoder()
+                for name in CATEGORICAL_COLUMNS:
+                    features[name] = encoder.encode(name, flow_features[name])
+            
         except Exception as e:
             print(f"Error extracting packet features: {e}")
         
         return features
     
+    def categorical_encoder(self):
+        """Vocabulary of the active preprocessor, or the NSL-KDD one before models are loaded"""
+        encoder = getattr(self.current_models()[1], 'categorical_encoder', None)
+        if encoder is None or not encoder.fitted:
+            return DEFAULT_ENCODER
+        return encoder
+    
+    def packet_record(self, packet):
+        """Parse the header fields needed by the flow tracker from an IP packet"""
+        scapy = _scapy()
+        ip_layer = packet[scapy.IP]
+        src_port = dst_port = tcp_flags = 0
+        
+        # Only the layer directly above IP, as parse_frame reads it: never a header quoted
+        # inside an ICMP error, and nothing from non-first fragments (dissected as Raw)
+        transport = ip_layer.payload
+        if isinstance(transport, scapy.TCP):
+            src_port, dst_port = transport.sport, transport.dport
+            tcp_flags = int(transport.flags)
+        elif isinstance(transport, scapy.UDP):
+            src_port, dst_port = transport.sport, transport.dport
+        elif isinstance(transport, scapy.ICMP):
+            dst_port = transport.type
+        
+        return PacketRecord(
+            timestamp=float(packet.time),
+            src_ip=ip_layer.src,
+            dst_ip=ip_layer.dst,
+            protocol=ip_layer.proto,
+            src_port=src_port,
+            dst_port=dst_port,
+            length=len(packet),
+            tcp_flags=tcp_flags,
+            fragmented=int(bool(int(ip_layer.flags) & 0x1 or ip_layer.frag)),
+            urgent=int(bool(tcp_flags & 0x20))
+        )
+    
     def packet_handler(self, packet):
-        """Handle captured packets"""
+        """Handle packets captured or replayed through Scapy"""
+        try:
+            scapy = _scapy()
+            record = self.packet_record(packet) if scapy.IP in packet else None
+        except Exception as e:
+            print(f"Error extracting packet features: {e}")
+            record = None
+        
+        self.process_packet(packet, record, float(packet.time))
+    
+    def frame_handler(self, frame):
+        """Handle frames from the raw-socket backend, already parsed into a record"""
+        self.process_packet(frame, frame.record, frame.time)
+    
+    def process_packet(self, raw_packet, record, timestamp):
+        """Featurize a parsed packet and hand it to the inference stage"""
         try:
-            features = self.extract_packet_features(packet)
-            timestamp = datetime.now()
+            features = self.record_features(record)
             
             packet_data = {
-                'timestamp': timestamp,
+                'timestamp': datetime.fromtimestamp(timestamp),
                 'features': features,
-                'raw_packet': packet
+                'raw_packet': raw_packet,
+                'record': record
             }
             
-            self.packet_buffer.append(packet_data)
+            self.packet_buffer.append(
+                timestamp,
+                record,
+                features,
+                self.packet_bytes(raw_packet) if self.packet_buffer.raw is not None else None
+            )
             self.stats['total_packets'] += 1
             
-            # Analyze packet for threats
-            self.analyze_packet(packet_data)
+            if self.forensics is not None and record is not None:
+                self.forensics.observe(
+                    self.flow_key(record.src_ip, record.dst_ip),
+                    timestamp,
+                    self.packet_bytes(raw_packet),
+                    getattr(raw_packet, 'wirelen', None)
+                )
+            
+            # Hand off to the inference stage, or analyze inline when it is not running
+            if self.worker_pool is not None and self.worker_pool.running:
+                source_ip, destination_ip = self.packet_ips(packet_data)
+                # Only what raise_alert needs is held until a worker scores the packet
+                alert_data = {
+                    'timestamp': packet_data['timestamp'],
+                    'features': features,
+                    'source_ip': source_ip,
+                    'destination_ip': destination_ip
+                }
+                flow_key = self.flow_key(source_ip, destination_ip)
+                if not self.worker_pool.submit(flow_key, alert_data, features):
+                    self.stats['queue_dropped'] += 1
+            elif self.batcher.running:
+                if not self.batcher.submit(packet_data):
+                    self.stats['queue_dropped'] += 1
+            else:
+                self.analyze_packet(packet_data)
             
         except Exception as e:
             print(f"Error handling packet: {e}")
     
     def analyze_packet(self, packet_data):
         """Analyze packet for potential threats"""
+        self.analyze_batch([packet_data])
+    
+    def analyze_batch(self, batch):
+        """Analyze a batch of packets with one scaler pass and one ensemble call"""
         try:
-            features = packet_data['features']
-            
-            # Convert to DataFrame for model prediction
-            df = pd.DataFrame([features])
+            # One model set for the whole batch, even if a new version is swapped in meanwhile
+            model_manager, data_processor = self.current_models()
             
-            # Ensure all required features are present
-            if self.data_processor.feature_columns:
-                for col in self.data_processor.feature_columns:
-                    if col not in df.columns:
-                        df[col] = 0
-                
-                # Reorder columns to match training data
-                df = df[self.data_processor.feature_columns]
-            
-            # Scale features
-            X = self.data_processor.scaler.transform(df)
+            # Vectorize and scale straight into a preallocated NumPy batch
+            X = self.get_vectorizer(data_processor).transform_records(
+                [packet_data['features'] for packet_data in batch]
+            )
             
             # Make ensemble prediction
-            ensemble_pred, individual_preds = self.model_manager.ensemble_predict(X)
+            ensemble_pred, individual_preds = model_manager.ensemble_predict(X)
             
             if ensemble_pred is not None:
-                # Determine threat level
-                max_prob = np.max(ensemble_pred[0])
-                predicted_class = np.argmax(ensemble_pred[0])
-                
-                if max_prob > self.config.PREDICTION_THRESHOLD and predicted_class > 0:
-                    # Threat detected
-                    threat_info = {
-                        'timestamp': packet_data['timestamp'],
-                        'threat_type': self.get_threat_type(predicted_class),
-                        'confidence': float(max_prob),
-                        'source_ip': self.extract_source_ip(packet_data['raw_packet']),
-                        'destination_ip': self.extract_destination_ip(packet_data['raw_packet']),
-                        'features': features,
-                        'model_predictions': {
-                            name: pred[0].tolist() for name, pred in individual_preds.items()
-                        }
-                    }
-                    
-                    self.threat_queue.put(threat_info)
-                    self.alert_history.append(threat_info)
-                    self.stats['threats_detected'] += 1
+                self.stats['packets_analyzed'] += len(batch)
+                for i, packet_data in enumerate(batch):
+                    self.handle_prediction(
+                        packet_data,
+                        ensemble_pred[i],
+                        model_manager.row_predictions(individual_preds, i)
+                    )
                     
         except Exception as e:
-            print(f"Error analyzing packet: {e}")
+            print(f"Error analyzing packet batch: {e}")
+    
+    def current_models(self):
+        """Model manager and data processor to score the next batch with"""
+        model_set = self.registry.active if self.registry is not None else None
+        if model_set is not None:
+            return model_set.model_manager, model_set.data_processor
+        return self.model_manager, self.data_processor
+    
+    def current_model_path(self):
+        """Directory the active model set was loaded from"""
+        if self.registry is not None and self.registry.active is not None:
+            return self.registry.active.path
+        return self._setting('MODEL_PATH')
+    
+    def get_vectorizer(self, data_processor=None):
+        """This thread's serving vectorizer for a data processor, recompiled after a swap"""
+        if data_processor is None:
+            data_processor = self.current_models()[1]
+        
+        local = self.vectorizers
+        if getattr(local, 'source', None) is not data_processor:
+            local.vectorizer = data_processor.compile_vectorizer(
+                batch_size=self._setting('BATCH_SIZE', 1000)
+            )
+            local.source = data_processor
+        return local.vectorizer
+    
+    def handle_prediction(self, packet_data, probabilities, model_predictions):
+        """Raise an alert for a single scored packet if it crosses the threshold"""
+        # Determine threat level
+        max_prob = np.max(probabilities)
+        predicted_class = np.argmax(probabilities)
+        
+        if max_prob > self._setting('PREDICTION_THRESHOLD', 0.7) and predicted_class > 0:
+            self.raise_alert(
+                packet_data,
+                predicted_class,
+                max_prob,
+                {name: pred.tolist() for name, pred in model_predictions.items()}
+            )
+    
+    def raise_alert(self, packet_data, predicted_class, confidence, model_predictions):
+        """Count a detected threat and report it unless an open suppression window covers it"""
+        threat_type = self.get_threat_type(predicted_class)
+        source_ip, destination_ip = self.packet_ips(packet_data)
+        confidence = float(confidence)
+        
+        self.stats['threats_detected'] += 1
+        self.rollups.record({
+            'timestamp': packet_data['timestamp'],
+            'threat_type': threat_type,
+            'source_ip': source_ip,
+            'destination_ip': destination_ip
+        })
+        
+        opened = self.alert_aggregator.observe(
+            (source_ip, destination_ip, threat_type),
+            packet_data['timestamp'],
+            confidence,
+            (packet_data['features'], model_predictions)
+        )
+        if opened:
+            threat_info = {
+                'timestamp': packet_data['timestamp'],
+                'threat_type': threat_type,
+                'confidence': confidence,
+                'source_ip': source_ip,
+                'destination_ip': destination_ip,
+                'features': packet_data['features'],
+                'model_predictions': model_predictions,
+                'count': 1,
+                'first_seen': packet_data['timestamp'],
+                'last_seen': packet_data['timestamp'],
+                'peak_confidence': confidence
+            }
+            if self.forensics is not None:
+                threat_info['evidence_id'] = self.forensics.trigger(
+                    self.flow_key(source_ip, destination_ip),
+                    packet_data['timestamp'].timestamp(),
+                    {'threat_type': threat_type, 'source_ip': source_ip, 'destination_ip': destination_ip}
+                )
+            self.publish_alert(threat_info)
+    
+    def publish_rollup(self, group):
+        """Report the detections suppressed in a closed window as one alert
+        
+        The window's first detection was already published on its own, so the rollup
+        counts only the ones after it and summing count over stored alerts stays exact.
+        """
+        source_ip, destination_ip, threat_type = group.key
+        features, model_predictions = group.peak
+        
+        threat_info = {
+            'timestamp': group.last_seen,
+            'threat_type': threat_type,
+            'confidence': group.peak_confidence,
+            'source_ip': source_ip,
+            'destination_ip': destination_ip,
+            'features': features,
+            'model_predictions': model_predictions,
+            'count': group.count - 1,
+            'first_seen': group.first_seen,
+            'last_seen': group.last_seen,
+            'peak_confidence': group.peak_confidence,
+            'rollup': True
+        }
+        if self.forensics is not None:
+            # Points at the capture started by the window's first alert
+            evidence_id = self.forensics.evidence_for(self.flow_key(source_ip, destination_ip))
+            if evidence_id is not None:
+                threat_info['evidence_id'] = evidence_id
+        self.publish_alert(threat_info)
+    
+    def publish_alert(self, threat_info):
+        """Push an alert to the durable store and the live feed"""
+        try:
+            # Live feed for the dashboard broadcaster; the alert store keeps the full record
+            self.threat_queue.put_nowait(threat_info)
+        except queue.Full:
+            pass
+        self.alert_store.add(threat_info)
     
     def get_threat_type(self, predicted_class):
         """Map predicted class to threat type"""
-        threat_types = {
-            0: 'Normal',
-            1: 'DoS/DDoS',
-            2: 'Probe/Scan',
-            3: 'R2L',
-            4: 'U2R'
-        }
-        return threat_types.get(predicted_class, 'Unknown')
+        return THREAT_TYPES.get(predicted_class, 'Unknown')
+    
+    def get_threat_class(self, threat_type):
+        """Map a threat type back to its class index (None if unknown)"""
+        for predicted_class, name in THREAT_TYPES.items():
+            if name == threat_type:
+                return predicted_class
+        return None
+    
+    def packet_bytes(self, packet):
+        """Captured bytes of a packet without re-serializing Scapy layers when possible"""
+        if isinstance(packet, CapturedFrame):
+            return packet.data
+        original = getattr(packet, 'original', None)
+        return original if original is not None else bytes(packet)
+    
+    def flow_key(self, source_ip, destination_ip):
+        """Direction-independent key for the hosts on either side of a packet"""
+        return tuple(sorted((source_ip, destination_ip)))
+    
+    def packet_ips(self, packet_data):
+        """Source and destination IP, from the parsed record when there is one"""
+        if 'source_ip' in packet_data:
+            return packet_data['source_ip'], packet_data['destination_ip']
+        record = packet_data.get('record')
+        if record is not None:
+            return record.src_ip, record.dst_ip
+        return (
+            self.extract_source_ip(packet_data['raw_packet']),
+            self.extract_destination_ip(packet_data['raw_packet'])
+        )
     
     def extract_source_ip(self, packet):
         """Extract source IP from packet"""
         try:
-            if IP in packet:
-                return packet[IP].src
+            scapy = _scapy()
+            if scapy.IP in packet:
+                return packet[scapy.IP].src
         except:
             pass
         return 'Unknown'
@@ -227,74 +541,277 @@ class RealTimeThreatAnalyzer:
     def extract_destination_ip(self, packet):
         """Extract destination IP from packet"""
         try:
-            if IP in packet:
-                return packet[IP].dst
+            scapy = _scapy()
+            if scapy.IP in packet:
+                return packet[scapy.IP].dst
         except:
             pass
         return 'Unknown'
     
+    def start_services(self):
+        """Start the alert, rollup, forensics and feedback threads in this process (idempotent)"""
+        self.alert_store.start()
+        self.alert_aggregator.start()
+        if self.forensics is not None:
+            self.forensics.start()
+        if self.feedback_learner is not None:
+            self.feedback_learner.start()
+    
     def start_monitoring(self, interface=None):
         """Start real-time network monitoring"""
-        if self.monitoring_active:
-            return False
-        
-        self.monitoring_active = True
-        interface = interface or self.config.NETWORK_INTERFACE
-        
-        def monitor_thread():
-            try:
-                print(f"Starting packet capture on interface: {interface}")
-                sniff(
-                    iface=interface,
-                    prn=self.packet_handler,
-                    stop_filter=lambda x: not self.monitoring_active,
-                    timeout=self.config.PACKET_CAPTURE_TIMEOUT
-                )
-            except Exception as e:
-                print(f"Error in monitoring thread: {e}")
-                self.monitoring_active = False
+        with self.capture_lock:
+            if self.monitoring_active or self.replay_active:
+                return False
+            self.monitoring_active = True
+        
+        self.start_services()
+        interface = interface or self._setting('NETWORK_INTERFACE')
+        self.start_inference()
         
-        self.monitoring_thread = threading.Thread(target=monitor_thread)
-        self.monitoring_thread.daemon = True
-        self.monitoring_thread.start()
+        # Runs until stop_monitoring, restarting capture if it fails
+        self.capture_supervisor = CaptureSupervisor(
+            interface,
+            self.packet_handler,
+            self.frame_handler,
+            backend=self._setting('CAPTURE_BACKEND', 'scapy'),
+            bpf_filter=self._setting('CAPTURE_BPF_FILTER'),
+            slice_seconds=self._setting('PACKET_CAPTURE_TIMEOUT', 1.0),
+            restart_backoff=self._setting('CAPTURE_RESTART_BACKOFF', 1.0),
+            max_backoff=self._setting('CAPTURE_MAX_BACKOFF', 30.0),
+            afpacket_options={
+                'snaplen': self._setting('CAPTURE_SNAPLEN', 65535),
+                'block_size': self._setting('CAPTURE_RING_BLOCK_SIZE', 1 << 20),
+                'block_count': self._setting('CAPTURE_RING_BLOCKS', 64)
+            }
+        )
+        self.capture_supervisor.start()
         
         return True
     
     def stop_monitoring(self):
         """Stop real-time network monitoring"""
+        # A running replay owns the inference stage
+        if not self.monitoring_active:
+            return
         self.monitoring_active = False
-        if self.monitoring_thread:
-            self.monitoring_thread.join(timeout=5)
-    
-    def get_recent_threats(self, limit=50):
-        """Get recent threat detections"""
-        recent_threats = list(self.alert_history)[-limit:]
-        return [
-            {
-                'timestamp': threat['timestamp'].isoformat(),
-                'threat_type': threat['threat_type'],
-                'confidence': threat['confidence'],
-                'source_ip': threat['source_ip'],
-                'destination_ip': threat['destination_ip']
-            }
-            for threat in recent_threats
-        ]
+        if self.capture_supervisor is not None:
+            self.capture_supervisor.stop()
+        self.stop_inference()
+    
+    def get_capture_stats(self):
+        """Packets received by the kernel, dropped at each stage, and analyzed"""
+        capture = self.capture_supervisor.get_stats() if self.capture_supervisor else {}
+        analyzed = self.stats['packets_analyzed']
+        if self.worker_pool is not None:
+            analyzed += self.worker_pool.get_stats()['processed']
+        
+        return {
+            'received': capture.get('received', 0),
+            'kernel_dropped': capture.get('kernel_dropped', 0),
+            'captured': capture.get('captured', 0),
+            'queue_dropped': self.stats['queue_dropped'],
+            'analyzed': analyzed,
+            'restarts': capture.get('restarts', 0),
+            'last_error': capture.get('last_error'),
+            'capturing': capture.get('capturing', False),
+            'backend': capture.get('backend', self._setting('CAPTURE_BACKEND', 'scapy'))
+        }
+    
+    def start_inference(self):
+        """Start worker processes when INFERENCE_WORKERS > 0, else the in-process batcher"""
+        n_workers = self._setting('INFERENCE_WORKERS', 0)
+        
+        if n_workers:
+            vectorizer = self.get_vectorizer()
+            model_path = self.current_model_path()
+            self.worker_pool = InferenceWorkerPool(
+                n_workers,
+                len(vectorizer.feature_columns),
+                vectorizer.fill_row,
+                self.raise_alert,
+                {
+                    'model_path': model_path,
+                    'preprocessor_path': f"{model_path}/preprocessor.pkl",
+                    'batch_size': self._setting('BATCH_SIZE', 1000),
+                    'threshold': self._setting('PREDICTION_THRESHOLD', 0.7),
+                    'ensemble_mode': self._setting('ENSEMBLE_MODE', 'average'),
+                    'cascade_band': self._setting('CASCADE_BAND', 0.15),
+                    'idle_sleep': self._setting('WORKER_IDLE_SLEEP', 0.001)
+                },
+                slots=self._setting('WORKER_RING_SLOTS', 65536)
+            )
+            self.worker_pool.start()
+        else:
+            self.batcher.start()
+    
+    def stop_inference(self):
+        """Drain and stop whichever inference stage is running"""
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+            self.stats['packets_analyzed'] += self.worker_pool.get_stats()['processed']
+            self.worker_pool = None
+        self.batcher.stop()
+    
+    def replay_pcap(self, path, speed=None):
+        """Replay a capture file through packet_handler and report throughput
+        
+        Each replay starts from an empty flow tracker, so the same file always yields the
+        same features; the live tracker is restored afterwards. Returns None when live
+        monitoring or another replay is running.
+        """
+        if not self._claim_replay():
+            return None
+        return self._replay(path, speed)
+    
+    def start_replay(self, path, speed=None):
+        """Run replay_pcap on a background thread; returns a job id, or None if busy"""
+        if not self._claim_replay():
+            return None
+        
+        job_id = uuid.uuid4().hex
+        job = {
+            'status': 'running',
+            'file': path,
+            'speed': speed or 'max',
+            'submitted_at': datetime.now().isoformat(),
+            'result': None,
+            'error': None
+        }
+        with self.capture_lock:
+            self.replay_jobs[job_id] = job
+            while len(self.replay_jobs) > self.max_replay_jobs:
+                self.replay_jobs.popitem(last=False)
+        
+        thread = threading.Thread(target=self._run_replay_job, args=(job, path, speed), name='pcap-replay')
+        thread.daemon = True
+        thread.start()
+        return job_id
+    
+    def get_replay_job(self, job_id):
+        with self.capture_lock:
+            job = self.replay_jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def _run_replay_job(self, job, path, speed):
+        try:
+            job['result'] = self._replay(path, speed)
+            job['status'] = 'done'
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = 'failed'
+    
+    def _claim_replay(self):
+        with self.capture_lock:
+            if self.monitoring_active or self.replay_active:
+                return False
+            self.replay_active = True
+            return True
+    
+    def _replay(self, path, speed):
+        # The caller has set replay_active; it is cleared when the replay ends
+        packets_before = self.stats['total_packets']
+        threats_before = self.stats['threats_detected']
+        dropped_before = self.stats['queue_dropped']
+        
+        live_tracker = self.flow_tracker
+        self.flow_tracker = self.new_flow_tracker()
+        
+        self.start_services()
+        self.start_inference()
+        start = time.monotonic()
+        
+        try:
+            for packet in PcapReplaySource(path, speed):
+                self.packet_handler(packet)
+            capture_elapsed = time.monotonic() - start
+            
+            # Let the inference stage finish so alert counts are complete
+            if self.worker_pool is not None:
+                self.worker_pool.flush()
+            self.batcher.flush()
+        finally:
+            self.stop_inference()
+            self.flow_tracker = live_tracker
+            self.replay_active = False
+        
+        elapsed = time.monotonic() - start
+        packets = self.stats['total_packets'] - packets_before
+        
+        return {
+            'file': path,
+            'speed': speed or 'max',
+            'packets': packets,
+            'elapsed_seconds': elapsed,
+            'capture_seconds': capture_elapsed,
+            'packets_per_second': packets / elapsed if elapsed > 0 else 0.0,
+            'alerts': self.stats['threats_detected'] - threats_before,
+            'queue_dropped': self.stats['queue_dropped'] - dropped_before
+        }
+    
+    def record_feedback(self, alert_id, verdict, threat_type=None):
+        """Record an analyst verdict on a stored alert and queue it for the incremental model
+        
+        verdict is 'true_positive' or 'false_positive'; a true positive may name the correct
+        threat_type. Returns None when the alert is not (yet) in the store.
+        """
+        if verdict not in FEEDBACK_VERDICTS:
+            raise ValueError(f"Unknown verdict: {verdict}")
+        
+        alert = self.alert_store.get_alert(alert_id)
+        if alert is None:
+            return None
+        
+        if verdict == 'false_positive':
+            label = 0
+        else:
+            label = self.get_threat_class(threat_type or alert['threat_type'])
+            if label is None:
+                raise ValueError(f"Unknown threat type: {threat_type or alert['threat_type']}")
+        
+        previous = self.alert_store.set_feedback(alert_id, verdict)
+        if previous != verdict:
+            self.stats[FEEDBACK_VERDICTS[verdict]] += 1
+            if previous in FEEDBACK_VERDICTS:
+                self.stats[FEEDBACK_VERDICTS[previous]] -= 1
+        
+        queued = False
+        if self.feedback_learner is not None:
+            self.feedback_learner.start()
+            queued = self.feedback_learner.add(alert['features'], label)
+        
+        return {'alert_id': alert_id, 'verdict': verdict, 'previous': previous, 'label': label, 'queued': queued}
+    
+    def get_recent_threats(self, limit=50, cursor=None, **filters):
+        """Get a page of stored threat detections, oldest first, and the cursor for older ones"""
+        threats, next_cursor = self.alert_store.query(limit, cursor, **filters)
+        threats.reverse()
+        return threats, next_cursor
     
     def get_system_stats(self):
         """Get current system statistics"""
         self.stats['system_load'] = psutil.cpu_percent()
         self.stats['memory_usage'] = psutil.virtual_memory().percent
         
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats['alert_store'] = self.alert_store.get_stats()
+        stats['alert_aggregation'] = self.alert_aggregator.get_stats()
+        stats['capture'] = self.get_capture_stats()
+        if self.forensics is not None:
+            stats['forensics'] = self.forensics.get_stats()
+        if self.feedback_learner is not None:
+            stats['feedback'] = self.feedback_learner.get_stats()
+        return stats
+    
+    def get_evidence(self, evidence_id):
+        """Where an alert's pcap evidence was written, or None if it is not (yet) on disk"""
+        if self.forensics is None:
+            return None
+        return self.forensics.writer.location(evidence_id)
     
     def get_threat_summary(self):
         """Get threat detection summary"""
-        if not self.alert_history:
-            return {}
-        
-        threat_counts = {}
-        for threat in self.alert_history:
-            threat_type = threat['threat_type']
-            threat_counts[threat_type] = threat_counts.get(threat_type, 0) + 1
-        
-        return threat_counts
+        return self.rollups.threat_counts()
+    
+    def get_threat_rollups(self, top_k=None):
+        """Last 5 minutes / hour / day counts and top talkers"""
+        return self.rollups.summary(top_k)
@@ -0,0 +1,274 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+DIMENSIONS = ('threat_type', 'source_ip', 'destination_ip')
+
+# Few distinct values, counted exactly; the IP dimensions are bounded per bucket
+EXACT_DIMENSIONS = ('threat_type',)
+
+
+class SpaceSaving:
+    """Heavy-hitter counts over a stream in bounded memory (Space-Saving)
+
+    Holds at most `capacity` keys. A new key arriving when full takes over the smallest
+    counter and its count, so counts are exact while the number of distinct keys stays
+    within capacity and upper bounds after that; any key counted more than
+    total / capacity times is always present.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        # (count, sequence, key) entries; stale ones are skipped when looking for the minimum
+        self._heap = []
+        self._sequence = 0
+
+    def _push(self, key, count):
+        self._sequence += 1
+        heapq.heappush(self._heap, (count, self._sequence, key))
+
+    def add(self, key):
+        """Count one occurrence; returns (evicted key, its count) when a counter was taken over"""
+        counts = self.counts
+        evicted = None
+
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < self.capacity:
+            counts[key] = 1
+        else:
+            while True:
+                count, _, smallest = heapq.heappop(self._heap)
+                if counts.get(smallest) == count:
+                    break
+            del counts[smallest]
+            counts[key] = count + 1
+            evicted = (smallest, count)
+
+        self._push(key, counts[key])
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, i, key) for i, (key, count) in enumerate(counts.items())]
+            heapq.heapify(self._heap)
+            self._sequence = len(self._heap)
+        return evicted
+
+    def items(self):
+        return self.counts.items()
+
+
+class _RollingWindow:
+    """Ring of time buckets with a running aggregate over the buckets still in the window
+
+    Each bucket keeps at most `capacity` IPs per dimension, so the aggregate holds at
+    most n_buckets * capacity and a spoofed-source flood cannot grow it without bound.
+
+    The top_k IPs per dimension are kept up to date as counts grow, so top() costs
+    O(top_k). A count going down (a bucket expiring, or a Space-Saving takeover of a
+    key in the top list) invalidates the list, and the next top() rebuilds it with
+    one pass over the aggregate, O(n_buckets * capacity); that happens at most once
+    per bucket interval plus once per such takeover.
+    """
+
+    def __init__(self, bucket_seconds, n_buckets, capacity=1000, top_k=10):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = n_buckets
+        self.capacity = capacity
+        self.top_k = top_k
+        self.buckets = [None] * n_buckets
+        self.bucket_ids = [None] * n_buckets
+        self.total = 0
+        self.aggregate = {dimension: Counter() for dimension in DIMENSIONS}
+        # Key -> count of the top_k keys per IP dimension; None until rebuilt by top()
+        self.leaders = {dimension: None for dimension in DIMENSIONS if dimension not in EXACT_DIMENSIONS}
+        self.current = None
+
+    def advance(self, now):
+        """Subtract every bucket that has fallen out of the window; at most n_buckets steps"""
+        bucket_id = int(now // self.bucket_seconds)
+        if self.current is None:
+            self.current = bucket_id
+            return
+        if bucket_id <= self.current:
+            return
+
+        for step in range(min(bucket_id - self.current, self.n_buckets)):
+            slot = (self.current + step + 1) % self.n_buckets
+            self._expire(slot)
+        self.current = bucket_id
+
+    def _expire(self, slot):
+        bucket = self.buckets[slot]
+        if bucket is None:
+            return
+        total, counts = bucket
+        self.total -= total
+        for dimension in self.leaders:
+            self.leaders[dimension] = None
+        for dimension, counter in counts.items():
+            aggregate = self.aggregate[dimension]
+            for key, count in counter.items():
+                remaining = aggregate[key] - count
+                if remaining:
+                    aggregate[key] = remaining
+                else:
+                    del aggregate[key]
+        self.buckets[slot] = None
+        self.bucket_ids[slot] = None
+
+    def _new_bucket(self):
+        return [0, {
+            dimension: Counter() if dimension in EXACT_DIMENSIONS else SpaceSaving(self.capacity)
+            for dimension in DIMENSIONS
+        }]
+
+    def add(self, timestamp, values):
+        """Count an alert in the bucket of its timestamp; alerts older than the window are skipped"""
+        self.advance(timestamp)
+        bucket_id = int(timestamp // self.bucket_seconds)
+        if bucket_id <= self.current - self.n_buckets:
+            return
+
+        slot = bucket_id % self.n_buckets
+        if self.bucket_ids[slot] != bucket_id:
+            self.buckets[slot] = self._new_bucket()
+            self.bucket_ids[slot] = bucket_id
+
+        bucket = self.buckets[slot]
+        bucket[0] += 1
+        self.total += 1
+        for dimension, value in values.items():
+            counter = bucket[1][dimension]
+            aggregate = self.aggregate[dimension]
+            if dimension in EXACT_DIMENSIONS:
+                counter[value] += 1
+                aggregate[value] += 1
+                continue
+
+            evicted = counter.add(value)
+            if evicted is None:
+                aggregate[value] += 1
+            else:
+                # The new key inherits the evicted counter, so move it in the aggregate too
+                key, count = evicted
+                remaining = aggregate[key] - count
+                if remaining:
+                    aggregate[key] = remaining
+                else:
+                    del aggregate[key]
+                aggregate[value] += count + 1
+                leaders = self.leaders[dimension]
+                if leaders is not None and key in leaders:
+                    self.leaders[dimension] = None
+            self._promote(dimension, value, aggregate[value])
+
+    def _promote(self, dimension, key, count):
+        # Only this key's count went up, so it can at most displace the smallest leader
+        leaders = self.leaders[dimension]
+        if leaders is None:
+            return
+        if key in leaders or len(leaders) < self.top_k:
+            leaders[key] = count
+            return
+        smallest = min(leaders, key=leaders.get)
+        if count > leaders[smallest]:
+            del leaders[smallest]
+            leaders[key] = count
+
+    def top(self, dimension, k):
+        """The k largest (key, count) pairs of an IP dimension, largest first"""
+        aggregate = self.aggregate[dimension]
+        if k > self.top_k:
+            return heapq.nlargest(k, aggregate.items(), key=lambda item: item[1])
+
+        leaders = self.leaders[dimension]
+        if leaders is None:
+            leaders = dict(heapq.nlargest(self.top_k, aggregate.items(), key=lambda item: item[1]))
+            self.leaders[dimension] = leaders
+        return sorted(leaders.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def histogram(self):
+        """Per-bucket alert counts, oldest first, for charting"""
+        counts = []
+        for offset in range(self.n_buckets - 1, -1, -1):
+            bucket_id = self.current - offset if self.current is not None else None
+            slot = bucket_id % self.n_buckets if bucket_id is not None else None
+            if slot is not None and self.bucket_ids[slot] == bucket_id:
+                counts.append(self.buckets[slot][0])
+            else:
+                counts.append(0)
+        return counts
+
+
+class ThreatRollups:
+    """Running alert counters and windowed histograms, updated in O(log capacity + top_k) per alert"""
+
+    WINDOWS = {
+        '5m': (60, 5),
+        '1h': (60, 60),
+        '24h': (3600, 24)
+    }
+
+    def __init__(self, top_k=10, bucket_capacity=1000):
+        self.top_k = top_k
+        # All-time counts only by threat type; per-IP counts live in the windows and expire
+        self.total = 0
+        self.threat_totals = Counter()
+        self.windows = {
+            name: _RollingWindow(bucket_seconds, n_buckets, bucket_capacity, top_k)
+            for name, (bucket_seconds, n_buckets) in self.WINDOWS.items()
+        }
+        self._lock = threading.Lock()
+
+    def record(self, threat_info, now=None):
+        """Count an alert in the windows covering its timestamp (now if it has none)"""
+        if now is None:
+            timestamp = threat_info.get('timestamp')
+            if isinstance(timestamp, datetime):
+                now = timestamp.timestamp()
+            elif timestamp is not None:
+                now = float(timestamp)
+            else:
+                now = time.time()
+        values = {dimension: threat_info.get(dimension) for dimension in DIMENSIONS}
+
+        with self._lock:
+            self.total += 1
+            self.threat_totals[values['threat_type']] += 1
+            for window in self.windows.values():
+                window.add(now, values)
+
+    def threat_counts(self):
+        """Alerts per threat type since startup"""
+        with self._lock:
+            return dict(self.threat_totals)
+
+    def summary(self, top_k=None, now=None):
+        """Counts, threat-type breakdown and top talkers for every window"""
+        top_k = top_k or self.top_k
+        now = now if now is not None else time.time()
+        summary = {}
+
+        with self._lock:
+            for name, window in self.windows.items():
+                window.advance(now)
+                summary[name] = {
+                    'total': window.total,
+                    'by_threat_type': dict(window.aggregate['threat_type']),
+                    'top_sources': self._top(window, 'source_ip', top_k),
+                    'top_destinations': self._top(window, 'destination_ip', top_k),
+                    'histogram': window.histogram(),
+                    'bucket_seconds': window.bucket_seconds
+                }
+            summary['all_time'] = {
+                'total': self.total,
+                'by_threat_type': dict(self.threat_totals)
+            }
+
+        return summary
+
+    def _top(self, window, dimension, k):
+        return [{'ip': key, 'count': count} for key, count in window.top(dimension, k)]
@@ -8,24 +8,122 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///ids.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Load models in create_app instead of on the first API request
+    PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '').lower() in ('1', 'true', 'yes')
+    
     # Redis Configuration
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
     
     # ML Model Paths
     MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'models')
+    MODEL_VERSION = os.environ.get('MODEL_VERSION')  # default: latest directory in MODEL_PATH
     DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data')
+    PCAP_PATH = os.path.join(DATA_PATH, 'pcaps')
+    REPLAY_MAX_JOBS = 100  # finished replay reports kept for /api/replay/jobs
+    
+    # Training: parsed datasets cached per source-file hash, CSVs read in chunks
+    DATASET_CACHE_PATH = os.path.join(DATA_PATH, 'cache')
+    TRAINING_CHUNK_ROWS = 200000
+    # Models trained concurrently, each pinned to its own cores (None: split evenly)
+    TRAINING_JOBS = 3
+    TRAINING_CPUS_PER_JOB = None
+    TRAINING_MEMORY_MB_PER_JOB = None
+    # 'approx' trains Nystroem features into a mini-batch linear SVM; 'exact' fits SVC
+    SVM_MODE = 'approx'
+    SVM_APPROX_COMPONENTS = 1000
+    SVM_APPROX_BATCH_SIZE = 10000
+    SVM_APPROX_EPOCHS = 5
+    SVM_COMPARE_ROWS = 5000  # exact SVC is fitted on this many rows for the accuracy report
+    
+    # Explanations
+    EXPLAIN_WORKERS = 2
+    EXPLAIN_MAX_JOBS = 1000
     
     # Real-time Processing
     BATCH_SIZE = 1000
+    BATCH_MAX_WAIT = 0.05  # seconds a partial batch may wait before inference
+    INFERENCE_QUEUE_SIZE = 10000
     PREDICTION_THRESHOLD = 0.7
+    PREDICT_CHUNK_SIZE = 1000  # rows per ensemble call on /api/predict/batch
+    
+    # Ensemble mode: 'average' runs every model, 'cascade' escalates only
+    # rows whose confidence is within CASCADE_BAND of PREDICTION_THRESHOLD
+    ENSEMBLE_MODE = 'average'
+    CASCADE_BAND = 0.15
+    
+    # Multi-process inference (0 keeps inference in the monitoring process)
+    INFERENCE_WORKERS = 0
+    WORKER_RING_SLOTS = 65536  # feature records per worker shard
+    WORKER_IDLE_SLEEP = 0.001  # seconds a worker sleeps on an empty ring
     
     # Dashboard Settings
-    MAX_ALERTS = 1000
+    MAX_ALERTS = 100000
     ALERT_RETENTION_DAYS = 30
+    ALERT_BATCH_SIZE = 500
+    ALERT_BATCH_MAX_WAIT = 0.25
+    ALERT_QUEUE_SIZE = 50000
+    ALERT_SWEEP_INTERVAL = 60.0
+    ROLLUP_TOP_K = 10
+    ROLLUP_BUCKET_CAPACITY = 1000  # IPs tracked per rollup bucket (Space-Saving heavy hitters)
+    ALERT_AGGREGATION_WINDOW = 10.0
+    ALERT_AGGREGATION_MAX_GROUPS = 10000
+    THREAT_QUEUE_SIZE = 10000
+    TELEMETRY_INTERVAL = 1.0
+    TELEMETRY_THREAT_BATCH = 50
+    TELEMETRY_MAX_LAG = 5
     
     # Network Monitoring
     NETWORK_INTERFACE = 'eth0'
+    # Capture runs continuously; this is how often the loop checks for stop requests
     PACKET_CAPTURE_TIMEOUT = 1.0
+    CAPTURE_RESTART_BACKOFF = 1.0
+    CAPTURE_MAX_BACKOFF = 30.0
+    
+    # 'scapy' dissects packets with sniff(); 'afpacket' reads a Linux TPACKET_V3 ring directly
+    CAPTURE_BACKEND = os.environ.get('CAPTURE_BACKEND', 'scapy')
+    CAPTURE_BPF_FILTER = os.environ.get('CAPTURE_BPF_FILTER')
+    CAPTURE_SNAPLEN = 65535
+    CAPTURE_RING_BLOCK_SIZE = 1 << 20
+    CAPTURE_RING_BLOCKS = 64
+    
+    # Packet history: a columnar ring of recent packets (71 bytes each, about 71 MB at
+    # the default capacity). Raw packet bytes go to an optional separate byte ring.
+    PACKET_RING_CAPACITY = 1048576
+    PACKET_RING_RAW_BYTES = 0
+    PACKET_RING_RAW_SNAPLEN = 2048
+    
+    # Analyst feedback: bounded label queue feeding an incremental ensemble member
+    FEEDBACK_ENABLED = True
+    FEEDBACK_BUFFER_SIZE = 10000
+    FEEDBACK_BATCH_SIZE = 64
+    FEEDBACK_REPLAY_SIZE = 2000
+    FEEDBACK_MIN_SAMPLES = 50
+    FEEDBACK_INTERVAL = 1.0  # seconds the learner waits for a batch
+    # Vote relative to 1.0 for each trained model, reached linearly at FEEDBACK_FULL_WEIGHT_SAMPLES labels
+    FEEDBACK_MAX_WEIGHT = 0.25
+    FEEDBACK_FULL_WEIGHT_SAMPLES = 1000
+    # Seconds between saves of incremental_model.pkl into the active model directory
+    FEEDBACK_SAVE_INTERVAL = 60.0
+    
+    # Forensic pcaps: a pre-trigger window per flow plus a post-trigger window per alert.
+    # Off by default: it copies every captured packet's bytes and writes under FORENSICS_PATH
+    FORENSICS_ENABLED = os.environ.get('FORENSICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    FORENSICS_PATH = os.path.join(DATA_PATH, 'forensics')
+    FORENSICS_PRE_PACKETS = 32
+    FORENSICS_PRE_SECONDS = 5.0
+    FORENSICS_POST_PACKETS = 64
+    FORENSICS_POST_SECONDS = 5.0
+    FORENSICS_MAX_FLOWS = 10000
+    FORENSICS_MAX_FILE_BYTES = 64 * 1024 * 1024
+    FORENSICS_ROTATE_SECONDS = 3600
+    FORENSICS_MAX_FILES = 100
+    FORENSICS_QUEUE_SIZE = 1000
+    
+    # Flow Tracking (NSL-KDD traffic windows)
+    FLOW_TIME_WINDOW = 2.0  # seconds
+    FLOW_HOST_WINDOW = 100  # connections
+    FLOW_IDLE_TIMEOUT = 120.0  # seconds
+    FLOW_TABLE_MAX = 500000
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -34,6 +132,7 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
+    PRELOAD_MODELS = True
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,194 @@
+"""Train the IDS models from NSL-KDD formatted CSVs
+
+    python scripts/train_models.py --train KDDTrain+.txt --test KDDTest+.txt --models random_forest,svm
+
+Parsed datasets are cached under DATASET_CACHE_PATH, keyed by the hash of the source
+files, so repeat runs skip the CSV parse. Categorical columns are encoded with the
+vocabulary fitted on the training files and saved with the preprocessor, and training
+matrices are built with the same FeatureVectorizer the live analyzer uses.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config.config import Config
+from app.utils.data_processor import DataProcessor
+from app.utils.dataset_cache import DatasetCache
+from app.utils.feature_vectorizer import FeatureVectorizer, output_columns_for
+from app.models.ml_models import MLModelManager
+from app.models.training_orchestrator import TrainingOrchestrator
+
+LABEL_COLUMNS = ['attack_type', 'is_attack', 'attack_category']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--train', nargs='+', required=True, help='training CSV file(s)')
+    parser.add_argument('--test', nargs='+', help='test CSV file(s); default is a split of --train')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--models', default='random_forest,svm,lstm',
+                        help='comma-separated models to train')
+    parser.add_argument('--output', help='model directory (default: MODEL_PATH/<timestamp>)')
+    parser.add_argument('--cache-dir', default=Config.DATASET_CACHE_PATH)
+    parser.add_argument('--no-cache', action='store_true', help='always re-read the CSVs')
+    parser.add_argument('--chunksize', type=int, default=Config.TRAINING_CHUNK_ROWS,
+                        help='CSV rows parsed per chunk')
+    parser.add_argument('--jobs', type=int, default=Config.TRAINING_JOBS,
+                        help='models trained concurrently in worker processes (0: one by one in-process)')
+    parser.add_argument('--cpus-per-job', type=int, default=Config.TRAINING_CPUS_PER_JOB,
+                        help='cores pinned per job (default: all cores split evenly)')
+    parser.add_argument('--memory-per-job', type=int, default=Config.TRAINING_MEMORY_MB_PER_JOB,
+                        help='heap limit per job in MB')
+    parser.add_argument('--resume', action='store_true',
+                        help='keep models checkpointed in --output by an earlier run')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--svm-mode', choices=['exact', 'approx'], default=Config.SVM_MODE,
+                        help='exact RBF SVC, or Nystroem features with a mini-batch linear SVM')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def load_dataset(data_processor, file_paths, cache, chunksize):
+    """Preprocessed frame for some CSVs, parsed from the cache when their contents are unchanged
+
+    The cache holds the parsed columns with categoricals still as strings, so the same
+    entry serves any vocabulary; encoding and label mapping are vectorized and cheap.
+    """
+    start = time.perf_counter()
+    key = cache.key(file_paths) if cache is not None else None
+
+    df = cache.load(key) if cache is not None else None
+    if df is not None:
+        print(f"Loaded {len(df)} rows from cache {cache.path(key)} in {time.perf_counter() - start:.1f}s")
+    else:
+        df = data_processor.read_nsl_kdd(file_paths, chunksize)
+        print(f"Parsed {len(df)} rows from {len(file_paths)} file(s) in {time.perf_counter() - start:.1f}s")
+        if cache is not None:
+            print(f"Cached parsed data at {cache.save(key, df, file_paths)}")
+
+    return data_processor.preprocess_data(df)
+
+
+def fit_scaler(data_processor, df, chunk_rows):
+    """Fit the scaler on engineered features one chunk at a time"""
+    data_processor.feature_columns = [col for col in df.columns if col not in LABEL_COLUMNS]
+
+    # Unscaled vectorizer: raw columns plus the engineered ones, in serving order
+    columns = data_processor.feature_columns
+    unscaled = FeatureVectorizer(columns, output_columns_for(columns), dtype=np.float64)
+    for start in range(0, len(df), chunk_rows):
+        data_processor.scaler.partial_fit(unscaled.transform_frame(df.iloc[start:start + chunk_rows]))
+
+    return data_processor.compile_vectorizer()
+
+
+def build_matrix(vectorizer, df, chunk_rows):
+    """Scaled float32 matrix for a frame, produced by the serving vectorizer chunk by chunk"""
+    X = np.empty((len(df), len(vectorizer.output_columns)), dtype=vectorizer.dtype)
+    for start in range(0, len(df), chunk_rows):
+        X[start:start + chunk_rows] = vectorizer.transform_frame(df.iloc[start:start + chunk_rows])
+    return X
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    models = [name.strip() for name in args.models.split(',') if name.strip()]
+    output = args.output or os.path.join(Config.MODEL_PATH, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    cache = None if args.no_cache else DatasetCache(args.cache_dir)
+
+    data_processor = DataProcessor()
+    train_df = load_dataset(data_processor, args.train, cache, args.chunksize)
+
+    if args.test:
+        test_df = load_dataset(data_processor, args.test, cache, args.chunksize)
+    else:
+        train_df, test_df = train_test_split(
+            train_df,
+            test_size=args.test_size,
+            random_state=args.seed,
+            stratify=train_df['attack_category']
+        )
+
+    start = time.perf_counter()
+    vectorizer = fit_scaler(data_processor, train_df, args.chunksize)
+    X_train = build_matrix(vectorizer, train_df, args.chunksize)
+    X_test = build_matrix(vectorizer, test_df, args.chunksize)
+    y_train = train_df['attack_category'].to_numpy()
+    y_test = test_df['attack_category'].to_numpy()
+    print(f"Built {X_train.shape} training and {X_test.shape} test matrices in {time.perf_counter() - start:.1f}s")
+
+    os.makedirs(output, exist_ok=True)
+    data_processor.save_preprocessor(os.path.join(output, 'preprocessor.pkl'))
+
+    if args.jobs > 0:
+        train_parallel(args, models, output, X_train, y_train, X_test, y_test)
+    else:
+        train_sequential(args, models, output, X_train, y_train, X_test, y_test)
+    print(f"Saved models to {output}")
+
+
+def svm_options(args):
+    if args.svm_mode != 'approx':
+        return {'mode': 'exact'}
+    return {
+        'mode': 'approx',
+        'n_components': Config.SVM_APPROX_COMPONENTS,
+        'batch_size': Config.SVM_APPROX_BATCH_SIZE,
+        'epochs': Config.SVM_APPROX_EPOCHS,
+        'compare_rows': Config.SVM_COMPARE_ROWS
+    }
+
+
+def train_parallel(args, models, output, X_train, y_train, X_test, y_test):
+    """Balance once, then train every model concurrently from the shared copy"""
+    start = time.perf_counter()
+    X_balanced, y_balanced = MLModelManager().balance_classes(X_train, y_train)
+    print(f"Balanced {len(X_train)} -> {len(X_balanced)} rows in {time.perf_counter() - start:.1f}s")
+
+    orchestrator = TrainingOrchestrator(
+        output,
+        max_jobs=args.jobs,
+        cpus_per_job=args.cpus_per_job,
+        memory_mb_per_job=args.memory_per_job,
+        resume=args.resume,
+        options={'epochs': args.epochs, 'svm': svm_options(args)}
+    )
+    orchestrator.prepare_dataset(X_balanced, y_balanced, X_test, y_test)
+    report = orchestrator.run(models)
+
+    for name, entry in report.items():
+        if entry['status'] == 'failed':
+            print(f"{name}: FAILED ({entry['error']})")
+        else:
+            print(f"{name}: {entry['status']}, accuracy {entry['accuracy']:.4f}, "
+                  f"{entry['wall_seconds']:.1f}s, peak RSS {entry['peak_rss_mb']:.0f} MB")
+
+
+def train_sequential(args, models, output, X_train, y_train, X_test, y_test):
+    model_manager = MLModelManager()
+    trainers = {
+        'random_forest': model_manager.train_random_forest,
+        'svm': lambda *data: model_manager.train_svm(*data, **svm_options(args)),
+        'lstm': lambda *data: model_manager.train_lstm(*data, epochs=args.epochs)
+    }
+    for name in models:
+        if name not in trainers:
+            print(f"Unknown model {name}, skipping")
+            continue
+        start = time.perf_counter()
+        trainers[name](X_train, y_train, X_test, y_test)
+        report = model_manager.model_performance[name]['classification_report']
+        print(f"{name}: accuracy {report['accuracy']:.4f} in {time.perf_counter() - start:.1f}s")
+
+    model_manager.save_models(output)
+
+
+if __name__ == '__main__':
+    main()
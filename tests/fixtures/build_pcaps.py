@@ -0,0 +1,82 @@
+"""Regenerate the pcap fixtures: python tests/fixtures/build_pcaps.py"""
+import os
+from scapy.all import (
+    ARP, Dot1Q, Ether, ICMP, IP, IPerror, Raw, TCP, TCPerror, UDP, UDPerror, fragment, wrpcap
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLIENT, SERVER, ROUTER = '192.168.1.10', '10.0.0.5', '192.168.1.1'
+
+
+def stamped(packets, start=1700000000.0, step=0.01):
+    for i, packet in enumerate(packets):
+        packet.time = start + i * step
+    return packets
+
+
+def tcp_packets():
+    eth = Ether(src='02:00:00:00:00:01', dst='02:00:00:00:00:02')
+    return [
+        eth / IP(src=CLIENT, dst=SERVER) / TCP(sport=40000, dport=80, flags='S', seq=1),
+        eth / IP(src=SERVER, dst=CLIENT) / TCP(sport=80, dport=40000, flags='SA', seq=100, ack=2),
+        eth / IP(src=CLIENT, dst=SERVER) / TCP(sport=40000, dport=80, flags='A', seq=2, ack=101),
+        eth / IP(src=CLIENT, dst=SERVER) / TCP(sport=40000, dport=80, flags='PA') / Raw(b'GET / HTTP/1.0\r\n\r\n'),
+        eth / IP(src=SERVER, dst=CLIENT) / TCP(sport=80, dport=40000, flags='PAU', urgptr=1) / Raw(b'x' * 300),
+        # VLAN-tagged, with a SYN to a closed port answered by a reset
+        Ether() / Dot1Q(vlan=10) / IP(src=CLIENT, dst=SERVER) / TCP(sport=40001, dport=23, flags='S'),
+        Ether() / Dot1Q(vlan=10) / IP(src=SERVER, dst=CLIENT) / TCP(sport=23, dport=40001, flags='RA'),
+        eth / IP(src=CLIENT, dst=SERVER) / TCP(sport=40000, dport=80, flags='FA'),
+        eth / IP(src=SERVER, dst=CLIENT) / TCP(sport=80, dport=40000, flags='FA'),
+        # Non-IP frame
+        Ether(dst='ff:ff:ff:ff:ff:ff') / ARP(psrc=CLIENT, pdst=ROUTER)
+    ]
+
+
+def udp_packets():
+    eth = Ether()
+    return [
+        eth / IP(src=CLIENT, dst='8.8.8.8') / UDP(sport=5353, dport=53) / Raw(b'\x12\x34' + b'q' * 30),
+        eth / IP(src='8.8.8.8', dst=CLIENT) / UDP(sport=53, dport=5353) / Raw(b'\x12\x34' + b'r' * 80),
+        eth / IP(src=CLIENT, dst=SERVER) / UDP(sport=6000, dport=123) / Raw(b'n' * 48),
+        eth / IP(src=CLIENT, dst=SERVER) / UDP(sport=6001, dport=69),
+    ]
+
+
+def icmp_packets():
+    eth = Ether()
+    return [
+        eth / IP(src=CLIENT, dst=SERVER) / ICMP(type=8, id=1, seq=1) / Raw(b'p' * 56),
+        eth / IP(src=SERVER, dst=CLIENT) / ICMP(type=0, id=1, seq=1) / Raw(b'p' * 56),
+        # Errors quoting a transport header; their ports must not be read as the packet's own
+        eth / IP(src=SERVER, dst=CLIENT) / ICMP(type=3, code=3)
+        / IPerror(src=CLIENT, dst=SERVER) / UDPerror(sport=6001, dport=69),
+        eth / IP(src=ROUTER, dst=CLIENT) / ICMP(type=11, code=0)
+        / IPerror(src=CLIENT, dst=SERVER, ttl=1) / TCPerror(sport=40002, dport=443, flags='S'),
+        eth / IP(src=SERVER, dst=CLIENT) / ICMP(type=3, code=1)
+        / IPerror(src=CLIENT, dst=SERVER) / TCPerror(sport=40003, dport=22, flags='S'),
+    ]
+
+
+def fragment_packets():
+    packets = []
+    for datagram in (
+        IP(src=CLIENT, dst=SERVER, id=7) / UDP(sport=7000, dport=2049) / Raw(b'u' * 3000),
+        IP(src=CLIENT, dst=SERVER, id=8) / TCP(sport=40004, dport=80, flags='PA') / Raw(b't' * 2500),
+        IP(src=CLIENT, dst=SERVER, id=9) / ICMP(type=8) / Raw(b'i' * 2000),
+    ):
+        packets.extend(Ether() / fragment_ for fragment_ in fragment(datagram, fragsize=1000))
+    return packets
+
+
+FIXTURES = {
+    'tcp.pcap': tcp_packets,
+    'udp.pcap': udp_packets,
+    'icmp.pcap': icmp_packets,
+    'fragments.pcap': fragment_packets
+}
+
+
+if __name__ == '__main__':
+    for name, build in FIXTURES.items():
+        wrpcap(os.path.join(HERE, name), stamped(build()))
+        print(f"wrote {name}")
@@ -0,0 +1,55 @@
+"""The raw-socket parser must yield exactly what Scapy dissection yields for the same frames"""
+import os
+import pytest
+
+scapy = pytest.importorskip('scapy.all')
+
+from app.models.ml_models import MLModelManager
+from app.utils.data_processor import DataProcessor
+from app.utils.raw_capture import parse_frame
+from app.utils.threat_analyzer import RealTimeThreatAnalyzer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PCAPS = ['tcp.pcap', 'udp.pcap', 'icmp.pcap', 'fragments.pcap']
+
+
+def make_analyzer():
+    return RealTimeThreatAnalyzer(MLModelManager(), DataProcessor(), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'PACKET_RING_CAPACITY': 1024,
+        'FEEDBACK_ENABLED': False
+    })
+
+
+@pytest.mark.parametrize('name', PCAPS)
+def test_struct_parser_matches_scapy(name):
+    packets = scapy.rdpcap(os.path.join(FIXTURES, name))
+    assert len(packets)
+
+    # Separate analyzers so each path builds its own flow state
+    scapy_side, struct_side = make_analyzer(), make_analyzer()
+    for i, packet in enumerate(packets):
+        timestamp = float(packet.time)
+        expected = scapy_side.packet_record(packet) if scapy.IP in packet else None
+        record = parse_frame(packet.original, timestamp)
+
+        assert record == expected, f"{name} packet {i}: {packet.summary()}"
+        assert struct_side.record_features(record) == scapy_side.record_features(expected), \
+            f"{name} packet {i}: {packet.summary()}"
+
+
+def test_icmp_errors_do_not_take_quoted_ports():
+    for packet in scapy.rdpcap(os.path.join(FIXTURES, 'icmp.pcap')):
+        record = parse_frame(packet.original, float(packet.time))
+        assert record.src_port == 0
+        assert record.dst_port == packet[scapy.ICMP].type
+
+
+def test_only_first_fragment_carries_ports():
+    records = [
+        parse_frame(packet.original, float(packet.time))
+        for packet in scapy.rdpcap(os.path.join(FIXTURES, 'fragments.pcap'))
+    ]
+    assert all(record.fragmented for record in records)
+    first = [record for record in records if record.src_port or record.dst_port]
+    assert [(record.protocol, record.dst_port) for record in first] == [(17, 2049), (6, 80), (1, 8)]